@@ -1,93 +1,150 @@
-from typing import TypedDict, Annotated
-from langgraph.graph.message import add_messages
-from langchain_core.messages import AnyMessage, HumanMessage, AIMessage
-from langgraph.prebuilt import ToolNode
-from langgraph.graph import START, StateGraph
-from langgraph.prebuilt import tools_condition
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv
+import asyncio
 import os
 import sys
+import threading
+import time
+from typing import TypedDict, Annotated
+
+# Heavy dependencies (LangGraph, LangChain, Gemini, the guest index and the
+# search tool) are imported and built on first use, so importing this module
+# has no side effects and takes milliseconds. Use get_alfred() / create_alfred().
+
+API_KEY_NAMES = ("GEMINI_API_KEY", "GOOGLE_API_KEY", "GOOGLE_GEMINI_API_KEY")
+CHAT_MODEL = "gemini-2.5-pro"
+GRAPH_NODES = ("compact_history", "assistant", "tools")
+
+_env_loaded = None
+_alfred = None
+_alfred_lock = threading.Lock()
+
+def load_environment() -> bool:
+    """Load variables from a .env file (once); returns whether one was found."""
+    global _env_loaded
+    if _env_loaded is None:
+        from dotenv import load_dotenv
+        
+        # Try multiple possible locations
+        _env_loaded = load_dotenv()
+        if not _env_loaded:
+            # Try parent directory
+            _env_loaded = load_dotenv('../.env')
+    return _env_loaded
 
-# Import the tools
-from tools import DuckDuckGoSearchRun, weather_info_tool, hub_stats_tool
-from retriever import guest_info_tool
-
-# Load environment variables from .env file
-# Try multiple possible locations
-env_loaded = load_dotenv()
-if not env_loaded:
-    # Try parent directory
-    load_dotenv('../.env')
-    # Try explicit path
-    load_dotenv('./.env')
-
-# Get API key from environment - try multiple possible names
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_GEMINI_API_KEY")
-
-# Debug: Print environment info
-print(f"Environment variables loaded: {env_loaded}")
-print(f"Current directory: {os.getcwd()}")
-print(f".env file exists in current dir: {os.path.exists('.env')}")
-print(f"GEMINI_API_KEY found: {'Yes' if GEMINI_API_KEY else 'No'}")
-
-if not GEMINI_API_KEY:
-    print("\n❌ ERROR: GEMINI_API_KEY not found!")
-    print("\nPlease ensure you have a .env file with one of these variables:")
-    print("  GEMINI_API_KEY=your_api_key_here")
-    print("  GOOGLE_API_KEY=your_api_key_here")
-    print("  GOOGLE_GEMINI_API_KEY=your_api_key_here")
-    print("\nYou can also set it directly in your terminal:")
-    print("  export GEMINI_API_KEY='your_api_key_here'")
-    sys.exit(1)
-
-# Initialize the web search tool
-search_tool = DuckDuckGoSearchRun()
-
-# Initialize Gemini chat model
-try:
-    chat = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
-        google_api_key=GEMINI_API_KEY,
+def get_api_key():
+    """Get the Gemini API key from the environment - try multiple possible names."""
+    load_environment()
+    for name in API_KEY_NAMES:
+        if os.getenv(name):
+            return os.getenv(name)
+    return None
+
+def create_chat_model(api_key: str = None):
+    """Initialize the Gemini chat model."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    
+    api_key = api_key or get_api_key()
+    if not api_key:
+        raise RuntimeError(f"Gemini API key not found, set one of {', '.join(API_KEY_NAMES)}.")
+    return ChatGoogleGenerativeAI(
+        model=CHAT_MODEL,
+        google_api_key=api_key,
         temperature=0
     )
-    print("✅ Gemini API initialized successfully!")
-except Exception as e:
-    print(f"❌ Error initializing Gemini API: {e}")
-    sys.exit(1)
-
-# Bind tools to the chat model
-tools = [guest_info_tool, search_tool, weather_info_tool, hub_stats_tool]
-chat_with_tools = chat.bind_tools(tools)
-
-# Generate the AgentState and Agent graph
-class AgentState(TypedDict):
-    messages: Annotated[list[AnyMessage], add_messages]
-
-def assistant(state: AgentState):
-    return {
-        "messages": [chat_with_tools.invoke(state["messages"])],
-    }
 
-# Build the graph
-builder = StateGraph(AgentState)
+def get_tools() -> list:
+    """Build Alfred's tools."""
+    from tools import create_search_tool, weather_info_tool, hub_stats_tool, hub_models_tool
+    from retriever import guest_info_tool
+    
+    return [guest_info_tool, create_search_tool(), weather_info_tool, hub_stats_tool, hub_models_tool]
+
+def create_alfred(chat_model=None, tools: list = None, checkpointer=None):
+    """
+    Build and compile the Alfred graph (an application factory - each call builds a new graph).
 
-# Define nodes: these do the work
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+    With a LangGraph `checkpointer` the graph keeps each conversation's state
+    under the `thread_id` passed in the run config (see server.py).
+    """
+    from langchain_core.messages import AnyMessage
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import START, StateGraph
+    from langgraph.graph.message import add_messages
+    from langgraph.prebuilt import tools_condition
+    from history import compaction_update
+    from tool_node import ParallelToolNode
+    from tracing import tracer
+    
+    chat_model = chat_model or create_chat_model()
+    tools = tools if tools is not None else get_tools()
+    
+    # Bind tools to the chat model
+    chat_with_tools = chat_model.bind_tools(tools)
+    
+    # Generate the AgentState and Agent graph
+    class AgentState(TypedDict):
+        messages: Annotated[list[AnyMessage], add_messages]
+    
+    model_name = getattr(chat_model, "model", None) or type(chat_model).__name__
+    
+    def assistant(state: AgentState):
+        with tracer.span("alfred.assistant", **{"gen_ai.request.model": model_name}) as span:
+            message = chat_with_tools.invoke(state["messages"])
+            span.record_usage(message.usage_metadata)
+        return {
+            "messages": [message],
+        }
+    
+    async def aassistant(state: AgentState):
+        with tracer.span("alfred.assistant", **{"gen_ai.request.model": model_name}) as span:
+            message = await chat_with_tools.ainvoke(state["messages"])
+            span.record_usage(message.usage_metadata)
+        return {
+            "messages": [message],
+        }
+    
+    def compact_history(state: AgentState):
+        # Keep the prompt within ALFRED_HISTORY_BUDGET before every model call
+        with tracer.span("alfred.compact_history", messages=len(state["messages"])) as span:
+            update = compaction_update(state["messages"])
+            span.set("compacted", bool(update))
+        return update
+    
+    # Build the graph
+    builder = StateGraph(AgentState)
+    
+    # Define nodes: these do the work
+    builder.add_node("compact_history", compact_history)
+    builder.add_node("assistant", RunnableLambda(assistant, afunc=aassistant, name="assistant"))
+    builder.add_node("tools", ParallelToolNode(tools).as_runnable())
+    
+    # Define edges: these determine how the control flow moves
+    builder.add_edge(START, "compact_history")
+    builder.add_edge("compact_history", "assistant")
+    builder.add_conditional_edges(
+        "assistant",
+        # If the latest message requires a tool, route to tools
+        # Otherwise, provide a direct response
+        tools_condition,
+    )
+    builder.add_edge("tools", "compact_history")
+    
+    # Compile the graph into an agent
+    return builder.compile(checkpointer=checkpointer)
 
-# Define edges: these determine how the control flow moves
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges(
-    "assistant",
-    # If the latest message requires a tool, route to tools
-    # Otherwise, provide a direct response
-    tools_condition,
-)
-builder.add_edge("tools", "assistant")
+def get_alfred():
+    """Return the shared Alfred graph, building it on first use."""
+    global _alfred
+    if _alfred is None:
+        with _alfred_lock:
+            if _alfred is None:
+                _alfred = create_alfred()
+    return _alfred
 
-# Compile the graph into an agent
-alfred = builder.compile()
+def __getattr__(name):
+    # Keep `from app import alfred` working without building the graph at import time
+    if name == "alfred":
+        return get_alfred()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def run_alfred(user_query: str):
     """Run Alfred with a user query and return the response."""
@@ -95,11 +152,27 @@ def run_alfred(user_query: str):
     print("-" * 50)
     
     try:
+        from langchain_core.messages import HumanMessage
+        
+        from response_cache import get_response_cache, tools_used
+        from tracing import tracer
+        
+        cache = get_response_cache()
         messages = [HumanMessage(content=user_query)]
-        response = alfred.invoke({"messages": messages})
+        start = time.perf_counter()
+        with tracer.span("alfred.run", query=user_query):
+            hit = cache.lookup(user_query) if cache else None
+            if hit:
+                print(f"🎩 Alfred's Response (cached, similarity {hit['similarity']:.2f}):\n{hit['answer']}")
+                print("-" * 50)
+                return hit["answer"]
+            response = get_alfred().invoke({"messages": messages})
         
         # Get the final response
         final_response = response['messages'][-1].content
+        if cache:
+            names, failed = tools_used(response["messages"])
+            cache.store(user_query, _chunk_text(final_response), names, time.perf_counter() - start, failed=failed)
         print(f"🎩 Alfred's Response:\n{final_response}")
         print("-" * 50)
         
@@ -109,6 +182,139 @@ def run_alfred(user_query: str):
         print("-" * 50)
         return None
 
+def _chunk_text(content) -> str:
+    """Text of a streamed message chunk (Gemini may send a list of content parts)."""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+async def astream_alfred(user_query: str, messages: list = None):
+    """
+    Run Alfred and yield events as they happen.
+
+    Events are dicts with a "type" key:
+      - "token": {"text"} assistant output tokens
+      - "tool_start" / "tool_end": {"name", "input"} / {"name", "output", "seconds"}
+      - "node_end": {"node", "seconds"} when a graph node finishes
+      - "final": {"content", "ttft", "total", "node_timings", "trace", "cache"} once the graph is done
+    `ttft` is the time to first token in seconds (None if nothing was streamed);
+    `trace` is the run's tracing summary (tokens, cache hits, time per span).
+    A new conversation (no `messages`) is first looked up in the semantic
+    response cache; on a hit the cached answer is sent as one token and
+    `cache` holds the match (see response_cache.py), otherwise it is None.
+    """
+    from langchain_core.messages import HumanMessage
+    from response_cache import get_response_cache, tools_used
+    from tracing import tracer
+    
+    cache = get_response_cache() if not messages else None
+    messages = (messages or []) + [HumanMessage(content=user_query)]
+    start = time.perf_counter()
+    first_token_at = None
+    started = {}  # run_id -> start time of graph nodes and tools
+    node_timings = []
+    final_messages = []
+    final_content = None
+    
+    with tracer.span("alfred.run", query=user_query) as run_span:
+        # Building the embedder or calling the embedding API blocks; keep it off the event loop
+        hit = await asyncio.to_thread(cache.lookup, user_query) if cache else None
+        if hit:
+            final_content = hit["answer"]
+            first_token_at = time.perf_counter()
+            yield {"type": "token", "text": final_content}
+        events = get_alfred().astream_events({"messages": messages}, version="v2") if not hit else _no_events()
+        async for event in events:
+            kind = event["event"]
+            name = event.get("name")
+            now = time.perf_counter()
+            
+            if kind == "on_chat_model_stream":
+                text = _chunk_text(event["data"]["chunk"].content)
+                if text:
+                    if first_token_at is None:
+                        first_token_at = now
+                    yield {"type": "token", "text": text}
+            elif kind == "on_tool_start":
+                started[event["run_id"]] = now
+                yield {"type": "tool_start", "name": name, "input": event["data"].get("input")}
+            elif kind == "on_tool_end":
+                seconds = now - started.pop(event["run_id"], now)
+                yield {"type": "tool_end", "name": name, "output": event["data"].get("output"), "seconds": seconds}
+            elif kind == "on_chain_start" and name in GRAPH_NODES and len(event.get("parent_ids", [])) == 1:
+                # Direct children of the graph run are its node executions
+                started[event["run_id"]] = now
+            elif kind == "on_chain_end" and event["run_id"] in started:
+                seconds = now - started.pop(event["run_id"])
+                node_timings.append((name, seconds))
+                yield {"type": "node_end", "node": name, "seconds": seconds}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # End of the whole graph run
+                final_messages = event["data"]["output"]["messages"]
+                final_content = final_messages[-1].content
+    
+    total = time.perf_counter() - start
+    if cache and not hit and final_content is not None:
+        names, failed = tools_used(final_messages)
+        await asyncio.to_thread(cache.store, user_query, _chunk_text(final_content), names, total, failed=failed)
+    yield {
+        "type": "final",
+        "content": final_content,
+        "ttft": first_token_at - start if first_token_at is not None else None,
+        "total": total,
+        "node_timings": node_timings,
+        "trace": tracer.summary(run_span),
+        "cache": hit,
+    }
+
+async def _no_events():
+    return
+    yield
+
+async def _print_stream(user_query: str):
+    final = None
+    async for event in astream_alfred(user_query):
+        if event["type"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "tool_start":
+            print(f"\n🔧 {event['name']}({event['input']})", flush=True)
+        elif event["type"] == "tool_end":
+            print(f"   ✓ {event['name']} done in {event['seconds']:.2f}s", flush=True)
+        elif event["type"] == "final":
+            final = event
+    return final
+
+def run_alfred_streaming(user_query: str):
+    """Run Alfred with a user query, printing the answer as it is generated."""
+    print(f"\n🎩 User Query: {user_query}")
+    print("-" * 50)
+    print("🎩 Alfred's Response:")
+    
+    try:
+        from response_cache import get_response_cache
+        
+        final = asyncio.run(_print_stream(user_query))
+        ttft = f"{final['ttft']:.2f}s" if final["ttft"] is not None else "n/a"
+        nodes = ", ".join(f"{node} {seconds:.2f}s" for node, seconds in final["node_timings"])
+        trace = final["trace"]
+        print(f"\n\n⏱  first token {ttft} · total {final['total']:.2f}s · {nodes}")
+        print(f"   tokens in {trace['input_tokens']} / out {trace['output_tokens']} / thinking {trace['thinking_tokens']}"
+              f" · cache hits {trace['cache_hits']} · retries {trace['retries']}")
+        if final["cache"]:
+            print(f"   cached answer to \"{final['cache']['query']}\" (similarity {final['cache']['similarity']:.2f},"
+                  f" saved {final['cache']['seconds_saved']:.1f}s)")
+        cache = get_response_cache()
+        if cache:
+            metrics = cache.metrics()
+            print(f"   response cache: {metrics['hits']}/{metrics['lookups']} hits ({metrics['hit_rate']:.0%}),"
+                  f" {metrics['seconds_saved']:.1f}s saved, {metrics['mean_lookup_ms']:.0f} ms per lookup")
+        print("-" * 50)
+        return final["content"]
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        print("-" * 50)
+        return None
+
 if __name__ == "__main__":
     # Example queries to test Alfred
     test_queries = [
@@ -119,6 +325,38 @@ if __name__ == "__main__":
         "Find information about guest Einstein and what's the weather in his hometown?"
     ]
     
+    # Debug: Print environment info
+    env_loaded = load_environment()
+    api_key = get_api_key()
+    print(f"Environment variables loaded: {env_loaded}")
+    print(f"Current directory: {os.getcwd()}")
+    print(f".env file exists in current dir: {os.path.exists('.env')}")
+    print(f"GEMINI_API_KEY found: {'Yes' if api_key else 'No'}")
+    
+    if not api_key:
+        print("\n❌ ERROR: GEMINI_API_KEY not found!")
+        print("\nPlease ensure you have a .env file with one of these variables:")
+        print("  GEMINI_API_KEY=your_api_key_here")
+        print("  GOOGLE_API_KEY=your_api_key_here")
+        print("  GOOGLE_GEMINI_API_KEY=your_api_key_here")
+        print("\nYou can also set it directly in your terminal:")
+        print("  export GEMINI_API_KEY='your_api_key_here'")
+        sys.exit(1)
+    
+    if "--serve" in sys.argv:
+        # Multi-session HTTP mode (see server.py)
+        import server
+        
+        server.main()
+        sys.exit(0)
+    
+    try:
+        get_alfred()
+        print("✅ Gemini API initialized successfully!")
+    except Exception as e:
+        print(f"❌ Error initializing Gemini API: {e}")
+        sys.exit(1)
+    
     print("\n🎩 Welcome to Alfred - Your AI Assistant!")
     print("=" * 50)
     
@@ -133,13 +371,13 @@ if __name__ == "__main__":
         
         if choice == "1":
             for query in test_queries:
-                run_alfred(query)
+                run_alfred_streaming(query)
                 input("\nPress Enter to continue...")
         
         elif choice == "2":
             user_query = input("\nEnter your query: ").strip()
             if user_query:
-                run_alfred(user_query)
+                run_alfred_streaming(user_query)
             else:
                 print("Please enter a valid query.")
         
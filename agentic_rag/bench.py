@@ -0,0 +1,378 @@
+"""
+Offline benchmark of Alfred's components.
+
+    python bench.py [--iterations 50] [--llm-latency 0.05] [--http-latency 0.01]
+                    [--guests 5000] [--concurrency 8] [--output results.json]
+                    [--compare baseline.json] [--tolerance 0.2] [--min-delta-ms 1]
+
+Everything external is replaced by the deterministic stand-ins in stubs.py:
+the chat model, Open-Meteo and the Hub API (a local HTTP server), and the guest
+dataset (a synthetic index of `--guests` guests). Each component is timed over
+`--iterations` calls and reported as JSON with p50/p95/p99 latency and
+throughput. With `--compare` the p95 of every component is checked against a
+previous report and the exit status is 1 if any got slower than `--tolerance`.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+COMPONENTS = {}
+
+FIRST_NAMES = ["Ada", "Albert", "Marie", "Nikola", "Alan", "Grace", "Emmy", "Rosalind", "Carl", "Lise"]
+LAST_NAMES = ["Lovelace", "Einstein", "Curie", "Tesla", "Turing", "Hopper", "Noether", "Franklin", "Sagan", "Meitner"]
+WORDS = ("mathematician physicist chemist inventor pioneer engine radiation relativity computing "
+         "countess navy admiral astronomer gala ballroom friend colleague rival poet painter").split()
+
+
+def component(name):
+    def register(func):
+        COMPONENTS[name] = func
+        return func
+    return register
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms) and throughput (calls/s) of a list of per-call durations."""
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "throughput": len(samples) / elapsed if elapsed else None,
+    }
+
+
+def measure(func, inputs, setup=None, check=None):
+    """
+    Time func(x) for every x in inputs, sequentially, after one untimed warm-up
+    call. `check(result)` must return True for every call, so a component that
+    silently fails fast doesn't look like a speed-up.
+    """
+    func(inputs[0])
+    samples = []
+    start = time.perf_counter()
+    for x in inputs:
+        if setup:
+            setup()
+        call_start = time.perf_counter()
+        result = func(x)
+        samples.append(time.perf_counter() - call_start)
+        if check and not check(result):
+            raise RuntimeError(f"unexpected result for {x!r}: {str(result)[:200]}")
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def ameasure(afunc, inputs, concurrency: int = 1):
+    """Time `await afunc(x)` for every x in inputs, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def timed(x):
+        async with semaphore:
+            call_start = time.perf_counter()
+            await afunc(x)
+            samples.append(time.perf_counter() - call_start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(x) for x in inputs))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def synthetic_guests(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    guests = []
+    for i in range(n):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+        guests.append({
+            "name": name,
+            "relation": rng.choice(["old friend", "colleague", "rival", "family"]),
+            "description": " ".join(rng.choices(WORDS, k=20)),
+            "email": name.lower().replace(" ", ".") + "@example.com",
+        })
+    return guests
+
+
+def guest_queries(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(WORDS)}" for _ in range(n)]
+
+
+def cities(n: int, seed: int = 2):
+    rng = random.Random(seed)
+    return [f"city-{rng.randrange(10_000)}" for _ in range(n)]
+
+
+@component("bm25.top_k")
+def bench_bm25(args):
+    import retriever
+
+    engine = retriever.get_bm25_engine()
+    return measure(lambda query: engine.top_k(query, 3), guest_queries(args.iterations))
+
+
+@component("tool.guest_info")
+def bench_guest_tool(args):
+    import retriever
+
+    tool = retriever.guest_info_tool
+    return measure(tool.invoke, guest_queries(args.iterations), check=lambda result: result.startswith("Name:"))
+
+
+def _is_weather(result):
+    return result.startswith("Weather in")
+
+
+@component("tool.weather.cold")
+def bench_weather_cold(args):
+    import tools
+
+    def clear():
+        tools.geocode_cache.clear()
+        tools.forecast_cache.clear()
+
+    return measure(tools.get_weather_info, cities(args.iterations), setup=clear, check=_is_weather)
+
+
+@component("tool.weather.warm")
+def bench_weather_warm(args):
+    import tools
+
+    locations = ["Paris", "Tokyo", "Lima"]
+    for location in locations:
+        tools.get_weather_info(location)
+    return measure(tools.get_weather_info, [locations[i % 3] for i in range(args.iterations)], check=_is_weather)
+
+
+@component("tool.hub_stats")
+def bench_hub_stats(args):
+    import tools
+
+    return measure(
+        tools.get_hub_stats, [f"author-{i % 10}" for i in range(args.iterations)],
+        check=lambda result: result.startswith("The most downloaded model"),
+    )
+
+
+@component("hub.prefetch")
+def bench_hub_prefetch(args):
+    """Cold listings for 20 authors at once; throughput is authors/s."""
+    from hub_stats import HubStats
+
+    def prefetch(i):
+        authors = [f"batch-{i}-{n}" for n in range(20)]
+        listings = HubStats(snapshot_path="").prefetch(authors)
+        return all(listing for listing in listings.values())
+
+    result = measure(prefetch, list(range(max(1, args.iterations // 5))), check=bool)
+    result["authors_per_call"] = 20
+    return result
+
+
+def guest_question_pairs(n: int, seed: int = 3):
+    """(question, paraphrase) pairs about guests, as Alfred's users might ask them."""
+    rng = random.Random(seed)
+    asks = ["Tell me about {}", "Who is guest {}?", "What do you know about {}", "Give me information on {}"]
+    pairs = []
+    for i in range(n):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+        first, second = rng.sample(asks, 2)
+        pairs.append((first.format(name), second.format(name)))
+    return pairs
+
+
+@component("response_cache.lookup")
+def bench_response_cache(args):
+    """Paraphrased questions against a cache of 1000 answers; embedding calls take --http-latency."""
+    from response_cache import SemanticCache
+    from stubs import StubEmbeddings
+
+    embedder = StubEmbeddings(latency=args.http_latency)
+    cache = SemanticCache(embedder_factory=lambda: embedder, threshold=0.8)
+    pairs = guest_question_pairs(1000)
+    for question, _ in pairs:
+        cache.store(question, f"Answer about {question}", ["guest_info_retriever"], seconds=args.llm_latency * 2)
+    paraphrases = [pairs[i % len(pairs)][1] for i in range(args.iterations)]
+    before = cache.metrics()
+    result = measure(cache.lookup, paraphrases, check=lambda hit: hit is not None)
+    after = cache.metrics()
+    result["hit_rate"] = (after["hits"] - before["hits"]) / (after["lookups"] - before["lookups"])
+    result["entries"] = after["size"]
+    return result
+
+
+SEARCH_TOPICS = ["president of France", "weather in Gotham", "Wayne Enterprises stock", "Batman sightings", "gala dress code"]
+SEARCH_PHRASINGS = ["{}", "the {}", "Who is the {}?", "{}?", "search for {}"]
+
+
+@component("tool.web_search")
+def bench_web_search(args):
+    """Three rephrased sub-queries per call, fanned out; DuckDuckGo calls take --http-latency."""
+    from stubs import StubSearch
+    from web_search import WebSearch
+
+    rng = random.Random(4)
+    backend = StubSearch(latency=args.http_latency)
+    search = WebSearch(fetch=backend)
+    queries = [
+        "; ".join(rng.choice(SEARCH_PHRASINGS).format(topic) for topic in rng.sample(SEARCH_TOPICS, 3))
+        for _ in range(args.iterations)
+    ]
+    result = measure(search.search, queries, check=lambda text: text.startswith("- "))
+    result["searches_per_call"] = 3
+    result["requests"] = backend.requests
+    result["coalesced"] = search.coalesced
+    return result
+
+
+def _alfred_graph(args):
+    import app
+    import retriever
+    import tools
+    from stubs import StubChat
+
+    chat = StubChat(latency=args.llm_latency, tool_names=["guest_info_retriever", "get_weather_info"])
+    return app.create_alfred(chat_model=chat, tools=[retriever.guest_info_tool, tools.weather_info_tool])
+
+
+def _alfred_turn(graph):
+    from langchain_core.messages import HumanMessage
+
+    async def turn(query):
+        result = await graph.ainvoke({"messages": [HumanMessage(content=query)]})
+        assert result["messages"][-1].content.startswith("Answer #1")
+
+    return turn
+
+
+@component("alfred.turn")
+def bench_alfred_turn(args):
+    graph = _alfred_graph(args)
+    return asyncio.run(ameasure(_alfred_turn(graph), guest_queries(args.iterations)))
+
+
+@component("alfred.concurrent")
+def bench_alfred_concurrent(args):
+    graph = _alfred_graph(args)
+    result = asyncio.run(ameasure(_alfred_turn(graph), guest_queries(args.iterations), args.concurrency))
+    result["concurrency"] = args.concurrency
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, tolerance: float, min_delta_ms: float = 1.0):
+    """
+    Components whose p95 grew by more than `tolerance` (a fraction) since
+    `baseline`; changes under `min_delta_ms` are treated as timer noise.
+    """
+    regressions = []
+    for name, result in report["components"].items():
+        before = baseline.get("components", {}).get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in result:
+            continue
+        delta = result["p95_ms"] - before["p95_ms"]
+        if delta > before["p95_ms"] * tolerance and delta > min_delta_ms:
+            regressions.append({"component": name, "before_p95_ms": before["p95_ms"], "p95_ms": result["p95_ms"]})
+    return regressions
+
+
+def setup_environment(args, stub_url, index_dir):
+    """Point every external dependency at the local stand-ins (before the modules are imported)."""
+    os.environ.update({
+        "GUEST_INDEX_DIR": index_dir,
+        "GUEST_INDEX_CHECK": "0",
+        "GUEST_RETRIEVAL": "bm25",
+        "HF_ENDPOINT": stub_url,
+        "HF_HUB_DISABLE_TELEMETRY": "1",
+    })
+
+    import guest_index
+    import tools
+
+    guest_index.write_index(synthetic_guests(args.guests), index_dir, guest_index.fingerprint(f"bench-{args.guests}"))
+    tools.GEOCODING_URL = f"{stub_url}/v1/search"
+    tools.FORECAST_URL = f"{stub_url}/v1/forecast"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stub model call")
+    parser.add_argument("--http-latency", type=float, default=0.01, help="seconds per stub HTTP request")
+    parser.add_argument("--guests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", nargs="*", default=None, help="component names to run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 increase")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from stubs import StubHTTPServer
+
+    report = {
+        "suite": "agentic_rag",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "components": {},
+    }
+    with tempfile.TemporaryDirectory() as index_dir, StubHTTPServer(latency=args.http_latency) as stub:
+        with contextlib.redirect_stdout(sys.stderr):
+            setup_environment(args, stub.url, index_dir)
+        for name, func in COMPONENTS.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            try:
+                # Progress prints go to stderr so stdout stays valid JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    report["components"][name] = func(args)
+            except Exception as e:
+                report["components"][name] = {"error": repr(e)}
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['component']}: p95 {regression['before_p95_ms']:.1f} ms -> "
+                  f"{regression['p95_ms']:.1f} ms", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
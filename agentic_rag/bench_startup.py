@@ -0,0 +1,126 @@
+"""
+Break down Alfred's startup cost per component.
+
+    python bench_startup.py [--json]
+
+Each step runs once, in order, in this fresh interpreter, so a step's time is
+what it adds on top of the steps before it (shared imports are charged to the
+first step that needs them). Without an API key a placeholder is used: the
+Gemini client is constructed but never called.
+"""
+import json
+import os
+import sys
+import time
+
+STEPS = []
+
+
+def step(name):
+    def register(func):
+        STEPS.append((name, func))
+        return func
+    return register
+
+
+@step("import app")
+def import_app():
+    import app  # noqa: F401
+
+
+@step("load .env")
+def load_env():
+    import app
+
+    app.load_environment()
+
+
+@step("import langchain_core")
+def import_langchain_core():
+    import langchain_core.messages  # noqa: F401
+    import langchain_core.tools  # noqa: F401
+
+
+@step("import langgraph")
+def import_langgraph():
+    import langgraph.graph  # noqa: F401
+    import langgraph.prebuilt  # noqa: F401
+
+
+@step("create chat model")
+def chat_model():
+    import app
+
+    return app.create_chat_model(app.get_api_key() or "placeholder-key")
+
+
+@step("search tool")
+def search_tool():
+    from tools import create_search_tool
+
+    return create_search_tool()
+
+
+@step("weather + hub tools")
+def other_tools():
+    import tools
+
+    return [tools.weather_info_tool, tools.hub_stats_tool]
+
+
+@step("guest index load")
+def guest_index():
+    import retriever
+
+    return retriever.get_guest_index()
+
+
+@step("BM25 engine build")
+def bm25_engine():
+    import retriever
+
+    return retriever.get_bm25_engine()
+
+
+@step("guest tool + retriever")
+def guest_tool():
+    import retriever
+
+    retriever.get_guest_retriever()
+    return retriever.guest_info_tool
+
+
+@step("compile graph")
+def compile_graph():
+    import app
+
+    return app.create_alfred(chat_model=chat_model(), tools=app.get_tools())
+
+
+def main():
+    as_json = "--json" in sys.argv
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    results = []
+    total_start = time.perf_counter()
+    for name, func in STEPS:
+        start = time.perf_counter()
+        try:
+            func()
+            error = None
+        except Exception as e:
+            error = repr(e)
+        results.append({"step": name, "ms": (time.perf_counter() - start) * 1000, "error": error})
+    total_ms = (time.perf_counter() - total_start) * 1000
+
+    if as_json:
+        print(json.dumps({"steps": results, "total_ms": total_ms}, indent=2))
+        return
+    for row in results:
+        suffix = f"  ({row['error']})" if row["error"] else ""
+        print(f"{row['step']:<24} {row['ms']:>9.1f} ms{suffix}")
+    print(f"{'total':<24} {total_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import numpy as np
+from scipy import sparse
+
+from guest_index import B, K1, tokenize
+
+
+class SparseBM25:
+    """
+    BM25 (Okapi) scorer backed by a precomputed sparse weight matrix.
+
+    Every (term, document) BM25 contribution is computed once at load time and
+    stored term-major in a CSR matrix, so scoring a query is a sparse
+    vector-matrix product over the postings of its terms instead of a Python
+    loop over every document. Scores match rank_bm25's BM25Okapi.
+    """
+
+    def __init__(self, indptr, term_ids, term_freqs, doc_len, idf, vocab, k1=K1, b=B, avgdl=None):
+        indptr = np.asarray(indptr)
+        doc_len = np.asarray(doc_len, dtype=np.float32)
+        term_freqs = np.asarray(term_freqs, dtype=np.float32)
+        idf = np.asarray(idf, dtype=np.float32)
+        self.n_docs = len(doc_len)
+        self.vocab = {term: term_id for term_id, term in enumerate(vocab)}
+        avgdl = avgdl if avgdl is not None else (float(doc_len.mean()) if self.n_docs else 0.0)
+
+        # Per-posting BM25 weight: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        doc_ids = np.repeat(np.arange(self.n_docs, dtype=np.int32), np.diff(indptr))
+        norm = k1 * (1 - b + b * doc_len[doc_ids] / max(avgdl, 1e-9))
+        weights = idf[term_ids] * term_freqs * (k1 + 1) / (term_freqs + norm)
+
+        doc_major = sparse.csr_matrix(
+            (weights, np.asarray(term_ids), indptr), shape=(self.n_docs, len(vocab))
+        )
+        self.term_weights = doc_major.T.tocsr()  # terms x docs
+
+    @classmethod
+    def from_index(cls, index):
+        """Build the engine from a guest_index.load_index() result."""
+        return cls(
+            index["indptr"], index["term_ids"], index["term_freqs"], index["doc_len"],
+            index["idf"], index["vocab"], k1=index["k1"], b=index["b"], avgdl=index["avgdl"],
+        )
+
+    def query_matrix(self, queries):
+        """Encode queries as a (queries x terms) matrix of token counts; unknown tokens are dropped."""
+        rows, cols = [], []
+        for row, query in enumerate(queries):
+            for token in tokenize(query):
+                term_id = self.vocab.get(token)
+                if term_id is not None:
+                    rows.append(row)
+                    cols.append(term_id)
+        data = np.ones(len(rows), dtype=np.float32)
+        # Duplicate (row, col) entries are summed, so repeated tokens count twice like in rank_bm25
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(queries), len(self.vocab)))
+
+    def score_many(self, queries):
+        """Score a batch of queries at once; returns a sparse (queries x docs) CSR matrix."""
+        return (self.query_matrix(queries) @ self.term_weights).tocsr()
+
+    def get_scores(self, query: str):
+        """Dense BM25 scores of one query against every document."""
+        return self.score_many([query]).toarray()[0]
+
+    def _top_k_row(self, scores, k):
+        # Only documents sharing a term with the query can score above zero
+        doc_ids, values = scores.indices, scores.data
+        if len(values) > k:
+            keep = np.argpartition(-values, k - 1)[:k]
+            doc_ids, values = doc_ids[keep], values[keep]
+        order = np.lexsort((doc_ids, -values))
+        return [(int(doc_ids[i]), float(values[i])) for i in order if values[i] > 0]
+
+    def top_k(self, query: str, k: int = 4):
+        """Return up to k (doc_id, score) pairs for documents matching the query, best first."""
+        return self.top_k_many([query], k)[0]
+
+    def top_k_many(self, queries, k: int = 4):
+        """Batch version of top_k."""
+        scores = self.score_many(queries)
+        return [self._top_k_row(scores.getrow(row), k) for row in range(scores.shape[0])]
+
+
+if __name__ == "__main__":
+    # Synthetic scale check: python bm25_engine.py [n_docs]
+    import sys
+    import time
+
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    vocab = [f"w{i}" for i in range(50_000)]
+    doc_len = rng.integers(20, 60, size=n_docs)
+    indptr = np.concatenate([[0], np.cumsum(doc_len)])
+    # Zipf-ish term distribution, one posting per token (tf = 1) keeps the setup simple
+    term_ids = np.minimum(rng.zipf(1.3, size=int(indptr[-1])) - 1, len(vocab) - 1).astype(np.int32)
+    df = np.minimum(np.bincount(term_ids, minlength=len(vocab)), n_docs).astype(np.float64)
+    idf = np.maximum(np.log(n_docs - df + 0.5) - np.log(df + 0.5), 0.01)
+
+    start = time.perf_counter()
+    engine = SparseBM25(indptr, term_ids, np.ones(len(term_ids)), doc_len, idf, vocab)
+    print(f"Built engine for {n_docs} docs in {time.perf_counter() - start:.2f}s")
+
+    queries = [" ".join(rng.choice(vocab[100:5000], size=3)) for _ in range(1000)]
+    start = time.perf_counter()
+    for query in queries:
+        engine.top_k(query, 3)
+    print(f"top_k: {(time.perf_counter() - start) / len(queries) * 1000:.3f} ms/query")
+    start = time.perf_counter()
+    engine.top_k_many(queries, 3)
+    print(f"top_k_many: {(time.perf_counter() - start) / len(queries) * 1000:.3f} ms/query")
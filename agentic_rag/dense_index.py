@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+
+from guest_index import INDEX_DIR
+
+# Embedding model used for the dense side of hybrid retrieval
+EMBED_MODEL = os.getenv("GUEST_EMBED_MODEL", "models/text-embedding-004")
+EMBED_BATCH_SIZE = 64
+# Below this many guests an exhaustive scan is faster than probing IVF lists
+IVF_MIN_DOCS = 2048
+N_PROBE = 8
+RRF_K = 60
+
+
+def default_embedder():
+    """Gemini embedding model, using the same API key variables as app.py."""
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_GEMINI_API_KEY")
+    return GoogleGenerativeAIEmbeddings(model=EMBED_MODEL, google_api_key=api_key)
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def kmeans(vectors, n_clusters: int, iterations: int = 10, seed: int = 0):
+    """Spherical k-means on unit vectors; returns (centroids, assignments)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+        centroids = normalize(centroids)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over unit vectors.
+
+    Vectors are grouped by their nearest k-means centroid; a query only scans
+    the `n_probe` closest lists. With a single list the search is exact.
+    """
+
+    def __init__(self, embeddings, centroids, order, offsets, n_probe: int = N_PROBE):
+        self.embeddings = embeddings  # (docs x dim), float16, usually memory-mapped
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.order = order  # doc ids grouped by list
+        self.offsets = offsets  # list i is order[offsets[i]:offsets[i + 1]]
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, embeddings, n_lists: int = None):
+        vectors = normalize(embeddings)
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(vectors))) if len(vectors) >= IVF_MIN_DOCS else 1
+        if n_lists <= 1:
+            centroids = normalize(vectors.mean(axis=0, keepdims=True))
+            assignments = np.zeros(len(vectors), dtype=np.int64)
+        else:
+            centroids, assignments = kmeans(vectors, n_lists)
+        order = np.argsort(assignments, kind="stable").astype(np.int32)
+        offsets = np.searchsorted(assignments[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        return cls(vectors.astype(np.float16), centroids, order, offsets)
+
+    def search(self, query_vector, k: int = 4):
+        """Return up to k (doc_id, cosine similarity) pairs, best first."""
+        query = normalize(query_vector)
+        lists = np.argsort(-(self.centroids @ query))[: self.n_probe]
+        candidates = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+        if not len(candidates):
+            return []
+        scores = self.embeddings[candidates].astype(np.float32) @ query
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def save(self, index_dir: str, meta: dict):
+        os.makedirs(index_dir, exist_ok=True)
+        meta_path = os.path.join(index_dir, "dense.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        np.save(os.path.join(index_dir, "embeddings.npy"), self.embeddings)
+        np.save(os.path.join(index_dir, "ivf_centroids.npy"), self.centroids)
+        np.save(os.path.join(index_dir, "ivf_order.npy"), self.order)
+        np.save(os.path.join(index_dir, "ivf_offsets.npy"), self.offsets)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Memory-map a saved index; returns (index, meta)."""
+        with open(os.path.join(index_dir, "dense.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(
+            np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r"),
+            np.load(os.path.join(index_dir, "ivf_centroids.npy")),
+            np.load(os.path.join(index_dir, "ivf_order.npy"), mmap_mode="r"),
+            np.load(os.path.join(index_dir, "ivf_offsets.npy")),
+        )
+        return index, meta
+
+
+def embed_documents(embedder, texts, batch_size: int = EMBED_BATCH_SIZE):
+    """Embed texts in batches into a float32 matrix."""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embedder.embed_documents(texts[start:start + batch_size]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def load_or_build_dense_index(guest_index, embedder, index_dir: str = INDEX_DIR):
+    """Load the dense index for `guest_index`, re-embedding only if the guests or model changed."""
+    fingerprint = f"{guest_index['fingerprint']}|{EMBED_MODEL}"
+    try:
+        index, meta = IVFIndex.load(index_dir)
+        if meta.get("fingerprint") == fingerprint:
+            return index
+        print("Guest index or embedding model changed, re-embedding guests...")
+    except (OSError, ValueError, KeyError):
+        print("No dense guest index found, embedding guests...")
+
+    texts = [doc["page_content"] for doc in guest_index["documents"]]
+    index = IVFIndex.build(embed_documents(embedder, texts))
+    index.save(index_dir, {"fingerprint": fingerprint, "model": EMBED_MODEL, "count": len(texts)})
+    print(f"Embedded {len(texts)} guests with {EMBED_MODEL}")
+    return IVFIndex.load(index_dir)[0]
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """Merge ranked lists of doc ids; each list contributes 1 / (k + rank) per doc."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
@@ -0,0 +1,76 @@
+"""
+Compare guest retrieval modes: latency and recall@3.
+
+    python eval_retrieval.py [--queries eval_queries.jsonl] [--json]
+
+A query counts as recalled when the expected guest name appears in one of
+the top 3 documents returned. The hybrid mode needs a Gemini API key for
+embeddings; without one only the BM25 baseline is reported.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import retriever  # noqa: E402  (needs the API key from .env for the dense side)
+from guest_retrievers import HybridRetriever  # noqa: E402
+
+
+def load_queries(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(name, guest_retriever, queries, k: int = 3, warmup: bool = True):
+    if warmup:
+        # First call may load or build indexes; keep it out of the timings
+        guest_retriever.invoke(queries[0]["query"])
+    latencies = []
+    hits = 0
+    for item in queries:
+        start = time.perf_counter()
+        results = guest_retriever.invoke(item["query"])[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        if any(item["expected"].lower() in doc.metadata["name"].lower() for doc in results):
+            hits += 1
+    latencies = np.array(latencies)
+    return {
+        "mode": name,
+        "queries": len(queries),
+        f"recall@{k}": hits / len(queries),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "latency_ms_mean": float(latencies.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", default="eval_queries.jsonl")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    modes = [("bm25", retriever.get_bm25_retriever())]
+    hybrid = HybridRetriever(
+        engine=retriever.get_bm25_engine(), docs=retriever.get_docs(), index=retriever.get_guest_index()
+    )
+    if hybrid._load_dense() is not None:
+        modes.append(("hybrid", hybrid))
+
+    results = [evaluate(name, mode_retriever, queries) for name, mode_retriever in modes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<8} {'recall@3':>9} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for row in results:
+        print(f"{row['mode']:<8} {row['recall@3']:>9.2f} {row['latency_ms_p50']:>8.2f} "
+              f"{row['latency_ms_p95']:>8.2f} {row['latency_ms_mean']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
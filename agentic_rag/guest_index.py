@@ -0,0 +1,190 @@
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+# Guest dataset and where its prebuilt BM25 index lives
+DATASET_NAME = "agents-course/unit3-invitees"
+INDEX_DIR = os.getenv("GUEST_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".guest_index"))
+# Bump when the tokenizer, document layout or BM25 formula changes
+INDEX_FORMAT = 1
+# How long a Hub revision check stays valid (seconds); a cached index loads without network access until then
+REVISION_CHECK_TTL = float(os.getenv("GUEST_INDEX_CHECK_TTL", "86400"))
+
+# BM25Okapi parameters (same defaults as rank_bm25)
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+ARRAYS = ("indptr", "term_ids", "term_freqs", "doc_len", "idf")
+
+
+def tokenize(text: str) -> list:
+    """Split text into tokens (same as LangChain's BM25Retriever default)."""
+    return text.split()
+
+
+def format_guest(guest) -> str:
+    """Render a dataset row as the text that gets indexed and returned."""
+    return "\n".join([
+        f"Name: {guest['name']}",
+        f"Relation: {guest['relation']}",
+        f"Description: {guest['description']}",
+        f"Email: {guest['email']}"
+    ])
+
+
+def dataset_revision(timeout: float = 5):
+    """Return the current commit sha of the guest dataset on the Hub, or None if unreachable."""
+    try:
+        from huggingface_hub import HfApi
+
+        return HfApi().dataset_info(DATASET_NAME, timeout=timeout).sha
+    except Exception as e:
+        print(f"Could not check guest dataset revision: {e}")
+        return None
+
+
+def fingerprint(revision) -> str:
+    return f"{DATASET_NAME}@{revision}#v{INDEX_FORMAT}"
+
+
+def build_index(index_dir: str = INDEX_DIR, revision: str = None):
+    """
+    Download the guest dataset, tokenize it and write the BM25 index to `index_dir`.
+
+    The corpus is stored as a CSR term-frequency matrix (one .npy file per
+    array, so it can be memory-mapped) plus a meta.json with the vocabulary,
+    documents, BM25 parameters and the dataset fingerprint.
+    """
+    import datasets
+
+    revision = revision or dataset_revision()
+    guest_dataset = datasets.load_dataset(DATASET_NAME, split="train", revision=revision)
+    write_index(guest_dataset, index_dir, fingerprint(revision))
+
+
+def write_index(guests, index_dir: str = INDEX_DIR, index_fingerprint: str = None):
+    """Tokenize guest rows (dicts with name/relation/description/email) and save the index files."""
+    documents = [{"page_content": format_guest(guest), "metadata": {"name": guest["name"]}} for guest in guests]
+
+    vocab = {}
+    indptr = [0]
+    term_ids = []
+    term_freqs = []
+    doc_len = []
+    doc_counts = Counter()
+    for doc in documents:
+        counts = Counter(tokenize(doc["page_content"]))
+        for term, freq in counts.items():
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            term_freqs.append(freq)
+        indptr.append(len(term_ids))
+        doc_len.append(sum(counts.values()))
+        doc_counts.update(counts.keys())
+
+    # Okapi idf with rank_bm25's epsilon floor for very common terms
+    n_docs = len(documents)
+    df = np.array([doc_counts[term] for term in vocab], dtype=np.float64)
+    idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+    if len(idf):
+        idf[idf < 0] = EPSILON * idf.mean()
+
+    os.makedirs(index_dir, exist_ok=True)
+    # Invalidate any previous index until the new one is fully written
+    meta_path = os.path.join(index_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    arrays = {
+        "indptr": np.array(indptr, dtype=np.int64),
+        "term_ids": np.array(term_ids, dtype=np.int32),
+        "term_freqs": np.array(term_freqs, dtype=np.float32),
+        "doc_len": np.array(doc_len, dtype=np.float32),
+        "idf": idf.astype(np.float32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(index_dir, f"{name}.npy"), array)
+
+    meta = {
+        "fingerprint": index_fingerprint or fingerprint(None),
+        "k1": K1,
+        "b": B,
+        "epsilon": EPSILON,
+        "avgdl": float(np.mean(doc_len)) if doc_len else 0.0,
+        "vocab": list(vocab),
+        "documents": documents,
+    }
+    # meta.json is written last: its presence marks a complete index
+    tmp_path = os.path.join(index_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    print(f"Built guest index for {n_docs} guests ({len(vocab)} terms) in {index_dir}")
+
+
+def load_index(index_dir: str = INDEX_DIR, mmap: bool = True):
+    """Load a prebuilt index; arrays are memory-mapped unless `mmap` is False."""
+    with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    mmap_mode = "r" if mmap else None
+    for name in ARRAYS:
+        index[name] = np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+    return index
+
+
+def _revision_check_due(index_dir: str) -> bool:
+    """True when the last successful Hub revision check is older than REVISION_CHECK_TTL."""
+    try:
+        checked_at = os.path.getmtime(os.path.join(index_dir, "revision_checked"))
+    except OSError:
+        return True
+    return time.time() - checked_at >= REVISION_CHECK_TTL
+
+
+def _mark_revision_checked(index_dir: str):
+    with open(os.path.join(index_dir, "revision_checked"), "w", encoding="utf-8"):
+        pass
+
+
+def load_or_build_index(index_dir: str = INDEX_DIR, check_revision: bool = None):
+    """
+    Load the guest index, rebuilding it only when it is missing or stale.
+
+    The dataset revision is checked against the Hub (a single metadata call)
+    at most once per GUEST_INDEX_CHECK_TTL seconds, so most startups load the
+    index without touching the network; GUEST_INDEX_CHECK=0 skips the check
+    entirely. If the Hub can't be reached the existing index is used as-is.
+    """
+    if check_revision is None:
+        check_revision = os.getenv("GUEST_INDEX_CHECK", "1") != "0"
+
+    index = None
+    try:
+        index = load_index(index_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"No usable guest index in {index_dir} ({e}), building it...")
+
+    if index is not None:
+        stale = not index["fingerprint"].endswith(f"#v{INDEX_FORMAT}")
+        if not stale and check_revision and _revision_check_due(index_dir):
+            revision = dataset_revision()
+            stale = revision is not None and index["fingerprint"] != fingerprint(revision)
+            if revision is not None and not stale:
+                _mark_revision_checked(index_dir)
+        if not stale:
+            return index
+        print("Guest dataset changed, rebuilding index...")
+        # Release the memory-mapped arrays before their files are rewritten
+        index = None
+
+    build_index(index_dir)
+    index = load_index(index_dir)
+    if index["fingerprint"] != fingerprint(None):
+        _mark_revision_checked(index_dir)
+    return index
+
+
+if __name__ == "__main__":
+    build_index()
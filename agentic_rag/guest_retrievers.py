@@ -0,0 +1,67 @@
+import threading
+from functools import lru_cache
+from typing import Any, Callable
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from dense_index import default_embedder, load_or_build_dense_index, reciprocal_rank_fusion
+
+# Candidates taken from each ranker before fusion
+FUSION_CANDIDATES = 20
+
+
+class SparseBM25Retriever(BaseRetriever):
+    """LangChain retriever over the vectorized SparseBM25 engine."""
+
+    engine: Any
+    docs: list[Document]
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list[Document]:
+        return [self.docs[doc_id] for doc_id, _ in self.engine.top_k(query, self.k)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25 + dense-embedding retriever merged with reciprocal-rank fusion.
+
+    The dense index is loaded (or built) on first use; if embeddings are not
+    available, e.g. no API key, it falls back to BM25 only.
+    """
+
+    engine: Any
+    docs: list[Document]
+    index: Any
+    k: int = 4
+    embedder_factory: Callable = default_embedder
+    dense_index: Any = None
+    embed_query: Any = None
+    dense_failed: bool = False
+    lock: Any = None
+
+    def model_post_init(self, __context):
+        self.lock = threading.Lock()
+
+    def _load_dense(self):
+        with self.lock:
+            if self.dense_index is None and not self.dense_failed:
+                try:
+                    embedder = self.embedder_factory()
+                    self.dense_index = load_or_build_dense_index(self.index, embedder)
+                    # Repeated questions about the same guest skip the embedding call
+                    self.embed_query = lru_cache(maxsize=1024)(embedder.embed_query)
+                except Exception as e:
+                    print(f"Dense guest retrieval unavailable, using BM25 only: {e}")
+                    self.dense_failed = True
+        return self.dense_index
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list[Document]:
+        rankings = [[doc_id for doc_id, _ in self.engine.top_k(query, FUSION_CANDIDATES)]]
+        if self._load_dense() is not None:
+            try:
+                hits = self.dense_index.search(self.embed_query(query), FUSION_CANDIDATES)
+                rankings.append([doc_id for doc_id, _ in hits])
+            except Exception as e:
+                print(f"Dense guest search failed, using BM25 only: {e}")
+        return [self.docs[doc_id] for doc_id in reciprocal_rank_fusion(rankings)[: self.k]]
@@ -0,0 +1,126 @@
+import os
+
+# Conversation-history limits (override via environment)
+HISTORY_BUDGET = int(os.getenv("ALFRED_HISTORY_BUDGET", "8000"))  # estimated prompt tokens
+TOOL_RESULT_CHARS = int(os.getenv("ALFRED_TOOL_RESULT_CHARS", "600"))  # kept from consumed tool results
+MIN_TURNS = int(os.getenv("ALFRED_HISTORY_MIN_TURNS", "2"))  # recent turns that are never dropped
+SUMMARY_ID = "history-summary"
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+SUMMARY_LINE_CHARS = 200
+# Rough English average for Gemini/SentencePiece tokenizers, plus per-message framing
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+
+
+def _text(message) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def estimate_tokens(messages) -> int:
+    """Cheap token estimate for a message list (no tokenizer call)."""
+    total = 0
+    for message in messages:
+        chars = len(_text(message))
+        for call in getattr(message, "tool_calls", None) or []:
+            chars += len(call["name"]) + len(str(call.get("args", "")))
+        total += chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+    return total
+
+
+def split_turns(messages):
+    """Group messages into turns: a human message and everything up to the next one."""
+    turns = []
+    for message in messages:
+        if message.type == "human" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def elide_tool_results(messages, max_chars: int = TOOL_RESULT_CHARS):
+    """
+    Shorten tool results the model has already answered from.
+
+    A tool message is consumed once an AI message follows it; its content is
+    cut to `max_chars`. Results the model has not seen yet are left whole.
+    """
+    last_ai = max((i for i, m in enumerate(messages) if m.type == "ai"), default=-1)
+    compacted = []
+    for i, message in enumerate(messages):
+        text = _text(message)
+        if message.type == "tool" and i < last_ai and len(text) > max_chars:
+            elided = len(text) - max_chars
+            message = message.model_copy(update={"content": f"{text[:max_chars]}\n[... elided {elided} chars]"})
+        compacted.append(message)
+    return compacted
+
+
+def summarize_turns(turns, previous: str = "") -> str:
+    """Extractive summary of dropped turns: each question and the answer Alfred gave."""
+    lines = [previous] if previous else []
+    for turn in turns:
+        question = next((_text(m) for m in turn if m.type == "human"), "")
+        answer = next((_text(m) for m in reversed(turn) if m.type == "ai" and _text(m)), "")
+        tools = sorted({call["name"] for m in turn for call in getattr(m, "tool_calls", None) or []})
+        line = f"- User: {question[:SUMMARY_LINE_CHARS]}"
+        if tools:
+            line += f" (tools: {', '.join(tools)})"
+        if answer:
+            line += f"\n  Alfred: {answer[:SUMMARY_LINE_CHARS]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def compact_history(messages, budget: int = HISTORY_BUDGET, tool_result_chars: int = TOOL_RESULT_CHARS,
+                    min_turns: int = MIN_TURNS, summarize=summarize_turns):
+    """
+    Fit a conversation into `budget` estimated tokens.
+
+    Consumed tool results are elided first. If that is not enough, the oldest
+    whole turns are dropped (so tool calls and their results stay paired) and
+    folded into a single summary message at the start, keeping at least the
+    last `min_turns` turns verbatim. `summarize(turns, previous)` can be
+    replaced, e.g. with an LLM call. Returns the new message list.
+    """
+    from langchain_core.messages import SystemMessage
+
+    compacted = elide_tool_results(messages, tool_result_chars)
+    if estimate_tokens(compacted) <= budget:
+        return compacted
+
+    summary, rest = None, compacted
+    if compacted and compacted[0].id == SUMMARY_ID:
+        summary, rest = compacted[0], compacted[1:]
+    turns = split_turns(rest)
+    dropped = []
+    while len(turns) > min_turns and estimate_tokens([m for turn in turns for m in turn]) > budget:
+        dropped.append(turns.pop(0))
+    if not dropped:
+        return compacted
+
+    previous = _text(summary).removeprefix(SUMMARY_HEADER) if summary is not None else ""
+    text = summarize(dropped, previous)
+    # The summary itself gets at most a quarter of the budget; its oldest lines go first
+    max_chars = budget * CHARS_PER_TOKEN // 4
+    if len(text) > max_chars:
+        text = text[-max_chars:].partition("\n- ")[2]
+        text = "- " + text if text else ""
+    summary = SystemMessage(content=SUMMARY_HEADER + text, id=SUMMARY_ID)
+    return [summary] + [m for turn in turns for m in turn]
+
+
+def compaction_update(messages, **kwargs):
+    """
+    State update for a LangGraph node: replaces the `add_messages` list with
+    the compacted history, or returns {} when nothing changed.
+    """
+    from langchain_core.messages import RemoveMessage
+    from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+    compacted = compact_history(messages, **kwargs)
+    if len(compacted) == len(messages) and all(a is b for a, b in zip(compacted, messages)):
+        return {}
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
@@ -0,0 +1,188 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cache_utils import TTLCache
+from tracing import tracer
+
+# One listing per author answers every query about them (seconds / models)
+HUB_STATS_TTL = float(os.getenv("HUB_STATS_TTL", "3600"))
+HUB_LISTING_LIMIT = int(os.getenv("HUB_LISTING_LIMIT", "100"))
+HUB_PREFETCH_WORKERS = int(os.getenv("HUB_PREFETCH_WORKERS", "8"))
+# Optional JSON snapshot of listings, used when the Hub can't be reached
+HUB_STATS_SNAPSHOT = os.getenv("HUB_STATS_SNAPSHOT")
+
+MODEL_FIELDS = ("id", "downloads", "likes", "pipeline_tag")
+
+
+def _model_record(model) -> dict:
+    return {field: getattr(model, field, None) for field in MODEL_FIELDS}
+
+
+class HubStats:
+    """
+    Cached per-author model listings from the Hugging Face Hub.
+
+    Each author costs one `list_models` request (the top `listing_limit` models
+    by downloads), kept for `ttl` seconds; the most downloaded model, top-N and
+    per-task leaders are all answered from that listing. Concurrent lookups of
+    the same author share one request, `prefetch` resolves several authors in
+    parallel, and with a `snapshot_path` every fetched listing is saved to disk
+    and served from there when the Hub is unreachable (or HF_HUB_OFFLINE=1).
+    """
+
+    def __init__(self, ttl: float = None, listing_limit: int = None, snapshot_path: str = None, fetch=None):
+        self.listing_limit = listing_limit or HUB_LISTING_LIMIT
+        self.snapshot_path = snapshot_path if snapshot_path is not None else HUB_STATS_SNAPSHOT
+        self.cache = TTLCache(maxsize=512, ttl=ttl if ttl is not None else HUB_STATS_TTL, name="hub_models")
+        self._fetch = fetch or self._list_models
+        self._snapshot = {}  # author -> {"fetched_at", "models"}
+        self._inflight = {}  # author -> Future of a running fetch
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            self.load_snapshot(self.snapshot_path)
+
+    def _list_models(self, author: str) -> list:
+        from huggingface_hub import list_models
+
+        # The Hub sorts by downloads in descending order (newer huggingface_hub has no `direction`)
+        return [_model_record(model) for model in list_models(author=author, sort="downloads", limit=self.listing_limit)]
+
+    @staticmethod
+    def _key(author: str) -> str:
+        return author.strip().lower()
+
+    def models(self, author: str) -> list:
+        """The author's models by downloads (descending), from cache, the Hub or the snapshot."""
+        key = self._key(author)
+        with tracer.span("hub.list_models", author=author, **{"cache.hit": True}) as span:
+            listing = self.cache.get(key)
+            if listing is not None:
+                return listing
+            with self._lock:
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+            if not owner:
+                # Someone else is fetching this author; share their result
+                return future.result()
+            span.set("cache.hit", False)
+            try:
+                listing = self._resolve(author, key, span)
+                future.set_result(listing)
+                return listing
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def _resolve(self, author: str, key: str, span) -> list:
+        offline = os.getenv("HF_HUB_OFFLINE", "").lower() in ("1", "true", "yes")
+        if not offline:
+            try:
+                listing = self._fetch(author)
+            except Exception as e:
+                if key not in self._snapshot:
+                    raise
+                print(f"Hub request for {author} failed ({e}), answering from the snapshot")
+            else:
+                self.cache.set(key, listing)
+                with self._lock:
+                    self._snapshot[key] = {"fetched_at": time.time(), "models": listing}
+                if self.snapshot_path:
+                    try:
+                        self.save_snapshot()
+                    except OSError as e:
+                        print(f"Could not save Hub snapshot to {self.snapshot_path}: {e}")
+                return listing
+        if key not in self._snapshot:
+            raise LookupError(f"{author} is not in the offline Hub snapshot")
+        span.set("snapshot", True)
+        return self._snapshot[key]["models"]
+
+    def prefetch(self, authors, max_workers: int = None) -> dict:
+        """Resolve several authors concurrently; returns author -> listing (None if it failed)."""
+        authors = list(dict.fromkeys(authors))
+
+        def resolve(author):
+            try:
+                return self.models(author)
+            except Exception as e:
+                print(f"Could not prefetch Hub models for {author}: {e}")
+                return None
+
+        if not authors:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(authors), max_workers or HUB_PREFETCH_WORKERS)) as pool:
+            # Each task runs in a copy of the caller's context so its span joins the caller's trace
+            futures = [pool.submit(contextvars.copy_context().run, resolve, author) for author in authors]
+        return {author: future.result() for author, future in zip(authors, futures)}
+
+    def most_downloaded(self, author: str):
+        models = self.models(author)
+        return models[0] if models else None
+
+    def top_models(self, author: str, n: int = 5, task: str = None) -> list:
+        """The `n` most downloaded models of an author, optionally for one pipeline task."""
+        models = self.models(author)
+        if task:
+            models = [model for model in models if model.get("pipeline_tag") == task]
+        return models[:n]
+
+    def task_leaders(self, author: str) -> dict:
+        """pipeline task -> the author's most downloaded model for it."""
+        leaders = {}
+        for model in self.models(author):
+            leaders.setdefault(model.get("pipeline_tag") or "unknown", model)
+        return leaders
+
+    def load_snapshot(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        with self._lock:
+            self._snapshot.update(snapshot.get("authors", {}))
+
+    def save_snapshot(self, path: str = None):
+        """Write every listing fetched so far (plus the loaded snapshot) to `path`."""
+        path = path or self.snapshot_path
+        with self._lock:
+            snapshot = {"saved_at": time.time(), "authors": dict(self._snapshot)}
+        tmp_path = f"{path}.tmp"
+        with self._save_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+
+
+_hub_stats = None
+_hub_stats_lock = threading.Lock()
+
+
+def get_hub_stats_service() -> HubStats:
+    """The shared HubStats instance used by the tools."""
+    global _hub_stats
+    with _hub_stats_lock:
+        if _hub_stats is None:
+            _hub_stats = HubStats()
+        return _hub_stats
+
+
+if __name__ == "__main__":
+    # Build or refresh an offline snapshot: python hub_stats.py snapshot.json author [author ...]
+    import sys
+
+    if len(sys.argv) < 3:
+        sys.exit("usage: python hub_stats.py SNAPSHOT.json AUTHOR [AUTHOR ...]")
+    service = HubStats(snapshot_path=sys.argv[1])
+    results = service.prefetch(sys.argv[2:])
+    service.save_snapshot()
+    for author, listing in results.items():
+        print(f"{author}: {len(listing) if listing is not None else 'failed'}")
+    print(f"Saved snapshot to {sys.argv[1]}")
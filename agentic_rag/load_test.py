@@ -0,0 +1,113 @@
+"""
+Load-test the Alfred server locally with a stubbed chat model and tool.
+
+    python load_test.py [--sessions 50] [--turns 4] [--latency 0.2] [--queue 64] [--workers 8] [--json]
+
+Starts server.py in-process on a free port (in-memory SQLite checkpointer, no
+API key or network needed) and runs `--sessions` concurrent conversations of
+`--turns` turns each. Every turn makes two "model calls" of `--latency`
+seconds around one tool call, like a real tool-using turn. Reports throughput,
+latency percentiles and how many requests were turned away (503) by
+backpressure; rejected turns are retried after the server's Retry-After.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def run_session(client, url, session_id, turns, latencies, counters):
+    thread_id = f"load-{session_id}"
+    for turn in range(turns):
+        payload = {"thread_id": thread_id, "message": f"session {session_id} turn {turn}"}
+        start = time.perf_counter()
+        while True:
+            async with client.post(f"{url}/chat", json=payload) as response:
+                if response.status == 503:
+                    counters["rejected"] += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                    continue
+                body = await response.json()
+                break
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            counters["errors"] += 1
+        elif not body["answer"].startswith(f"Answer #{turn + 1}:"):
+            # The thread's earlier turns were not restored from the checkpointer
+            counters["lost_state"] += 1
+
+
+async def main(args):
+    import aiohttp
+    from aiohttp import web
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from server import create_app
+    from stubs import StubChat, create_stub_lookup_tool
+
+    http_app = create_app(
+        chat_model=StubChat(latency=args.latency), tools=[create_stub_lookup_tool()], checkpoint_db=":memory:",
+        queue_size=args.queue, workers=args.workers,
+    )
+    runner = web.AppRunner(http_app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    latencies = []
+    counters = {"rejected": 0, "errors": 0, "lost_state": 0}
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                run_session(client, url, session_id, args.turns, latencies, counters)
+                for session_id in range(args.sessions)
+            ))
+            elapsed = time.perf_counter() - start
+            async with client.get(f"{url}/health") as response:
+                health = await response.json()
+    finally:
+        await runner.cleanup()
+
+    return {
+        "sessions": args.sessions,
+        "turns": len(latencies),
+        "seconds": elapsed,
+        "turns_per_second": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        **counters,
+        "server": health,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stub model call")
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['turns']} turns from {report['sessions']} sessions in {report['seconds']:.2f}s "
+              f"({report['turns_per_second']:.1f} turns/s)")
+        print(f"latency p50 {report['p50']:.3f}s · p95 {report['p95']:.3f}s · p99 {report['p99']:.3f}s")
+        print(f"rejected (503, retried) {report['rejected']} · errors {report['errors']} · lost state {report['lost_state']}")
@@ -0,0 +1,256 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from cache_utils import TTLCache
+from dense_index import default_embedder, normalize
+from tracing import tracer
+
+# Defaults (override via environment)
+RESPONSE_CACHE = os.getenv("ALFRED_RESPONSE_CACHE", "1").lower() not in ("0", "false", "no")
+SIMILARITY_THRESHOLD = float(os.getenv("ALFRED_CACHE_THRESHOLD", "0.9"))
+RESPONSE_CACHE_SIZE = int(os.getenv("ALFRED_CACHE_SIZE", "2048"))
+# Answers that only used stable sources (guest list, the model itself) are kept this long (seconds)
+ANSWER_TTL = float(os.getenv("ALFRED_CACHE_TTL", "86400"))
+# Answers that used a volatile tool expire with that tool's data; 0 means never cache them
+VOLATILE_TOOL_TTLS = {
+    "get_weather_info": float(os.getenv("WEATHER_FORECAST_TTL", "600")),
+    "duckduckgo_search": float(os.getenv("ALFRED_SEARCH_CACHE_TTL", "3600")),
+    "get_hub_stats": float(os.getenv("HUB_STATS_TTL", "3600")),
+    "get_hub_models": float(os.getenv("HUB_STATS_TTL", "3600")),
+}
+# Questions about "now" go stale even when no tool was called
+TIME_SENSITIVE = re.compile(r"\b(now|today|tonight|tomorrow|currently|current|latest|this (?:week|month|year))\b", re.I)
+TIME_SENSITIVE_TTL = float(os.getenv("ALFRED_SEARCH_CACHE_TTL", "3600"))
+CANDIDATES = 5  # nearest entries checked against the key-term guard
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# Words that don't change what a question is about
+STOPWORDS = frozenset("""
+a an the is are was were be been of in on at to for about me my i we you your tell what whats who whos whom whose
+which when where why how please can could would will do does did guest guests info information some any and or
+with from by it its this that there their know give show find get s let us
+""".split())
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cased words only, so exact repeats match regardless of punctuation."""
+    return " ".join(TOKEN.findall(query.lower().replace("'s", "").replace("’s", "")))
+
+
+def key_terms(query: str) -> frozenset:
+    """The words that say what a question is about (names, places, numbers...)."""
+    return frozenset(word for word in normalize_query(query).split() if word not in STOPWORDS)
+
+
+def compatible(terms: frozenset, other: frozenset) -> bool:
+    """
+    Guard against near-identical phrasings about different things ("weather in
+    Paris" / "weather in London" embed very close): one question's key terms
+    must contain the other's.
+    """
+    return terms <= other or other <= terms
+
+
+class SemanticCache:
+    """
+    Final answers of past questions, looked up by meaning.
+
+    A question is embedded and compared (cosine) with every cached question; the
+    closest one above `threshold` whose key terms are compatible is a hit and
+    its answer is returned without running the graph. Exact repeats (same
+    words) are answered before embedding anything. Each entry expires after
+    the shortest TTL of the tools its answer used (VOLATILE_TOOL_TTLS), or
+    ANSWER_TTL. If the embedder can't be created, only exact repeats are cached.
+    `metrics()` reports the hit rate and the seconds saved.
+    """
+
+    def __init__(self, embedder_factory=default_embedder, threshold: float = None, maxsize: int = None):
+        self.embedder_factory = embedder_factory
+        self.threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+        self.maxsize = maxsize or RESPONSE_CACHE_SIZE
+        self.entries = []  # dicts, row i of self.vectors
+        self.vectors = None
+        self._by_query = {}  # normalized question -> entry
+        self.stats = {
+            "lookups": 0, "hits": 0, "exact_hits": 0, "misses": 0, "stored": 0, "not_cached": 0,
+            "lookup_seconds": 0.0, "seconds_saved": 0.0,
+        }
+        self._embedder = None
+        self._embedder_failed = False
+        self._query_vectors = TTLCache(maxsize=256, ttl=60, name="response_cache_queries")
+        self._lock = threading.Lock()
+
+    def _embed(self, query: str):
+        """Unit embedding of a question, or None when embeddings are unavailable."""
+        key = normalize_query(query)
+        vector = self._query_vectors.get(key)
+        if vector is not None:
+            return vector
+        with self._lock:
+            if self._embedder is None and not self._embedder_failed:
+                try:
+                    self._embedder = self.embedder_factory()
+                except Exception as e:
+                    print(f"Semantic response cache unavailable, caching exact repeats only: {e}")
+                    self._embedder_failed = True
+        if self._embedder is None:
+            return None
+        try:
+            vector = normalize(self._embedder.embed_query(query))
+        except Exception as e:
+            print(f"Could not embed the question for the response cache: {e}")
+            return None
+        self._query_vectors.set(key, vector)
+        return vector
+
+    def _live(self, now):
+        return np.array([entry["expires_at"] > now for entry in self.entries], dtype=bool)
+
+    def lookup(self, query: str):
+        """
+        The cached answer for a question like `query`, or None. A hit is a dict
+        with "answer", "query" (the cached question), "similarity" and
+        "seconds_saved".
+        """
+        start = time.perf_counter()
+        with tracer.span("alfred.response_cache", **{"cache.hit": False}) as span:
+            hit = self._find(query)
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stats["lookups"] += 1
+                self.stats["lookup_seconds"] += seconds
+                if hit is None:
+                    self.stats["misses"] += 1
+                    return None
+                entry, similarity = hit
+                entry["hits"] += 1
+                entry["last_used"] = time.monotonic()
+                saved = max(0.0, entry["seconds"] - seconds)
+                self.stats["hits"] += 1
+                self.stats["exact_hits"] += 1 if similarity is None else 0
+                self.stats["seconds_saved"] += saved
+            span.set("cache.hit", True)
+            span.set("similarity", similarity if similarity is not None else 1.0)
+        return {
+            "answer": entry["answer"],
+            "query": entry["query"],
+            "similarity": similarity if similarity is not None else 1.0,
+            "seconds_saved": saved,
+        }
+
+    def _find(self, query: str):
+        """(entry, similarity) of the best live match; similarity is None for an exact repeat."""
+        now = time.monotonic()
+        normalized = normalize_query(query)
+        with self._lock:
+            entry = self._by_query.get(normalized)
+            if entry is not None and entry["expires_at"] > now:
+                return entry, None
+            if not self.entries:
+                return None
+        vector = self._embed(query)
+        if vector is None:
+            return None
+        terms = key_terms(query)
+        with self._lock:
+            if self.vectors is None:
+                return None
+            scores = self.vectors @ vector
+            scores[~self._live(now)] = -np.inf
+            for row in np.argsort(-scores)[:CANDIDATES]:
+                if scores[row] < self.threshold:
+                    break
+                entry = self.entries[row]
+                if compatible(terms, entry["terms"]):
+                    return entry, float(scores[row])
+        return None
+
+    def ttl_for(self, query: str, tools_used) -> float:
+        """Seconds an answer may be reused: the shortest TTL of the volatile tools it used."""
+        ttls = [ANSWER_TTL] + [VOLATILE_TOOL_TTLS[name] for name in tools_used if name in VOLATILE_TOOL_TTLS]
+        if TIME_SENSITIVE.search(query):
+            ttls.append(TIME_SENSITIVE_TTL)
+        return min(ttls)
+
+    def store(self, query: str, answer, tools_used=(), seconds: float = 0.0, failed: bool = False) -> bool:
+        """
+        Cache the final answer of a fresh run that took `seconds`; returns
+        whether it was cached. Runs where a tool `failed` are not cached.
+        """
+        ttl = self.ttl_for(query, tools_used)
+        if failed or not isinstance(answer, str) or not answer.strip() or ttl <= 0:
+            with self._lock:
+                self.stats["not_cached"] += 1
+            return False
+        vector = self._embed(query)
+        now = time.monotonic()
+        entry = {
+            "query": query, "normalized": normalize_query(query), "terms": key_terms(query), "vector": vector,
+            "answer": answer, "tools": sorted(set(tools_used)), "seconds": seconds,
+            "expires_at": now + ttl, "last_used": now, "hits": 0,
+        }
+        with self._lock:
+            # Drop expired entries and an earlier answer to the same question, then evict least recently used
+            entries = [e for e in self.entries if e["normalized"] != entry["normalized"] and e["expires_at"] > now]
+            if len(entries) >= self.maxsize:
+                entries.sort(key=lambda e: e["last_used"])
+                entries = entries[len(entries) - self.maxsize + 1:]
+            entries.append(entry)
+            self.entries = entries
+            self.vectors = self._matrix(entries)
+            self._by_query = {e["normalized"]: e for e in entries}
+            self.stats["stored"] += 1
+        return True
+
+    @staticmethod
+    def _matrix(entries):
+        """Row i is entry i's unit vector; entries that couldn't be embedded get a zero row (exact match only)."""
+        dim = next((len(e["vector"]) for e in entries if e["vector"] is not None), None)
+        if dim is None:
+            return None
+        zeros = np.zeros(dim, dtype=np.float32)
+        return np.vstack([e["vector"] if e["vector"] is not None else zeros for e in entries]).astype(np.float32)
+
+    def clear(self):
+        with self._lock:
+            self.entries = []
+            self.vectors = None
+            self._by_query = {}
+
+    def metrics(self) -> dict:
+        """Hit rate, seconds saved and lookup overhead so far."""
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self.entries)
+        lookups = stats["lookups"]
+        return {
+            **stats,
+            "size": size,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "mean_lookup_ms": stats["lookup_seconds"] / lookups * 1000 if lookups else 0.0,
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The shared SemanticCache used by app.py, or None when ALFRED_RESPONSE_CACHE=0."""
+    global _response_cache
+    if not RESPONSE_CACHE:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = SemanticCache()
+        return _response_cache
+
+
+def tools_used(messages):
+    """(names of the tools called in a run's messages, whether any of them failed)."""
+    results = [message for message in messages if getattr(message, "type", None) == "tool"]
+    return [message.name for message in results if message.name], any(message.status == "error" for message in results)
@@ -1,39 +1,109 @@
-import datasets
-from langchain_core.documents import Document
-from langchain_community.retrievers import BM25Retriever
-from langchain.tools import Tool
-
-# Load the dataset
-guest_dataset = datasets.load_dataset("agents-course/unit3-invitees", split="train")
-
-# Convert dataset entries into Document objects
-docs = [
-    Document(
-        page_content="\n".join([
-            f"Name: {guest['name']}",
-            f"Relation: {guest['relation']}",
-            f"Description: {guest['description']}",
-            f"Email: {guest['email']}"
-        ]),
-        metadata={"name": guest["name"]}
-    )
-    for guest in guest_dataset
-]
+import asyncio
+import os
+import threading
+
+from tracing import tracer
+
+# The guest index, BM25 engine and LangChain retrievers are built on first
+# use (get_guest_retriever), so importing this module is cheap.
+
+# "hybrid" (BM25 + dense embeddings) or "bm25"
+RETRIEVAL_MODE = os.getenv("GUEST_RETRIEVAL", "hybrid")
+
+_components = {}
+_lock = threading.RLock()  # components build on each other
+
+
+def _component(name: str, build):
+    """Build a shared component once, even if several threads ask at the same time."""
+    if name not in _components:
+        with _lock:
+            if name not in _components:
+                _components[name] = build()
+    return _components[name]
+
+
+def get_guest_index():
+    """Load the prebuilt guest index (built from the dataset only when missing or stale)."""
+    from guest_index import load_or_build_index
+
+    return _component("guest_index", load_or_build_index)
+
+
+def get_docs():
+    """Convert indexed entries into Document objects."""
+    def build():
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=doc["page_content"], metadata=doc["metadata"])
+            for doc in get_guest_index()["documents"]
+        ]
+
+    return _component("docs", build)
+
+
+def get_bm25_engine():
+    from bm25_engine import SparseBM25
+
+    return _component("bm25_engine", lambda: SparseBM25.from_index(get_guest_index()))
+
+
+def get_bm25_retriever():
+    """BM25-only guest retriever."""
+    from guest_retrievers import SparseBM25Retriever
+
+    return _component("bm25_retriever", lambda: SparseBM25Retriever(engine=get_bm25_engine(), docs=get_docs()))
+
+
+def get_guest_retriever():
+    """Retriever used by the guest tool, per GUEST_RETRIEVAL."""
+    def build():
+        if RETRIEVAL_MODE != "hybrid":
+            return get_bm25_retriever()
+        from guest_retrievers import HybridRetriever
+
+        return HybridRetriever(engine=get_bm25_engine(), docs=get_docs(), index=get_guest_index())
+
+    return _component("guest_retriever", build)
 
-# Create the BM25 retriever
-bm25_retriever = BM25Retriever.from_documents(docs)
 
 def extract_text(query: str) -> str:
     """Retrieves detailed information about gala guests based on their name or relation."""
-    results = bm25_retriever.invoke(query)
+    with tracer.span("tool.guest_info", **{"retrieval.mode": RETRIEVAL_MODE}) as span:
+        results = get_guest_retriever().invoke(query)
+        span.set("results", len(results))
     if results:
         return "\n\n".join([doc.page_content for doc in results[:3]])
     else:
         return "No matching guest information found."
 
-# Create the guest info tool
-guest_info_tool = Tool(
-    name="guest_info_retriever",
-    func=extract_text,
-    description="Retrieves detailed information about gala guests based on their name or relation."
-)
\ No newline at end of file
+async def aextract_text(query: str) -> str:
+    return await asyncio.to_thread(extract_text, query)
+
+def create_guest_info_tool():
+    """Create the guest info tool."""
+    from langchain_core.tools import Tool
+
+    return Tool(
+        name="guest_info_retriever",
+        func=extract_text,
+        coroutine=aextract_text,
+        description="Retrieves detailed information about gala guests based on their name or relation."
+    )
+
+
+def __getattr__(name):
+    # Module-level names kept for compatibility, built on first access
+    lazy = {
+        "guest_info_tool": create_guest_info_tool,
+        "guest_index": get_guest_index,
+        "docs": get_docs,
+        "bm25_engine": get_bm25_engine,
+        "bm25_retriever": get_bm25_retriever,
+        "guest_retriever": get_guest_retriever,
+    }
+    if name in lazy:
+        value = globals()[name] = lazy[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
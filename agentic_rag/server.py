@@ -0,0 +1,189 @@
+"""
+Multi-session HTTP server for Alfred.
+
+    python server.py [--port 8080]
+
+One compiled graph serves every conversation; per-conversation state lives in
+a LangGraph checkpointer (SQLite when langgraph-checkpoint-sqlite is
+installed, in memory otherwise) keyed by `thread_id`.
+
+    POST /chat            {"thread_id": "...", "message": "..."} -> {"thread_id", "answer", "seconds"}
+    GET  /threads/{id}    messages stored for a conversation
+    GET  /health          queue depth and request counters
+
+Requests wait in a bounded queue drained by a fixed number of workers. When
+the queue is full the server answers 503 with a Retry-After header instead of
+piling up work, and turns of the same thread run one at a time.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+from contextlib import AsyncExitStack
+
+from aiohttp import web
+
+from tracing import tracer
+
+# Defaults (override via environment)
+CHECKPOINT_DB = os.getenv("ALFRED_CHECKPOINT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alfred_checkpoints.sqlite"))
+QUEUE_SIZE = int(os.getenv("ALFRED_QUEUE_SIZE", "64"))
+WORKERS = int(os.getenv("ALFRED_SERVER_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("ALFRED_REQUEST_TIMEOUT", "120"))
+RETRY_AFTER = 1  # seconds suggested to clients when the queue is full
+
+
+async def open_checkpointer(stack: AsyncExitStack, path: str = CHECKPOINT_DB):
+    """SQLite checkpointer if available, else an in-memory one (state is lost on restart)."""
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError:
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        print("langgraph-checkpoint-sqlite not installed, keeping conversations in memory")
+        return InMemorySaver()
+    return await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(path))
+
+
+class AlfredServer:
+    """Bounded request queue and worker pool in front of one compiled Alfred graph."""
+
+    def __init__(self, graph, queue_size: int = None, workers: int = None, request_timeout: float = None):
+        self.graph = graph
+        self.queue = asyncio.Queue(maxsize=queue_size or QUEUE_SIZE)
+        self.n_workers = workers or WORKERS
+        self.request_timeout = request_timeout or REQUEST_TIMEOUT
+        self.thread_locks = {}  # thread_id -> (lock, waiting requests)
+        self.workers = []
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "in_flight": 0}
+
+    async def start(self):
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.n_workers)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    def submit(self, thread_id: str, message: str):
+        """Queue a turn; returns a future for its answer, or None if the queue is full."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((thread_id, message, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return None
+        self.stats["accepted"] += 1
+        return future
+
+    async def _worker(self):
+        while True:
+            thread_id, message, future = await self.queue.get()
+            try:
+                if not future.done():
+                    self.stats["in_flight"] += 1
+                    try:
+                        future.set_result(await self.run_turn(thread_id, message))
+                        self.stats["completed"] += 1
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        if not future.done():
+                            future.set_exception(e)
+                    finally:
+                        self.stats["in_flight"] -= 1
+            finally:
+                self.queue.task_done()
+
+    async def run_turn(self, thread_id: str, message: str) -> str:
+        """Run one user turn on a conversation; turns of the same thread are serialized."""
+        from langchain_core.messages import HumanMessage
+
+        lock, waiting = self.thread_locks.setdefault(thread_id, (asyncio.Lock(), [0]))
+        waiting[0] += 1
+        try:
+            async with lock:
+                config = {"configurable": {"thread_id": thread_id}}
+                with tracer.span("alfred.server.turn", thread_id=thread_id):
+                    result = await asyncio.wait_for(
+                        self.graph.ainvoke({"messages": [HumanMessage(content=message)]}, config),
+                        self.request_timeout,
+                    )
+        finally:
+            waiting[0] -= 1
+            if not waiting[0]:
+                del self.thread_locks[thread_id]
+        return result["messages"][-1].content
+
+    async def history(self, thread_id: str):
+        state = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})
+        return [{"type": m.type, "content": m.content} for m in state.values.get("messages", [])]
+
+
+async def handle_chat(request):
+    server = request.app["alfred_server"]
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Body must be JSON")
+    message = (body.get("message") or "").strip()
+    if not message:
+        raise web.HTTPBadRequest(text="'message' is required")
+    thread_id = body.get("thread_id") or uuid.uuid4().hex
+
+    start = time.perf_counter()
+    future = server.submit(thread_id, message)
+    if future is None:
+        raise web.HTTPServiceUnavailable(text="Server busy, retry later", headers={"Retry-After": str(RETRY_AFTER)})
+    try:
+        answer = await future
+    except asyncio.TimeoutError:
+        raise web.HTTPGatewayTimeout(text="Alfred took too long to answer")
+    except Exception as e:
+        return web.json_response({"thread_id": thread_id, "error": str(e)}, status=500)
+    return web.json_response({"thread_id": thread_id, "answer": answer, "seconds": time.perf_counter() - start})
+
+
+async def handle_history(request):
+    server = request.app["alfred_server"]
+    thread_id = request.match_info["thread_id"]
+    return web.json_response({"thread_id": thread_id, "messages": await server.history(thread_id)})
+
+
+async def handle_health(request):
+    server = request.app["alfred_server"]
+    return web.json_response({"queue": server.queue.qsize(), "max_queue": server.queue.maxsize, **server.stats})
+
+
+def create_app(chat_model=None, tools: list = None, checkpoint_db: str = None, **server_options) -> web.Application:
+    """
+    Build the aiohttp application. The graph is compiled once at startup with
+    the checkpointer; `chat_model` / `tools` are passed to create_alfred (e.g. stubs).
+    """
+    from app import create_alfred
+
+    async def lifespan(http_app):
+        async with AsyncExitStack() as stack:
+            checkpointer = await open_checkpointer(stack, checkpoint_db or CHECKPOINT_DB)
+            graph = create_alfred(chat_model=chat_model, tools=tools, checkpointer=checkpointer)
+            server = AlfredServer(graph, **server_options)
+            await server.start()
+            http_app["alfred_server"] = server
+            yield
+            await server.stop()
+
+    http_app = web.Application()
+    http_app.cleanup_ctx.append(lifespan)
+    http_app.router.add_post("/chat", handle_chat)
+    http_app.router.add_get("/threads/{thread_id}", handle_history)
+    http_app.router.add_get("/health", handle_health)
+    return http_app
+
+
+def main():
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 8080
+    web.run_app(create_app(), port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Deterministic local stand-ins for Alfred's external services, for load tests
+and benchmarks: a chat model that calls tools on a script, and a tiny HTTP
+server that answers like Open-Meteo and the Hugging Face Hub. Both take an
+injected latency so results don't depend on the network.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class StubChat(BaseChatModel):
+    """
+    Chat model stand-in. On a new user message it calls every tool in
+    `tool_names` at once with the message as input; once the results are in it
+    answers with them. Each call takes `latency` seconds.
+    """
+
+    latency: float = 0.2
+    tool_names: list = ["stub_lookup"]
+    calls: int = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        if isinstance(messages[-1], ToolMessage) or not self.tool_names:
+            turns = sum(1 for m in messages if m.type == "human")
+            results = [m.content for m in messages[-len(self.tool_names):] if isinstance(m, ToolMessage)]
+            return AIMessage(content=f"Answer #{turns}: " + " | ".join(results))
+        query = messages[-1].content
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": {"__arg1": query}, "id": f"call-{i}-{time.monotonic_ns()}"}
+            for i, name in enumerate(self.tool_names)
+        ])
+
+    def _result(self, messages):
+        message = self._reply(messages)
+        # Rough usage (4 characters per token) so token accounting has numbers to report
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(str(message.content)) // 4 + 10 * len(message.tool_calls)
+        message.usage_metadata = {
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+
+class StubEmbeddings:
+    """
+    Embedding-model stand-in: a hashed bag of words (stopwords dropped, see
+    response_cache.STOPWORDS), so paraphrases about the same thing come out
+    close. Each call takes `latency` seconds.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text):
+        from response_cache import STOPWORDS, normalize_query
+
+        vector = [0.0] * self.dim
+        for word in normalize_query(text).split():
+            if word not in STOPWORDS:
+                vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+        return vector
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+
+def create_stub_lookup_tool():
+    """Single-input tool that echoes its query (the default tool StubChat calls)."""
+    from langchain_core.tools import Tool
+
+    return Tool(name="stub_lookup", func=lambda query: f"looked up '{query}'", description="Pretend lookup.")
+
+
+def _geocoding(params):
+    name = params.get("name", [""])[0]
+    rng = random.Random(name)
+    return {"results": [{"name": name.title(), "country": "Stubland", "latitude": rng.uniform(-60, 60), "longitude": rng.uniform(-180, 180)}]}
+
+
+def _forecast(params):
+    rng = random.Random(params.get("latitude", ["0"])[0])
+    return {"current": {
+        "temperature_2m": round(rng.uniform(-5, 30), 1),
+        "relative_humidity_2m": rng.randint(20, 95),
+        "apparent_temperature": round(rng.uniform(-8, 32), 1),
+        "wind_speed_10m": round(rng.uniform(0, 40), 1),
+        "weather_code": rng.choice([0, 1, 2, 3, 61, 71]),
+    }}
+
+
+HUB_TASKS = ["text-generation", "text-classification", "image-classification", "automatic-speech-recognition"]
+
+
+def _hub_models(params):
+    author = params.get("author", ["stub"])[0]
+    limit = min(int(params.get("limit", ["1"])[0]), 40)
+    return [
+        {
+            "_id": f"{author}-{i}", "id": f"{author}/model-{i}", "modelId": f"{author}/model-{i}",
+            "downloads": 1_000_000 // (i + 1), "likes": 1000 // (i + 1), "pipeline_tag": HUB_TASKS[i % len(HUB_TASKS)],
+        }
+        for i in range(limit)
+    ]
+
+
+class StubSearch:
+    """DuckDuckGo stand-in for web_search.WebSearch(fetch=...): ranked results after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+
+    def __call__(self, query, max_results):
+        self.requests += 1
+        time.sleep(self.latency)
+        rng = random.Random(query.lower())
+        # Overlapping links across related queries, like real search results
+        return [
+            {"title": f"{query} ({i})", "snippet": f"Something about {query}.", "link": f"https://example.org/{rng.randint(0, 20)}"}
+            for i in range(max_results)
+        ]
+
+
+ROUTES = {
+    "/v1/search": _geocoding,
+    "/v1/forecast": _forecast,
+    "/api/models": _hub_models,
+}
+
+
+class StubHTTPServer:
+    """
+    Threaded local HTTP server for the tool endpoints, run in the background:
+
+        with StubHTTPServer(latency=0.02) as server:
+            tools.GEOCODING_URL = server.url + "/v1/search"
+    """
+
+    def __init__(self, latency: float = 0.0, routes: dict = None):
+        self.latency = latency
+        self.routes = routes or ROUTES
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                url = urlparse(self.path)
+                route = stub.routes.get(url.path)
+                time.sleep(stub.latency)
+                if route is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(route(parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
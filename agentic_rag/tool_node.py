@@ -0,0 +1,74 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from tracing import tracer
+
+# Defaults (override via environment)
+TOOL_CONCURRENCY = int(os.getenv("ALFRED_TOOL_CONCURRENCY", "4"))
+TOOL_TIMEOUT = float(os.getenv("ALFRED_TOOL_TIMEOUT", "30"))
+
+
+class ParallelToolNode:
+    """
+    Graph node that runs all tool calls of the last AI message concurrently.
+
+    Calls go through each tool's async entry point under a shared concurrency
+    cap, each with its own timeout, so a turn that asks for several tools costs
+    about as long as the slowest one. Failures and timeouts are returned to the
+    model as error ToolMessages instead of aborting the graph.
+    """
+
+    def __init__(self, tools, max_concurrency: int = None, timeout: float = None, timeouts: dict = None):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_concurrency = max_concurrency or TOOL_CONCURRENCY
+        self.timeout = timeout or TOOL_TIMEOUT
+        self.timeouts = timeouts or {}  # per-tool overrides
+
+    async def _run_call(self, call, semaphore):
+        name = call["name"]
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: {name} is not a valid tool, try one of {list(self.tools_by_name)}.",
+                name=name, tool_call_id=call["id"], status="error",
+            )
+        timeout = self.timeouts.get(name, self.timeout)
+        async with semaphore:
+            with tracer.span("alfred.tool_call", **{"tool.name": name}) as span:
+                try:
+                    # Invoking with the full tool call returns a ToolMessage
+                    return await asyncio.wait_for(tool.ainvoke({**call, "type": "tool_call"}), timeout)
+                except asyncio.TimeoutError:
+                    content = f"Error: {name} timed out after {timeout:g}s."
+                    span.set("timeout", True)
+                except Exception as e:
+                    content = f"Error: {e!r}\n Please fix your mistakes."
+                span.error = content
+        return ToolMessage(content=content, name=name, tool_call_id=call["id"], status="error")
+
+    async def ainvoke(self, state):
+        message = state["messages"][-1]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        with tracer.span("alfred.tools", tool_calls=len(message.tool_calls)):
+            results = await asyncio.gather(*(self._run_call(call, semaphore) for call in message.tool_calls))
+        return {"messages": list(results)}
+
+    def invoke(self, state):
+        # Sync graph runs (alfred.invoke) usually execute nodes in threads with no event loop
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.ainvoke(state))
+        # A loop is already running here (e.g. alfred.invoke in Jupyter): run the calls on a
+        # separate thread with its own loop, keeping the context so spans stay nested
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(context.run, asyncio.run, self.ainvoke(state)).result()
+
+    def as_runnable(self, name: str = "tools"):
+        return RunnableLambda(self.invoke, afunc=self.ainvoke, name=name)
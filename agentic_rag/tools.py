@@ -1,37 +1,112 @@
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain.tools import Tool
-from huggingface_hub import list_models
-import requests
+import asyncio
+import os
+
+from cache_utils import HTTP_TIMEOUT, TTLCache, make_session
+from tracing import tracer
+
+# LangChain, huggingface_hub, requests and the search backend are imported on
+# first use; the Tool objects below are created lazily by __getattr__.
+
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+# Current conditions barely change within this window (seconds)
+FORECAST_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "600"))
+
+# Shared pooled session and caches for the weather tool: coordinates of a
+# place never change, so geocoding results are kept until evicted (LRU)
+_http_session = None
+geocode_cache = TTLCache(maxsize=1024, ttl=None, name="geocoding")
+forecast_cache = TTLCache(maxsize=256, ttl=FORECAST_TTL, name="forecast")
+
+
+def _tool_error(message: str):
+    """A ToolException: the model still sees `message`, but the ToolMessage is marked status="error"."""
+    from langchain_core.tools import ToolException
+    
+    return ToolException(message)
+
+
+def http_session():
+    """Return the pooled HTTP session shared by the tools, creating it on first use."""
+    global _http_session
+    if _http_session is None:
+        _http_session = make_session()
+    return _http_session
+
+
+def _retries(response) -> int:
+    """Number of retries urllib3 made before this response."""
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+def geocode(location: str):
+    """Return the best Open-Meteo geocoding match for a place name, or None."""
+    with tracer.span("weather.geocode", **{"cache.hit": True}) as span:
+        def fetch():
+            span.set("cache.hit", False)
+            response = http_session().get(
+                GEOCODING_URL,
+                params={"name": location, "count": 1, "language": "en", "format": "json"},
+                timeout=HTTP_TIMEOUT,
+            )
+            span.set("retries", _retries(response))
+            response.raise_for_status()
+            results = response.json().get("results")
+            return results[0] if results else None
+
+        return geocode_cache.get_or_set(" ".join(location.lower().split()), fetch)
+
+
+def current_weather(lat: float, lon: float) -> dict:
+    """Return Open-Meteo's current conditions for a coordinate."""
+    with tracer.span("weather.forecast", **{"cache.hit": True}) as span:
+        def fetch():
+            span.set("cache.hit", False)
+            response = http_session().get(
+                FORECAST_URL,
+                params={
+                    "latitude": lat,
+                    "longitude": lon,
+                    "current": "temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m",
+                    "temperature_unit": "celsius",
+                },
+                timeout=HTTP_TIMEOUT,
+            )
+            span.set("retries", _retries(response))
+            response.raise_for_status()
+            return response.json()["current"]
+
+        return forecast_cache.get_or_set((round(lat, 4), round(lon, 4)), fetch)
+
+
+def weather_cache_stats() -> list:
+    """Hit/miss counters of the weather tool caches."""
+    return [geocode_cache.stats(), forecast_cache.stats()]
 
-# Export DuckDuckGoSearchRun directly for use
-# Note: This will be used as DuckDuckGoSearchRun() in the importing file
 
 def get_weather_info(location: str) -> str:
     """Fetches real weather information for a given location using Open-Meteo API."""
+    with tracer.span("tool.get_weather_info", location=location):
+        return _get_weather_info(location)
+
+def _get_weather_info(location: str) -> str:
+    import requests
+    
     try:
         # First, geocode the location to get coordinates
-        geocoding_url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
-        geo_response = requests.get(geocoding_url)
-        geo_response.raise_for_status()
-        geo_data = geo_response.json()
-        
-        if not geo_data.get("results"):
+        place = geocode(location)
+        if not place:
             return f"Location '{location}' not found."
         
         # Get coordinates
-        lat = geo_data["results"][0]["latitude"]
-        lon = geo_data["results"][0]["longitude"]
-        city_name = geo_data["results"][0]["name"]
-        country = geo_data["results"][0].get("country", "")
-        
-        # Get weather data
-        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m&temperature_unit=celsius"
-        weather_response = requests.get(weather_url)
-        weather_response.raise_for_status()
-        weather_data = weather_response.json()
+        lat = place["latitude"]
+        lon = place["longitude"]
+        city_name = place["name"]
+        country = place.get("country", "")
         
-        # Parse current weather
-        current = weather_data["current"]
+        # Get current weather
+        current = current_weather(lat, lon)
         temp = current["temperature_2m"]
         humidity = current["relative_humidity_2m"]
         feels_like = current["apparent_temperature"]
@@ -60,37 +135,169 @@ def get_weather_info(location: str) -> str:
                 f"Humidity: {humidity}%\n"
                 f"Wind Speed: {wind_speed} km/h")
         
+    # Raised, not returned, so answers built on a failed lookup aren't cached
     except requests.exceptions.RequestException as e:
-        return f"Error fetching weather data: {str(e)}"
+        raise _tool_error(f"Error fetching weather data: {str(e)}")
     except KeyError as e:
-        return f"Error parsing weather data: {str(e)}"
+        raise _tool_error(f"Error parsing weather data: {str(e)}")
     except Exception as e:
-        return f"Unexpected error: {str(e)}"
+        raise _tool_error(f"Unexpected error: {str(e)}")
 
 def get_hub_stats(author: str) -> str:
-    """Fetches the most downloaded model from a specific author on the Hugging Face Hub."""
+    """Fetches the most downloaded model from a specific author (or several, comma-separated) on the Hugging Face Hub."""
+    with tracer.span("tool.get_hub_stats", author=author):
+        authors = [name.strip() for name in author.split(",") if name.strip()]
+        if len(authors) > 1:
+            from hub_stats import get_hub_stats_service
+            
+            # Resolve every author's listing concurrently, then answer from the cache
+            get_hub_stats_service().prefetch(authors)
+            lines, failed = [], False
+            for name in authors:
+                try:
+                    lines.append(_get_hub_stats(name))
+                except Exception as e:
+                    lines.append(str(e))
+                    failed = True
+            if failed:
+                raise _tool_error("\n".join(lines))
+            return "\n".join(lines)
+        return _get_hub_stats(author)
+
+def _get_hub_stats(author: str) -> str:
     try:
-        # List models from the specified author, sorted by downloads
-        models = list(list_models(author=author, sort="downloads", direction=-1, limit=1))
+        from hub_stats import get_hub_stats_service
+        
+        # One cached listing per author (see hub_stats.py)
+        model = get_hub_stats_service().most_downloaded(author)
 
-        if models:
-            model = models[0]
-            return f"The most downloaded model by {author} is {model.id} with {model.downloads:,} downloads."
+        if model:
+            return f"The most downloaded model by {author} is {model['id']} with {model['downloads']:,} downloads."
         else:
             return f"No models found for author {author}."
     except Exception as e:
-        return f"Error fetching models for {author}: {str(e)}"
-
-# Initialize the weather info tool
-weather_info_tool = Tool(
-    name="get_weather_info",
-    func=get_weather_info,
-    description="Fetches real-time weather information for a given location using Open-Meteo API."
-)
-
-# Initialize the hub stats tool
-hub_stats_tool = Tool(
-    name="get_hub_stats",
-    func=get_hub_stats,
-    description="Fetches the most downloaded model from a specific author on the Hugging Face Hub."
-)
\ No newline at end of file
+        raise _tool_error(f"Error fetching models for {author}: {str(e)}")
+
+def _format_model(model) -> str:
+    task = model.get("pipeline_tag") or "unknown task"
+    return f"{model['id']} ({task}, {model['downloads']:,} downloads, {model.get('likes') or 0:,} likes)"
+
+def get_hub_models(author: str, top_n: int = 5, task: str = "", per_task: bool = False) -> str:
+    """Lists an author's most downloaded Hub models, optionally for one task, or the leader of each task."""
+    with tracer.span("tool.get_hub_models", author=author, per_task=per_task):
+        try:
+            from hub_stats import get_hub_stats_service
+            
+            service = get_hub_stats_service()
+            if per_task:
+                leaders = service.task_leaders(author)
+                if not leaders:
+                    return f"No models found for author {author}."
+                lines = [f"- {task_name}: {_format_model(model)}" for task_name, model in leaders.items()]
+                return f"Most downloaded model per task for {author}:\n" + "\n".join(lines)
+            models = service.top_models(author, n=max(1, int(top_n)), task=task or None)
+            if not models:
+                return f"No {task + ' ' if task else ''}models found for author {author}."
+            lines = [f"{i}. {_format_model(model)}" for i, model in enumerate(models, 1)]
+            return f"Top {len(models)} {task + ' ' if task else ''}models by {author}:\n" + "\n".join(lines)
+        except Exception as e:
+            raise _tool_error(f"Error fetching models for {author}: {str(e)}")
+
+# Async variants: the blocking HTTP calls run in worker threads so several
+# tool calls from one assistant turn can overlap
+async def aget_weather_info(location: str) -> str:
+    return await asyncio.to_thread(get_weather_info, location)
+
+async def aget_hub_stats(author: str) -> str:
+    return await asyncio.to_thread(get_hub_stats, author)
+
+async def aget_hub_models(author: str, top_n: int = 5, task: str = "", per_task: bool = False) -> str:
+    return await asyncio.to_thread(get_hub_models, author, top_n, task, per_task)
+
+def web_search(query: str) -> str:
+    """Searches DuckDuckGo; several queries separated by ';' are searched at once and their results merged."""
+    with tracer.span("tool.duckduckgo_search", query=query):
+        from web_search import format_results, get_web_search, split_queries
+        
+        # Cached and shared between identical searches (see web_search.py)
+        results, failed = get_web_search().search_many(split_queries(query) or [query])
+        text = format_results(results, failed)
+        if failed:
+            raise _tool_error(text)
+        return text
+
+async def aweb_search(query: str) -> str:
+    return await asyncio.to_thread(web_search, query)
+
+def search_cache_stats() -> dict:
+    """Hit/miss and request counters of the web search cache."""
+    from web_search import get_web_search
+    
+    return get_web_search().stats()
+
+def create_search_tool():
+    """Initialize the web search tool."""
+    from langchain_core.tools import Tool
+    
+    return Tool(
+        name="duckduckgo_search",
+        func=web_search,
+        coroutine=aweb_search,
+        handle_tool_error=True,
+        description=(
+            "A wrapper around DuckDuckGo Search. Useful for when you need to answer questions about current events. "
+            "Input should be a search query; to look up several things at once, separate the queries with ';'."
+        ),
+    )
+
+def create_weather_info_tool():
+    """Initialize the weather info tool."""
+    from langchain_core.tools import Tool
+    
+    return Tool(
+        name="get_weather_info",
+        func=get_weather_info,
+        coroutine=aget_weather_info,
+        handle_tool_error=True,
+        description="Fetches real-time weather information for a given location using Open-Meteo API."
+    )
+
+def create_hub_stats_tool():
+    """Initialize the hub stats tool."""
+    from langchain_core.tools import Tool
+    
+    return Tool(
+        name="get_hub_stats",
+        func=get_hub_stats,
+        coroutine=aget_hub_stats,
+        handle_tool_error=True,
+        description="Fetches the most downloaded model from a specific author on the Hugging Face Hub (several authors can be given, comma-separated)."
+    )
+
+def create_hub_models_tool():
+    """Initialize the Hub top-models / per-task leaders tool."""
+    from langchain_core.tools import StructuredTool
+    
+    return StructuredTool.from_function(
+        func=get_hub_models,
+        coroutine=aget_hub_models,
+        handle_tool_error=True,
+        name="get_hub_models",
+        description=(
+            "Lists the most downloaded Hugging Face Hub models of an author: the top `top_n` overall or for one "
+            "pipeline `task` (e.g. text-generation), or with per_task=true the leading model of each task."
+        ),
+    )
+
+_LAZY_TOOLS = {
+    "weather_info_tool": create_weather_info_tool,
+    "hub_stats_tool": create_hub_stats_tool,
+    "hub_models_tool": create_hub_models_tool,
+}
+
+def __getattr__(name):
+    # Build module-level tools on first access and keep them
+    if name in _LAZY_TOOLS:
+        value = globals()[name] = _LAZY_TOOLS[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,198 @@
+"""
+Minimal in-process tracing with OpenTelemetry-compatible JSON export.
+
+    from tracing import tracer
+
+    with tracer.span("tool.get_weather_info", location=location) as span:
+        ...
+        span.set("cache.hit", True)
+
+Spans nest through contextvars (so they follow asyncio tasks and
+asyncio.to_thread; thread pool tasks must be submitted with the caller's
+context), keep wall time, attributes and error status, and can be written as
+OTLP/JSON (one ExportTraceServiceRequest per line) with `export()`. A tracer
+with a `trace_file` exports every finished trace there automatically. Token
+usage uses the OpenTelemetry GenAI attribute names.
+
+The module-level `tracer` at the bottom is the only project-specific part:
+its service name and the environment variable naming its trace file.
+"""
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_TRACES = 200  # finished traces kept in memory for summaries
+
+INPUT_TOKENS = "gen_ai.usage.input_tokens"
+OUTPUT_TOKENS = "gen_ai.usage.output_tokens"
+THINKING_TOKENS = "gen_ai.usage.reasoning_tokens"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._start = time.perf_counter()
+        self.seconds = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount=1):
+        """Increment a numeric attribute (e.g. retries or token counts)."""
+        self.attributes[key] = self.attributes.get(key, 0) + (amount or 0)
+
+    def record_usage(self, usage):
+        """Add token counts from a LangChain usage_metadata dict or a google-genai UsageMetadata."""
+        if not usage:
+            return
+        if isinstance(usage, dict):
+            details = usage.get("output_token_details") or {}
+            self.add(INPUT_TOKENS, usage.get("input_tokens"))
+            self.add(OUTPUT_TOKENS, usage.get("output_tokens"))
+            self.add(THINKING_TOKENS, details.get("reasoning"))
+        else:
+            self.add(INPUT_TOKENS, getattr(usage, "prompt_token_count", None))
+            self.add(OUTPUT_TOKENS, getattr(usage, "candidates_token_count", None))
+            self.add(THINKING_TOKENS, getattr(usage, "thoughts_token_count", None))
+
+    def end(self):
+        self.seconds = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.seconds * 1e9)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Tracer:
+    """Collects finished spans per trace; a trace is finished when its root span ends."""
+
+    def __init__(self, service_name: str, trace_file: str = None):
+        self.service_name = service_name
+        self.trace_file = trace_file
+        self._traces = OrderedDict()  # trace_id -> finished spans
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Closed from another context, e.g. an abandoned async generator
+                pass
+            span.end()
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(span)
+            self._traces.move_to_end(span.trace_id)
+            while len(self._traces) > MAX_TRACES:
+                self._traces.popitem(last=False)
+        if span.parent_id is None and self.trace_file:
+            try:
+                self.export(span.trace_id, self.trace_file)
+            except OSError as e:
+                print(f"Could not export trace to {self.trace_file}: {e}")
+
+    def current(self):
+        """The active span, or None outside any span."""
+        return _current_span.get()
+
+    def spans(self, trace_id: str) -> list:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+    def summary(self, span) -> dict:
+        """Wall time of `span` plus tokens, cache hits, retries and time per span name over its subtree."""
+        spans = self.spans(span.trace_id)
+        children = {}
+        for s in spans:
+            children.setdefault(s.parent_id, []).append(s)
+        subtree, stack = [], [span]
+        while stack:
+            current = stack.pop()
+            subtree.append(current)
+            stack.extend(children.get(current.span_id, []))
+
+        result = {
+            "seconds": span.seconds, "input_tokens": 0, "output_tokens": 0, "thinking_tokens": 0,
+            "cache_hits": 0, "retries": 0, "errors": 0, "by_name": {},
+        }
+        for s in subtree:
+            result["input_tokens"] += s.attributes.get(INPUT_TOKENS, 0)
+            result["output_tokens"] += s.attributes.get(OUTPUT_TOKENS, 0)
+            result["thinking_tokens"] += s.attributes.get(THINKING_TOKENS, 0)
+            result["cache_hits"] += 1 if s.attributes.get("cache.hit") is True else 0
+            result["retries"] += s.attributes.get("retries", 0)
+            result["errors"] += 1 if s.error else 0
+            if s is not span and s.seconds is not None:
+                result["by_name"][s.name] = result["by_name"].get(s.name, 0.0) + s.seconds
+        return result
+
+    def to_otlp(self, trace_id: str) -> dict:
+        """One trace as an OTLP/JSON ExportTraceServiceRequest."""
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [s.to_otlp() for s in self.spans(trace_id)],
+            }],
+        }]}
+
+    def export(self, trace_id: str, path: str = None):
+        """Append a trace to a JSON-lines file of OTLP requests."""
+        path = path or self.trace_file
+        line = json.dumps(self.to_otlp(trace_id))
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+tracer = Tracer(service_name="alfred", trace_file=os.getenv("ALFRED_TRACE_FILE"))
@@ -0,0 +1,165 @@
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cache_utils import TTLCache
+from tracing import tracer
+
+# Search results go stale slowly; the response cache uses the same TTL (seconds)
+SEARCH_CACHE_TTL = float(os.getenv("ALFRED_SEARCH_CACHE_TTL", "3600"))
+SEARCH_MAX_RESULTS = int(os.getenv("ALFRED_SEARCH_MAX_RESULTS", "5"))
+SEARCH_WORKERS = int(os.getenv("ALFRED_SEARCH_WORKERS", "4"))
+QUERY_SEPARATOR = ";"
+
+TOKEN = re.compile(r"[\w$%+#.-]+")
+# Words that don't change what a web search finds
+FILLER_WORDS = frozenset("""
+a an the is are was were be of please search for find look up me tell what whats who whos
+""".split())
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key of a search: lower-cased words without punctuation, filler words
+    or repeats, in their original order ("Who is the current President of
+    France?" -> "current president france").
+    """
+    words = [word.strip(".-") for word in TOKEN.findall(query.lower())]
+    key = [word for word in dict.fromkeys(words) if word and word not in FILLER_WORDS]
+    return " ".join(key) or " ".join(query.lower().split())
+
+
+def split_queries(query: str) -> list:
+    """Sub-queries of a tool input ("a; b; c"), without duplicates."""
+    queries = [part.strip() for part in query.split(QUERY_SEPARATOR) if part.strip()]
+    unique = {}
+    for part in queries:
+        unique.setdefault(normalize_query(part), part)
+    return list(unique.values())
+
+
+def _snippet_key(result: dict) -> str:
+    return (result.get("link") or "").rstrip("/").lower() or " ".join(TOKEN.findall((result.get("snippet") or "").lower()))
+
+
+def format_results(results: list, failed: dict = None) -> str:
+    """Search results as tool output, naming the sub-queries that failed."""
+    lines = [f"- {result.get('title', '')}: {result.get('snippet', '')}" for result in results]
+    lines += [f"Search for '{part}' failed: {error}" for part, error in (failed or {}).items()]
+    return "\n".join(lines) or "No good DuckDuckGo Search Result was found"
+
+
+class WebSearch:
+    """
+    DuckDuckGo text search with a result cache.
+
+    Results are cached for `ttl` seconds under the normalized query, so
+    rephrasings that only differ in case, punctuation or filler words share
+    one request. Concurrent searches for the same query share one request, and
+    `search_many` runs several sub-queries in parallel and merges their results
+    without duplicates. Failed searches are not cached.
+    """
+
+    def __init__(self, ttl: float = None, max_results: int = None, max_workers: int = None, fetch=None):
+        self.max_results = max_results or SEARCH_MAX_RESULTS
+        self.max_workers = max_workers or SEARCH_WORKERS
+        self.cache = TTLCache(maxsize=1024, ttl=ttl if ttl is not None else SEARCH_CACHE_TTL, name="web_search")
+        self._fetch = fetch or self._ddgs_results
+        self._wrapper = None
+        self._inflight = {}  # normalized query -> Future of a running search
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+
+    def _ddgs_results(self, query: str, max_results: int) -> list:
+        if self._wrapper is None:
+            from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+            self._wrapper = DuckDuckGoSearchAPIWrapper()
+        return self._wrapper.results(query, max_results)
+
+    def results(self, query: str) -> list:
+        """[{"title", "snippet", "link"}] for a query, from cache or DuckDuckGo."""
+        key = normalize_query(query)
+        with tracer.span("search.query", query=key, **{"cache.hit": True}) as span:
+            results = self.cache.get(key)
+            if results is not None:
+                return results
+            with self._lock:
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+                else:
+                    self.coalesced += 1
+            if not owner:
+                # The same search is already running; share its result
+                span.set("coalesced", True)
+                return future.result()
+            span.set("cache.hit", False)
+            try:
+                with self._lock:
+                    self.requests += 1
+                results = self._fetch(query, self.max_results)
+                self.cache.set(key, results)
+                future.set_result(results)
+                return results
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def search_many(self, queries):
+        """
+        Run several queries concurrently; returns (results merged in rank order,
+        first results of every query first, without duplicate links or
+        snippets; {query: error} for the queries that failed). Raises if they
+        all fail.
+        """
+        queries = list({normalize_query(query): query for query in queries}.values())
+        if len(queries) == 1:
+            return self.results(queries[0]), {}
+        with ThreadPoolExecutor(max_workers=min(len(queries), self.max_workers)) as pool:
+            # Each task runs in a copy of the caller's context so its span joins the caller's trace
+            futures = [pool.submit(contextvars.copy_context().run, self.results, query) for query in queries]
+        listings, failed = [], {}
+        for query, future in zip(queries, futures):
+            try:
+                listings.append(future.result())
+            except Exception as e:
+                failed[query] = e
+        if not listings:
+            raise next(iter(failed.values()))
+        merged, seen = [], set()
+        for rank in range(max((len(listing) for listing in listings), default=0)):
+            for listing in listings:
+                if rank < len(listing):
+                    key = _snippet_key(listing[rank])
+                    if key not in seen:
+                        seen.add(key)
+                        merged.append(listing[rank])
+        return merged, failed
+
+    def search(self, query: str) -> str:
+        """Tool output for one query or several separated by ';'."""
+        return format_results(*self.search_many(split_queries(query) or [query]))
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "requests": self.requests, "coalesced": self.coalesced}
+
+
+_web_search = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> WebSearch:
+    """The shared WebSearch instance used by the search tool."""
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            _web_search = WebSearch()
+        return _web_search
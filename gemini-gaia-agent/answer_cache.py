@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Defaults (override via environment)
+DEFAULT_CACHE_PATH = os.getenv("GAIA_CACHE_PATH", "gaia_answer_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = int(os.getenv("GAIA_CACHE_MAX_ENTRIES", "5000"))
+DEFAULT_MAX_AGE = float(os.getenv("GAIA_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # 30 days
+EVICT_EVERY = 100  # run eviction after this many writes
+
+
+def hash_bytes(data) -> str:
+    """Return the hex sha256 of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+class AnswerCache:
+    """
+    Content-addressed answer cache stored in a local SQLite file.
+
+    Answers are keyed by model id, system instruction, question text and a hash
+    of the attached file, so an interrupted evaluation run can be restarted and
+    only pays for the questions it has not answered yet. Entries older than
+    `max_age` seconds are dropped, and the least recently used entries are
+    evicted once the cache grows past `max_entries`. With `refresh=True` every
+    lookup misses (fresh answers still overwrite the stored ones).
+    """
+
+    def __init__(self, path=None, max_entries=None, max_age=None, refresh=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.max_age = DEFAULT_MAX_AGE if max_age is None else max_age
+        if refresh is None:
+            refresh = os.getenv("GAIA_CACHE_REFRESH", "").lower() in ("1", "true", "yes")
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # One connection shared by the worker threads, serialised by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT,
+                    question TEXT,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )"""
+            )
+        self.evict()
+
+    @staticmethod
+    def make_key(model_id: str, system_instruction: str, question: str, file_hash: str = "") -> str:
+        """Build the cache key for a question."""
+        payload = json.dumps([model_id, system_instruction, question, file_hash])
+        return hash_bytes(payload)
+
+    def get(self, key: str):
+        """Return the cached answer for `key`, or None on a miss."""
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, created_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, answer: str, model_id: str = "", question: str = ""):
+        """Store an answer, replacing any previous entry for `key`."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_id, question, answer, now, now),
+            )
+            self._writes += 1
+            should_evict = self._writes % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones over the size limit."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.max_age,))
+            self._conn.execute(
+                """DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every cached answer."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,7 @@
+import contextvars
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import gradio as gr
 import requests
 import pandas as pd
@@ -6,20 +9,31 @@ from google import genai
 from google.genai.types import (
     GenerateContentConfig,
     GoogleSearch,
-    Part,
     ThinkingConfig,
     Tool,
     ToolCodeExecution,
     UrlContext,
 )
 
+from answer_cache import AnswerCache
+from attachments import AttachmentStore
+from file_ingest import GEMINI_NATIVE_KINDS, MAX_DOWNLOAD_BYTES, build_part, extract_text, too_large
+from normalize import normalize_answer, normalize_payload
+from rate_limit import error_status, get_rate_limiter
+from routing import Router
+from tracing import tracer
+
 # Constants
-DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
+DEFAULT_API_URL = os.getenv("GAIA_API_URL", "https://agents-course-unit4-scoring.hf.space")
+# Concurrency settings for the evaluation run (override via environment)
+MAX_WORKERS = int(os.getenv("GAIA_MAX_WORKERS", "4"))
+TASK_TIMEOUT = float(os.getenv("GAIA_TASK_TIMEOUT", "600"))
+PENDING_ANSWER = "⏳ running..."
 
 # --- Gemini Agent Definition ---
 class GeminiAgent:
-    def __init__(self, api_key=None):
-        """Initialize the Gemini Agent with API key."""
+    def __init__(self, api_key=None, cache=None, use_cache=True, attachments=None, client=None, rate_limiter=None, router=None):
+        """Initialize the Gemini Agent with API key, an optional answer cache, attachment store, genai client, rate limiter and router."""
         print("Initializing GeminiAgent...")
         
         # Get API key from environment or parameter
@@ -27,9 +41,11 @@ class GeminiAgent:
         if not self.api_key:
             raise ValueError("Google API key not provided. Set GOOGLE_API_KEY environment variable or pass it to the constructor.")
         
-        # Initialize Gemini client
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_id = "gemini-2.5-pro"  # Using Flash for better speed/cost ratio
+        # Initialize Gemini client (a stand-in can be passed for offline benchmarks)
+        self.client = client or genai.Client(api_key=self.api_key)
+        # Questions are routed between a fast tier (Flash, bounded thinking) and Pro (see routing.py)
+        self.router = router or Router()
+        self.model_id = self.router.strong.model_id  # used for the tool-less fallback
         
         # Configure tools for the agent
         self.google_search_tool = Tool(google_search=GoogleSearch())
@@ -59,126 +75,269 @@ class GeminiAgent:
         
         Remember: Output ONLY the final answer, nothing else."""
         
-        print(f"GeminiAgent initialized with model: {self.model_id}")
+        # Persistent answer cache so interrupted runs can resume without re-paying
+        self.cache = cache if cache is not None else (AnswerCache() if use_cache else None)
+        if self.cache is not None:
+            print(f"Answer cache: {self.cache.path} ({len(self.cache)} entries, refresh={self.cache.refresh})")
+        
+        # Local attachment cache; run_and_submit_all prefetches into it
+        self.attachments = attachments or AttachmentStore()
+        
+        # RPM/TPM limiter with retries, shared by all agents and worker threads in the process
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        
+        print(f"GeminiAgent initialized with models: {self.router.fast.model_id} -> {self.router.strong.model_id} (routing={self.router.mode})")
     
-    def process_files(self, task_id: str, api_url: str) -> str:
-        """Download and process files associated with a task."""
-        files_context = ""
-        files_url = f"{api_url}/files/{task_id}"
+    def process_files(self, task_id: str, api_url: str):
+        """
+        Download and process files associated with a task.
+
+        Returns (files_context, parts, file_hash): text extracted from the file
+        to append to the question, Gemini Parts for files without a text form
+        (audio, images, scanned PDFs...), and the sha256 of the downloaded bytes.
+        """
+        with tracer.span("gaia.process_files", task_id=task_id) as span:
+            files_context = ""
+            parts = []
+            file_hash = ""
+            files_url = f"{api_url}/files/{task_id}"
         
-        try:
-            print(f"Checking for files at: {files_url}")
-            response = requests.get(files_url, timeout=10)
+            try:
+                print(f"Checking for files at: {files_url}")
+                info = self.attachments.get(files_url)
+                if info is None:
+                    print(f"No files found for task {task_id}")
+                    return files_context, parts, file_hash
             
-            if response.status_code == 200:
-                # Check content type
-                content_type = response.headers.get('content-type', '')
-                
-                if 'application/json' in content_type:
-                    # If JSON, it might be a list of files or file metadata
-                    try:
-                        files_data = response.json()
-                        if isinstance(files_data, list):
-                            files_context = f"\n\nAssociated files for this task: {files_data}"
-                        else:
-                            files_context = f"\n\nFile data: {files_data}"
-                    except:
-                        # If not valid JSON, treat as raw content
-                        files_context = f"\n\nFile content:\n{response.text[:5000]}"  # Limit to 5000 chars
-                elif 'text' in content_type:
-                    # Text file
-                    files_context = f"\n\nFile content:\n{response.text[:5000]}"
+                file_hash = info["sha256"]
+                span.set("file.kind", info["kind"])
+                span.set("file.size", info["size"])
+                print(f"Files found for task {task_id}: {info['filename']} ({info['kind']}, {info['size']} bytes)")
+            
+                if too_large(info):
+                    # Only the first MAX_DOWNLOAD_BYTES were downloaded; a partial file is unreadable
+                    files_context = f"\n\n[File {info['filename']} ({info['content_type']}) is larger than {MAX_DOWNLOAD_BYTES} bytes and was not read]"
+                    return files_context, parts, file_hash
+            
+                try:
+                    text = extract_text(info)
+                except Exception as e:
+                    print(f"Could not extract text from {info['filename']}: {e}")
+                    text = None
+            
+                if text is not None:
+                    files_context = f"\n\nFile content ({info['filename']}):\n{text}"
+                elif info["kind"] in GEMINI_NATIVE_KINDS:
+                    # No text form - hand the file itself to Gemini
+                    parts.append(build_part(self.client, info))
+                    files_context = f"\n\nThe attached file {info['filename']} ({info['content_type']}) is provided."
                 else:
-                    # Binary file
-                    files_context = f"\n\n[Binary file of type {content_type} - {len(response.content)} bytes]"
-                
-                print(f"Files found for task {task_id}: {len(response.content)} bytes")
-            elif response.status_code == 404:
-                print(f"No files found for task {task_id}")
-            else:
-                print(f"Unexpected status {response.status_code} when fetching files")
-                
-        except Exception as e:
-            print(f"Error fetching files for task {task_id}: {e}")
+                    files_context = f"\n\n[Binary file of type {info['content_type']} - {info['size']} bytes]"
+            except Exception as e:
+                print(f"Error fetching files for task {task_id}: {e}")
         
-        return files_context
+            return files_context, parts, file_hash
+    
+    def _generate(self, contents, config, attempt: str = "primary", model_id: str = None):
+        """Call Gemini within the rate limits (retrying transient errors) inside a span that records token usage."""
+        model_id = model_id or self.model_id
+        with tracer.span("gemini.generate_content", attempt=attempt, **{"gen_ai.request.model": model_id}) as span:
+            response = self.rate_limiter.call(
+                lambda: self.client.models.generate_content(model=model_id, contents=contents, config=config),
+                tokens=self.rate_limiter.estimate_tokens(contents),
+                span=span,
+            )
+            span.record_usage(getattr(response, "usage_metadata", None))
+        return response
+    
+    def _ask(self, tier, question: str, prompt: str, file_parts, task_id: str = None, reasons=()):
+        """
+        Answer with one routing tier (all tools enabled) and log the attempt's latency and cost.
+
+        `prompt` is the question with any file content appended. Returns
+        (answer, problem) where problem is why the answer should be escalated
+        to the strong tier, or None.
+        """
+        start = time.monotonic()
+        response = self._generate(
+            [prompt, *file_parts],
+            GenerateContentConfig(
+                system_instruction=self.system_instruction,
+                tools=[
+                    self.google_search_tool, 
+                    self.code_execution_tool,
+                    self.url_context_tool  # Added URL context for reading web pages/files
+                ],
+                temperature=0.2,  # Low temperature for consistency
+                thinking_config=ThinkingConfig(
+                    # None lets the model decide how long to think (dynamic thinking)
+                    thinking_budget=tier.thinking_budget,
+                    include_thoughts=False  # We don't need to see the thoughts in production
+                ),
+            ),
+            attempt=tier.name,
+            model_id=tier.model_id,
+        )
+        answer = normalize_answer(response.text, question)
+        problem = self.router.self_check(question, answer) if self.router.should_escalate(tier) else None
+        self.router.record(
+            tier, time.monotonic() - start, getattr(response, "usage_metadata", None),
+            escalated=bool(problem), task_id=task_id, reasons=list(reasons), problem=problem,
+        )
+        return answer, problem
     
     def __call__(self, question: str, task_id: str = None, api_url: str = None) -> str:
         """Process a question and return an answer using Gemini."""
-        print(f"Processing question: {question[:100]}...")
+        with tracer.span("gaia.agent", task_id=task_id or "") as span:
+            print(f"Processing question: {question[:100]}...")
         
-        # Check for files if task_id and api_url are provided
-        enhanced_question = question
-        if task_id and api_url:
-            files_context = self.process_files(task_id, api_url)
-            if files_context:
-                enhanced_question = question + files_context
+            # Check for files if task_id and api_url are provided
+            enhanced_question = question
+            files_context = ""
+            file_parts = []
+            file_hash = ""
+            if task_id and api_url:
+                files_context, file_parts, file_hash = self.process_files(task_id, api_url)
+                if files_context:
+                    enhanced_question = question + files_context
         
-        try:
-            # Use dynamic thinking (no budget limit) for maximum reasoning capability
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=enhanced_question,
-                config=GenerateContentConfig(
-                    system_instruction=self.system_instruction,
-                    tools=[
-                        self.google_search_tool, 
-                        self.code_execution_tool,
-                        self.url_context_tool  # Added URL context for reading web pages/files
-                    ],
-                    temperature=0.2,  # Low temperature for consistency
-                    thinking_config=ThinkingConfig(
-                        # No thinking_budget specified - let model decide dynamically
-                        include_thoughts=False  # We don't need to see the thoughts in production
-                    )
-                ),
-            )
-            
-            answer = response.text.strip()
-            
-            # Clean up the answer - remove any explanatory text
-            # Look for patterns like "The answer is:" or similar
-            if "answer is" in answer.lower():
-                # Extract just the answer part
-                parts = answer.lower().split("answer is")
-                if len(parts) > 1:
-                    answer = parts[-1].strip().strip(":.").strip()
-            
-            # Remove quotes if present (unless they're part of the answer)
-            if answer.startswith('"') and answer.endswith('"'):
-                answer = answer[1:-1]
-            if answer.startswith("'") and answer.endswith("'"):
-                answer = answer[1:-1]
-            
-            # Additional cleanup for common patterns
-            answer = answer.replace("The answer is ", "")
-            answer = answer.replace("Answer: ", "")
-            answer = answer.replace("ANSWER: ", "")
-            
-            print(f"Generated answer: {answer}")
-            return answer
+            cache_key = None
+            if self.cache is not None:
+                cache_key = AnswerCache.make_key(
+                    self.router.cache_id, self.system_instruction, question, file_hash
+                )
+                cached_answer = self.cache.get(cache_key)
+                span.set("cache.hit", cached_answer is not None)
+                if cached_answer is not None:
+                    print(f"Cached answer: {cached_answer}")
+                    return cached_answer
+        
+            tier, reasons = self.router.route(question, native_file=bool(file_parts), file_text=bool(files_context))
+            span.set("route.tier", tier.name)
+            span.set("route.reasons", ",".join(reasons))
+            print(f"Routing to {tier.name} tier ({tier.model_id}): {', '.join(reasons) or 'no signals'}")
             
-        except Exception as e:
-            print(f"Error processing question: {e}")
-            # Fallback to a simpler approach without tools
             try:
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=f"Answer this question with ONLY the direct answer, no explanation: {enhanced_question}",
-                    config=GenerateContentConfig(
-                        temperature=0.2,
-                    ),
-                )
-                return response.text.strip()
-            except Exception as fallback_error:
-                print(f"Fallback also failed: {fallback_error}")
-                return "Error: Unable to process question"
+                try:
+                    answer, problem = self._ask(tier, question, enhanced_question, file_parts, task_id=task_id, reasons=reasons)
+                except Exception as e:
+                    if not self.router.should_escalate(tier) or error_status(e) == 429:
+                        raise
+                    print(f"Fast tier failed: {e}")
+                    answer, problem = None, f"error: {type(e).__name__}"
+                    self.router.record(tier, 0.0, escalated=True, task_id=task_id, reasons=reasons, problem=problem)
+                if problem:
+                    print(f"Fast answer failed self-check ({problem}), escalating to {self.router.strong.model_id}")
+                    span.set("route.escalated", problem)
+                    answer, _ = self._ask(self.router.strong, question, enhanced_question, file_parts, task_id=task_id, reasons=[problem])
+                
+                print(f"Generated answer: {answer}")
+                # Only full-capability answers are cached; fallbacks get retried next run
+                if cache_key is not None:
+                    self.cache.put(cache_key, answer, model_id=self.router.cache_id, question=question)
+                return answer
+            
+            except Exception as e:
+                print(f"Error processing question: {e}")
+                if error_status(e) == 429:
+                    # Still over quota after the limiter's retries; a second call would only add load
+                    raise
+                span.add("retries")
+                # Fallback to a simpler approach without tools
+                try:
+                    response = self._generate(
+                        [
+                            f"Answer this question with ONLY the direct answer, no explanation: {enhanced_question}",
+                            *file_parts,
+                        ],
+                        GenerateContentConfig(
+                            temperature=0.2,
+                        ),
+                        attempt="fallback",
+                    )
+                    return normalize_answer(response.text, question)
+                except Exception as fallback_error:
+                    print(f"Fallback also failed: {fallback_error}")
+                    return "Error: Unable to process question"
+
+
+def run_agent_concurrently(agent, tasks, api_url, max_workers=None, task_timeout=None, traces=None):
+    """
+    Run the agent on (task_id, question) pairs using a bounded thread pool.
+
+    Yields (index, answer, error) tuples as tasks finish, where index is the
+    position in `tasks`. A task that runs longer than `task_timeout` seconds is
+    reported with a TimeoutError; its worker thread is abandoned, not killed.
+    Each task runs in a "gaia.task" span; if `traces` is a dict, the span's
+    tracing summary is stored in it under the task's index before it is yielded.
+    """
+    max_workers = max(1, max_workers or MAX_WORKERS)
+    task_timeout = task_timeout or TASK_TIMEOUT
+    started_at = {}
+
+    def work(idx, task_id, question_text):
+        started_at[idx] = time.monotonic()
+        print(f"\n[{idx + 1}/{len(tasks)}] Processing task {task_id}")
+        print(f"Question preview: {question_text[:150]}...")
+        span = None
+        try:
+            with tracer.span("gaia.task", task_id=task_id) as span:
+                # Pass task_id and api_url to agent for file handling
+                return agent(question_text, task_id=task_id, api_url=api_url)
+        finally:
+            if traces is not None and span is not None:
+                traces[idx] = tracer.summary(span)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gaia")
+    try:
+        futures = {
+            # Copy the caller's context so task spans nest under an enclosing span
+            executor.submit(contextvars.copy_context().run, work, idx, task_id, question_text): idx
+            for idx, (task_id, question_text) in enumerate(tasks)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = futures[future]
+                try:
+                    yield idx, future.result(), None
+                except Exception as e:
+                    yield idx, None, e
+            # Per-task timeout, measured from when the worker picked the task up
+            now = time.monotonic()
+            for future in list(pending):
+                idx = futures[future]
+                if idx in started_at and now - started_at[idx] > task_timeout:
+                    pending.discard(future)
+                    future.cancel()
+                    yield idx, None, TimeoutError(f"timed out after {task_timeout:.0f}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_traces(traces) -> str:
+    """One-line run summary from per-task tracing summaries: tokens, cache hits and time per span."""
+    traces = list(traces)
+    totals = {key: sum(t[key] for t in traces) for key in ("input_tokens", "output_tokens", "thinking_tokens", "cache_hits", "retries")}
+    by_name = {}
+    for trace in traces:
+        for name, seconds in trace["by_name"].items():
+            by_name[name] = by_name.get(name, 0.0) + seconds
+    breakdown = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in sorted(by_name.items(), key=lambda item: -item[1]))
+    return (
+        f"Tokens: {totals['input_tokens']} in / {totals['output_tokens']} out / {totals['thinking_tokens']} thinking · "
+        f"cache hits {totals['cache_hits']}/{len(traces)} · retries {totals['retries']}"
+        + (f"\nTime by step (summed over tasks): {breakdown}" if breakdown else "")
+    )
 
 
 def run_and_submit_all(profile: gr.OAuthProfile | None):
     """
-    Fetches all questions, runs the GeminiAgent on them, submits all answers,
-    and displays the results.
+    Fetches all questions, runs the GeminiAgent on them concurrently, submits
+    all answers, and displays the results.
+
+    This is a generator so Gradio can refresh the results table as answers arrive.
     """
     # Determine HF Space Runtime URL and Repo URL
     space_id = os.getenv("SPACE_ID")
@@ -188,7 +347,8 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         print(f"User logged in: {username}")
     else:
         print("User not logged in.")
-        return "Please Login to Hugging Face with the button.", None
+        yield "Please Login to Hugging Face with the button.", None
+        return
     
     api_url = DEFAULT_API_URL
     questions_url = f"{api_url}/questions"
@@ -199,12 +359,14 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         # Get API key from environment or Gradio secrets
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
-            return "Error: Google API key not found. Please set GOOGLE_API_KEY in your Space secrets.", None
+            yield "Error: Google API key not found. Please set GOOGLE_API_KEY in your Space secrets.", None
+            return
         
         agent = GeminiAgent(api_key=api_key)
     except Exception as e:
         print(f"Error instantiating agent: {e}")
-        return f"Error initializing agent: {e}", None
+        yield f"Error initializing agent: {e}", None
+        return
     
     agent_code = f"https://huggingface.co/spaces/{space_id}/tree/main"
     print(f"Agent code URL: {agent_code}")
@@ -217,53 +379,109 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         questions_data = response.json()
         if not questions_data:
             print("Fetched questions list is empty.")
-            return "Fetched questions list is empty or invalid format.", None
+            yield "Fetched questions list is empty or invalid format.", None
+            return
         print(f"Fetched {len(questions_data)} questions.")
     except requests.exceptions.RequestException as e:
         print(f"Error fetching questions: {e}")
-        return f"Error fetching questions: {e}", None
+        yield f"Error fetching questions: {e}", None
+        return
     except Exception as e:
         print(f"An unexpected error occurred fetching questions: {e}")
-        return f"An unexpected error occurred fetching questions: {e}", None
+        yield f"An unexpected error occurred fetching questions: {e}", None
+        return
     
     # 3. Run your Agent
-    results_log = []
-    answers_payload = []
-    print(f"Running agent on {len(questions_data)} questions...")
-    
-    for idx, item in enumerate(questions_data, 1):
+    tasks = []
+    for item in questions_data:
         task_id = item.get("task_id")
         question_text = item.get("question")
-        
         if not task_id or question_text is None:
             print(f"Skipping item with missing task_id or question: {item}")
             continue
-        
-        print(f"\n[{idx}/{len(questions_data)}] Processing task {task_id}")
-        print(f"Question preview: {question_text[:150]}...")
-        
-        try:
-            # Pass task_id and api_url to agent for file handling
-            submitted_answer = agent(question_text, task_id=task_id, api_url=api_url)
-            answers_payload.append({"task_id": task_id, "submitted_answer": submitted_answer})
-            results_log.append({
-                "Task ID": task_id, 
-                "Question": question_text[:100] + "..." if len(question_text) > 100 else question_text,
-                "Submitted Answer": submitted_answer
-            })
-            print(f"✓ Answer: {submitted_answer}")
-        except Exception as e:
-            print(f"✗ Error running agent on task {task_id}: {e}")
-            error_msg = f"AGENT ERROR: {str(e)[:50]}"
-            results_log.append({
-                "Task ID": task_id, 
-                "Question": question_text[:100] + "..." if len(question_text) > 100 else question_text,
-                "Submitted Answer": error_msg
-            })
+        tasks.append((task_id, question_text))
+    
+    # One row per task, in question order; answers are filled in as they arrive
+    results_log = [
+        {
+            "Task ID": task_id, 
+            "Question": question_text[:100] + "..." if len(question_text) > 100 else question_text,
+            "Submitted Answer": PENDING_ANSWER,
+            "Seconds": None,
+            "Tokens (in/out/thinking)": "",
+            "Cached": None,
+        }
+        for task_id, question_text in tasks
+    ]
+    answers = [None] * len(tasks)
+    traces = {}  # task index -> tracing summary
+    
+    # Download all attachments up front so agents read them from local disk
+    file_urls = []
+    for item in questions_data:
+        task_id = item.get("task_id")
+        if not task_id:
+            continue
+        files_url = f"{api_url}/files/{task_id}"
+        if "file_name" in item and not item["file_name"]:
+            agent.attachments.mark_missing(files_url)
+        else:
+            file_urls.append(files_url)
+    if file_urls:
+        print(f"Prefetching {len(file_urls)} attachments...")
+        yield f"Prefetching {len(file_urls)} attachments...", pd.DataFrame(results_log)
+        prefetch_start = time.monotonic()
+        prefetched = agent.attachments.prefetch(file_urls)
+        found = sum(1 for info in prefetched.values() if info is not None)
+        print(f"Prefetched {found} attachments in {time.monotonic() - prefetch_start:.1f}s")
+    
+    print(f"Running agent on {len(tasks)} questions with {MAX_WORKERS} workers...")
+    yield f"Running agent on {len(tasks)} questions...", pd.DataFrame(results_log)
+    
+    run_start = time.monotonic()
+    # The limiter is shared by the whole process; report this run's share
+    limiter_start = dict(agent.rate_limiter.stats)
+    routing_start = agent.router.snapshot()
+    done_count = 0
+    for idx, submitted_answer, error in run_agent_concurrently(agent, tasks, api_url, traces=traces):
+        task_id = tasks[idx][0]
+        done_count += 1
+        if idx in traces:
+            trace = traces[idx]
+            results_log[idx]["Seconds"] = round(trace["seconds"], 2)
+            results_log[idx]["Tokens (in/out/thinking)"] = (
+                f"{trace['input_tokens']}/{trace['output_tokens']}/{trace['thinking_tokens']}"
+            )
+            results_log[idx]["Cached"] = trace["cache_hits"] > 0
+        if error is None:
+            answers[idx] = submitted_answer
+            results_log[idx]["Submitted Answer"] = submitted_answer
+            print(f"✓ [{done_count}/{len(tasks)}] Answer for {task_id}: {submitted_answer}")
+        else:
+            print(f"✗ Error running agent on task {task_id}: {error}")
+            results_log[idx]["Submitted Answer"] = f"AGENT ERROR: {str(error)[:50]}"
+        yield (
+            f"Answered {done_count}/{len(tasks)} questions ({time.monotonic() - run_start:.1f}s elapsed)...",
+            pd.DataFrame(results_log)
+        )
+    
+    answers_payload = [
+        {"task_id": task_id, "submitted_answer": answer}
+        for (task_id, _), answer in zip(tasks, answers)
+        if answer is not None
+    ]
+    # One pass under the current rules; also covers answers cached by older versions
+    answers_payload, changed = normalize_payload(answers_payload, dict(tasks))
+    if changed:
+        print(f"Normalized {changed} answers before submission")
+        rows = {row["Task ID"]: row for row in results_log}
+        for item in answers_payload:
+            rows[item["task_id"]]["Submitted Answer"] = item["submitted_answer"]
     
     if not answers_payload:
         print("Agent did not produce any answers to submit.")
-        return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
+        yield "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
+        return
     
     # 4. Prepare Submission 
     submission_data = {
@@ -271,8 +489,17 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         "agent_code": agent_code, 
         "answers": answers_payload
     }
+    run_summary = summarize_traces(traces.values())
+    limiter = {key: value - limiter_start[key] for key, value in agent.rate_limiter.stats.items()}
+    run_summary += (
+        f"\nRate limiter: {limiter['calls']} Gemini calls, {limiter['retries']} retries, "
+        f"{limiter['rate_limited']} rate-limited, {limiter['wait_seconds']:.1f}s waiting"
+    )
+    run_summary += "\n" + agent.router.summary(since=routing_start)
+    print(run_summary)
     status_update = f"Agent finished. Submitting {len(answers_payload)} answers for user '{username}'..."
     print(status_update)
+    yield status_update, pd.DataFrame(results_log)
     
     # 5. Submit
     print(f"Submitting {len(answers_payload)} answers to: {submit_url}")
@@ -285,11 +512,13 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
             f"User: {result_data.get('username')}\n"
             f"Overall Score: {result_data.get('score', 'N/A')}% "
             f"({result_data.get('correct_count', '?')}/{result_data.get('total_attempted', '?')} correct)\n"
-            f"Message: {result_data.get('message', 'No message received.')}"
+            f"Message: {result_data.get('message', 'No message received.')}\n"
+            f"{run_summary}"
         )
         print("Submission successful.")
         results_df = pd.DataFrame(results_log)
-        return final_status, results_df
+        yield final_status, results_df
+        return
     except requests.exceptions.HTTPError as e:
         error_detail = f"Server responded with status {e.response.status_code}."
         try:
@@ -300,12 +529,13 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         status_message = f"Submission Failed: {error_detail}"
         print(status_message)
         results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        yield status_message, results_df
+        return
     except Exception as e:
         status_message = f"An unexpected error occurred during submission: {e}"
         print(status_message)
         results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        yield status_message, results_df
 
 
 # --- Build Gradio Interface using Blocks ---
@@ -319,11 +549,12 @@ with gr.Blocks() as demo:
         2. **Log in** to your Hugging Face account using the button below
         3. **Click 'Run Evaluation & Submit All Answers'** to test your agent on all questions
         
-        This agent uses Google's Gemini 2.5 Pro model with:
+        This agent routes easy questions to Gemini 2.5 Flash and hard ones to Gemini 2.5 Pro (`GAIA_ROUTING`), with:
         - 🔍 Google Search for current information
         - 💻 Code execution for calculations
         - 🌐 URL context for reading web pages and files
-        - 🧠 Dynamic reasoning (unlimited thinking capability)
+        - 🧠 Dynamic reasoning on Pro; Flash answers that fail a self-check are escalated
+        - ⚡ Concurrent evaluation (set `GAIA_MAX_WORKERS` / `GAIA_TASK_TIMEOUT` to tune)
         
         ---
         """
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from file_ingest import NOT_MODIFIED, download_attachment
+
+# Defaults (override via environment)
+DEFAULT_CACHE_DIR = os.getenv("GAIA_ATTACHMENT_DIR", "gaia_attachments")
+PREFETCH_WORKERS = int(os.getenv("GAIA_PREFETCH_WORKERS", "8"))
+INDEX_FILE = "index.json"
+
+
+class AttachmentStore:
+    """
+    Local, content-addressed cache of task attachments.
+
+    Files are stored as `<sha256><ext>` in `cache_dir`, with an index mapping
+    each download URL to its file and the ETag / Last-Modified validators. The
+    first request for a URL in a process is a conditional GET, so unchanged
+    files are revalidated with a 304 instead of being downloaded again; later
+    lookups in the same process are served from disk with no network call.
+    """
+
+    def __init__(self, cache_dir=None, max_workers=None, timeout=10):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_workers = max_workers or PREFETCH_WORKERS
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Pooled session shared by all prefetch workers and agent threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self._index = self._load_index()
+        self._validated = {}  # url -> info (or None for no file), checked during this process
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # Called with the lock held; write-then-rename so a crash never leaves a broken index
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def mark_missing(self, url: str):
+        """Record that `url` has no attachment, so `get` won't request it."""
+        with self._lock:
+            self._validated[url] = None
+
+    def get(self, url: str):
+        """Return the local attachment info for `url` (None if there is no file)."""
+        with self._lock:
+            if url in self._validated:
+                return self._validated[url]
+            cached = self._index.get(url)
+        if cached and not os.path.exists(cached["path"]):
+            cached = None
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        info = download_attachment(
+            url, dest_dir=self.cache_dir, timeout=self.timeout, session=self.session, headers=headers or None
+        )
+        if info == NOT_MODIFIED:
+            info = cached
+        elif info is not None:
+            info = self._store(info)
+
+        with self._lock:
+            self._validated[url] = info
+            if info is not None and self._index.get(url) != info:
+                self._index[url] = info
+                self._save_index()
+        return info
+
+    def _store(self, info):
+        """Move a fresh download to its content-addressed path."""
+        extension = os.path.splitext(info["path"])[1]
+        path = os.path.join(self.cache_dir, info["sha256"] + extension)
+        os.replace(info["path"], path)
+        return dict(info, path=path)
+
+    def prefetch(self, urls):
+        """Download or revalidate several attachments concurrently; returns {url: info}."""
+        urls = list(dict.fromkeys(urls))
+
+        def fetch(url):
+            try:
+                return self.get(url)
+            except Exception as e:
+                # Leave it to the agent to retry during its own run
+                print(f"Prefetch failed for {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch") as executor:
+            return dict(zip(urls, executor.map(fetch, urls)))
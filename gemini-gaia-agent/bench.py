@@ -0,0 +1,460 @@
+"""
+Offline benchmark of the GAIA agent.
+
+    python bench.py [--iterations 30] [--llm-latency 0.05] [--http-latency 0.01]
+                    [--questions 20] [--runs 3] [--workers 4] [--output results.json]
+                    [--compare baseline.json] [--tolerance 0.2] [--min-delta-ms 1]
+
+Gemini and the scoring API are replaced by deterministic local stand-ins: a
+fake `genai.Client` that answers after `--llm-latency` seconds, and a local
+HTTP server playing DEFAULT_API_URL (questions, attachments with ETags, and
+submissions). GeminiAgent calls, the rate limiter against a fake
+`--quota-per-second` quota, question routing, answer normalization, and whole
+run_and_submit_all runs are timed
+and reported as JSON with p50/p95/p99 latency and throughput. With
+`--compare` the p95 of every component is checked against a previous report
+and the exit status is 1 if any got slower than `--tolerance`.
+"""
+import argparse
+import contextlib
+import functools
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+COMPONENTS = {}
+
+# Attachment payloads served by the stub scoring API, by file name
+ATTACHMENTS = {
+    "notes.txt": ("text/plain", ("The meeting is on Tuesday at 10am in room 42.\n" * 200).encode()),
+    "sales.csv": ("text/csv", ("region,month,sales\n" + "".join(f"north,{m},{m * 100}\n" for m in range(1, 400))).encode()),
+    "data.json": ("application/json", json.dumps({"items": [{"id": i, "value": i * i} for i in range(300)]}).encode()),
+    "photo.png": ("image/png", b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64),
+}
+
+
+def component(name):
+    def register(func):
+        COMPONENTS[name] = func
+        return func
+    return register
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(samples, elapsed, items: int = None):
+    """Latency percentiles (ms) and throughput (items/s) of a list of per-call durations."""
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "throughput": (items or len(samples)) / elapsed if elapsed else None,
+    }
+
+
+def measure(func, inputs, items_per_call: int = 1):
+    """Time func(x) for every x in inputs, sequentially, with the agent's prints silenced."""
+    samples = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for x in inputs:
+            call_start = time.perf_counter()
+            func(x)
+            samples.append(time.perf_counter() - call_start)
+    return summarize(samples, time.perf_counter() - start, len(samples) * items_per_call)
+
+
+class FakeModels:
+    """Stand-in for `client.models`: a deterministic answer after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.latency)
+        self.calls += 1
+        question = contents[0] if isinstance(contents, list) else contents
+        usage = SimpleNamespace(
+            prompt_token_count=len(str(question)) // 4, candidates_token_count=4, thoughts_token_count=32,
+        )
+        return SimpleNamespace(text=f"answer-{hashlib.sha1(str(question).encode()).hexdigest()[:8]}", usage_metadata=usage)
+
+
+class QuotaModels(FakeModels):
+    """FakeModels that answers 429 RESOURCE_EXHAUSTED above `per_second` calls in any one-second window."""
+
+    def __init__(self, latency: float, per_second: int):
+        super().__init__(latency)
+        self.per_second = per_second
+        self.rejected = 0
+        self._recent = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        from google.genai import errors
+
+        with self._lock:
+            now = time.monotonic()
+            self._recent = [t for t in self._recent if now - t < 1.0]
+            if len(self._recent) >= self.per_second:
+                self.rejected += 1
+                raise errors.ClientError(429, {"error": {
+                    "code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded",
+                    "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "0.5s"}],
+                }})
+            self._recent.append(now)
+        return super().generate_content(model, contents, config)
+
+
+class FakeFiles:
+    def upload(self, file, config=None):
+        return SimpleNamespace(uri=f"stub://files/{os.path.basename(str(file))}", mime_type=getattr(config, "mime_type", None))
+
+
+class FakeGenaiClient:
+    """Stand-in for `google.genai.Client` with the parts GeminiAgent uses."""
+
+    def __init__(self, latency: float = 0.05):
+        self.models = FakeModels(latency)
+        self.files = FakeFiles()
+
+
+# Questions shaped like GAIA's, for the routing benchmark
+ROUTING_SAMPLES = [
+    "What is the capital of Australia?",
+    "How many studio albums were published by Mercedes Sosa between 2000 and 2009 (included)?",
+    ".rewsna eht sa \"tfel\" drow eht fo etisoppo eht etirw ,ecnetnes siht dnatsrednu uoy fI",
+    "In the video https://www.youtube.com/watch?v=L1vXCYZAYYM, what is the highest number of bird species on camera simultaneously?",
+    "Calculate 17.5% of 2,480 and round to the nearest integer.",
+    "Review the chess position provided in the image. It is black's turn. Provide the correct next move in algebraic notation.",
+    "Who was the first person to walk on the moon?",
+    "Find the paper on arXiv submitted in June 2022 about AI regulation, then give the label word used on the x-axis of its figure.",
+]
+
+
+def make_questions(n: int):
+    """Questions for the stub API; every other task has an attachment."""
+    names = list(ATTACHMENTS)
+    return [
+        {
+            "task_id": f"task-{i:04d}",
+            "question": f"Benchmark question {i}: what is the answer?",
+            "file_name": names[(i // 2) % len(names)] if i % 2 else "",
+        }
+        for i in range(n)
+    ]
+
+
+class StubScoringAPI:
+    """
+    Local HTTP server with the scoring API's endpoints: GET /questions,
+    GET /files/<task_id> (with ETag revalidation) and POST /submit.
+    """
+
+    def __init__(self, questions, latency: float = 0.0):
+        self.latency = latency
+        self.questions = questions
+        self.files = {q["task_id"]: q["file_name"] for q in questions if q["file_name"]}
+        self.submissions = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                if self.path == "/questions":
+                    self._send(200, json.dumps(stub.questions).encode(), {"Content-Type": "application/json"})
+                    return
+                file_name = stub.files.get(self.path.rsplit("/", 1)[-1]) if self.path.startswith("/files/") else None
+                if file_name is None:
+                    self._send(404)
+                    return
+                content_type, data = ATTACHMENTS[file_name]
+                etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, headers={"ETag": etag})
+                    return
+                self._send(200, data, {
+                    "Content-Type": content_type,
+                    "Content-Disposition": f'attachment; filename="{file_name}"',
+                    "ETag": etag,
+                })
+
+            def do_POST(self):
+                time.sleep(stub.latency)
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                stub.submissions += 1
+                answered = len(payload.get("answers", []))
+                body = {"username": payload.get("username"), "score": 0, "correct_count": 0,
+                        "total_attempted": answered, "message": "stub submission"}
+                self._send(200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _agent(args, **kwargs):
+    import app
+
+    return app.GeminiAgent(api_key="offline", client=FakeGenaiClient(args.llm_latency), **kwargs)
+
+
+@component("agent.call")
+def bench_agent_call(args, api):
+    agent = _agent(args, use_cache=False)
+    measure(agent, ["Warm-up question?"])
+    return measure(agent, [f"Standalone question {i}?" for i in range(args.iterations)])
+
+
+@component("agent.call_with_file")
+def bench_agent_call_with_file(args, api):
+    from attachments import AttachmentStore
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        agent = _agent(args, use_cache=False, attachments=AttachmentStore(cache_dir))
+        tasks = [q for q in make_questions(args.iterations * 2) if q["file_name"]]
+        measure(agent, ["Warm-up question?"])
+        return measure(lambda q: agent(q["question"], task_id=q["task_id"], api_url=api.url), tasks)
+
+
+@component("agent.cache_hit")
+def bench_agent_cache_hit(args, api):
+    from answer_cache import AnswerCache
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        agent = _agent(args, cache=AnswerCache(os.path.join(cache_dir, "answers.sqlite3")))
+        questions = [f"Cached question {i}?" for i in range(args.iterations)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for question in questions:
+                agent(question)
+        return measure(agent, questions)
+
+
+@component("rate_limit.quota")
+def bench_rate_limit(args, api):
+    """
+    Concurrent calls against a fake quota, paced by the limiter vs retries alone.
+    Throughput is in successful calls per second; `rejected` counts 429s.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from rate_limit import RateLimiter
+
+    quota = args.quota_per_second
+    result = {}
+    for name, rpm in (("limited", quota * 60 * 0.9), ("unlimited", 0)):
+        models = QuotaModels(args.llm_latency, quota)
+        limiter = RateLimiter(rpm=rpm, tpm=0, max_retries=20, base_delay=0.1, max_delay=1.0)
+        if limiter.requests is not None:
+            # Start from an empty bucket: this measures the steady rate, not the one-minute burst
+            limiter.requests.level = 0
+        samples = []
+
+        def call(i):
+            call_start = time.perf_counter()
+            limiter.call(lambda: models.generate_content("fake", [f"question {i}"]))
+            samples.append(time.perf_counter() - call_start)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(args.workers * 2) as pool:
+            list(pool.map(call, range(args.iterations * 2)))
+        result[name] = summarize(samples, time.perf_counter() - start)
+        result[name].update(rejected=models.rejected, retries=limiter.stats["retries"])
+    # p95 at the top level so --compare tracks the limited run
+    return {**result["limited"], "quota_per_second": quota, "unlimited": result["unlimited"],
+            "rejected": result["limited"]["rejected"]}
+
+
+@component("routing.route")
+def bench_routing(args, api):
+    """Question classification cost; `tiers` counts where a GAIA-like mix of questions is sent."""
+    from routing import Router
+
+    router = Router(mode="auto")
+    questions = [q["question"] for q in make_questions(args.iterations)] + ROUTING_SAMPLES
+    result = measure(router.route, questions * 20)
+    result["tiers"] = {}
+    for question in questions:
+        tier, _ = router.route(question)
+        result["tiers"][tier.name] = result["tiers"].get(tier.name, 0) + 1
+    return result
+
+
+@component("normalize.batch")
+def bench_normalize(args, api):
+    """normalize_payload over a submission built from the regression corpus; throughput is answers/s."""
+    from normalize import check_corpus, load_corpus, normalize_payload
+
+    cases = load_corpus()
+    failures = check_corpus(cases)
+    if failures:
+        raise RuntimeError(f"{len(failures)} normalize corpus cases fail, e.g. {failures[0]}")
+    batch = [cases[i % len(cases)] for i in range(args.iterations * 100)]
+    payload = [{"task_id": str(i), "submitted_answer": case["answer"]} for i, case in enumerate(batch)]
+    questions = {str(i): case["question"] for i, case in enumerate(batch)}
+    result = measure(lambda _: normalize_payload(payload, questions), range(args.iterations), items_per_call=len(payload))
+    result["batch_size"] = len(payload)
+    return result
+
+
+@component("run_and_submit_all")
+def bench_run_and_submit_all(args, api):
+    """Whole evaluation runs; throughput is in questions per second."""
+    import app
+
+    profile = SimpleNamespace(username="bench")
+    agent_factory = functools.partial(app.GeminiAgent, client=FakeGenaiClient(args.llm_latency), use_cache=False)
+
+    def run(_):
+        status = None
+        for status, _table in app.run_and_submit_all(profile):
+            pass
+        if not status.startswith("Submission Successful"):
+            raise RuntimeError(status)
+
+    with mock.patch.object(app, "GeminiAgent", agent_factory):
+        # The first run downloads every attachment; timed runs revalidate them
+        measure(run, [None])
+        result = measure(run, range(args.runs), items_per_call=len(api.questions))
+    result["questions"] = len(api.questions)
+    result["workers"] = app.MAX_WORKERS
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, tolerance: float, min_delta_ms: float = 1.0):
+    """
+    Components whose p95 grew by more than `tolerance` (a fraction) since
+    `baseline`; changes under `min_delta_ms` are treated as timer noise.
+    """
+    regressions = []
+    for name, result in report["components"].items():
+        before = baseline.get("components", {}).get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in result:
+            continue
+        delta = result["p95_ms"] - before["p95_ms"]
+        if delta > before["p95_ms"] * tolerance and delta > min_delta_ms:
+            regressions.append({"component": name, "before_p95_ms": before["p95_ms"], "p95_ms": result["p95_ms"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake Gemini call")
+    parser.add_argument("--http-latency", type=float, default=0.01, help="seconds per stub API request")
+    parser.add_argument("--questions", type=int, default=20, help="questions per run_and_submit_all run")
+    parser.add_argument("--runs", type=int, default=3, help="run_and_submit_all runs")
+    parser.add_argument("--workers", type=int, default=4, help="GAIA_MAX_WORKERS for the runs")
+    parser.add_argument("--quota-per-second", type=int, default=10, help="fake Gemini quota for rate_limit.quota")
+    parser.add_argument("--only", nargs="*", default=None, help="component names to run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 increase")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    report = {
+        "suite": "gemini-gaia-agent",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "components": {},
+    }
+    questions = make_questions(max(args.questions, args.iterations * 2))
+    with tempfile.TemporaryDirectory() as work_dir, StubScoringAPI(questions, args.http_latency) as api:
+        # Every question has its attachment served, but /questions lists only --questions of them
+        api.questions = questions[: args.questions]
+        # app.py reads these at import time
+        os.environ.update({
+            "GAIA_API_URL": api.url,
+            "GAIA_MAX_WORKERS": str(args.workers),
+            "GAIA_CACHE_PATH": os.path.join(work_dir, "answers.sqlite3"),
+            "GAIA_ATTACHMENT_DIR": os.path.join(work_dir, "attachments"),
+            "GOOGLE_API_KEY": "offline",
+            # The fake client has no quota; rate_limit.quota measures the limiter on its own
+            "GAIA_RPM": "0",
+            "GAIA_TPM": "0",
+        })
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        # Outside a Space the login button wants a real HF login; the UI isn't used here
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch("gradio.LoginButton"):
+            import app  # noqa: F401
+
+        for name, func in COMPONENTS.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            try:
+                # Progress prints go to stderr so stdout stays valid JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    report["components"][name] = func(args, api)
+            except Exception as e:
+                report["components"][name] = {"error": repr(e)}
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['component']}: p95 {regression['before_p95_ms']:.1f} ms -> "
+                  f"{regression['p95_ms']:.1f} ms", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
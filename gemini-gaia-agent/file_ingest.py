@@ -0,0 +1,247 @@
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import zipfile
+from html import unescape
+
+import requests
+from google.genai.types import Part, UploadFileConfig
+
+# Limits (override via environment)
+MAX_TEXT_CHARS = int(os.getenv("GAIA_MAX_TEXT_CHARS", "5000"))  # text sent inline with the question
+MAX_DOWNLOAD_BYTES = int(os.getenv("GAIA_MAX_DOWNLOAD_BYTES", str(50 * 1024 * 1024)))
+INLINE_PART_BYTES = int(os.getenv("GAIA_INLINE_PART_BYTES", str(4 * 1024 * 1024)))  # larger files go through the Files API
+MAX_TABLE_ROWS = 200
+CHUNK_SIZE = 64 * 1024
+# Text-like files only need enough bytes to fill MAX_TEXT_CHARS (utf-8 is at most 4 bytes/char)
+TEXT_READ_BYTES = MAX_TEXT_CHARS * 4
+
+# Map of file kind -> (content-type fragments, file extensions)
+KIND_RULES = [
+    ("json", ("application/json",), (".json", ".jsonld")),
+    ("csv", ("text/csv",), (".csv", ".tsv")),
+    ("spreadsheet", ("spreadsheet", "ms-excel"), (".xlsx", ".xls", ".ods")),
+    ("pdf", ("application/pdf",), (".pdf",)),
+    ("audio", ("audio/",), (".mp3", ".wav", ".m4a", ".flac", ".ogg", ".aac")),
+    ("image", ("image/",), (".png", ".jpg", ".jpeg", ".gif", ".webp")),
+    # Office documents are zip archives; their content types contain "xml" too
+    ("document", ("wordprocessingml", "presentationml", "msword", "ms-powerpoint"), (".docx", ".pptx", ".doc", ".ppt")),
+    ("text", ("text/", "x-python", "application/xml", "javascript"), (".txt", ".md", ".py", ".xml", ".html", ".js")),
+]
+# Kinds that can be cut short: everything after the first MAX_TEXT_CHARS is discarded anyway
+STREAMABLE_KINDS = ("json", "csv", "text")
+# Returned by download_attachment when a conditional request gets a 304
+NOT_MODIFIED = "not-modified"
+# Kinds Gemini can read directly when they are sent as file parts
+GEMINI_NATIVE_KINDS = ("pdf", "audio", "image", "text", "csv")
+
+
+def detect_kind(content_type: str, filename: str = "") -> str:
+    """Classify an attachment from its content type and file name."""
+    content_type = (content_type or "").lower()
+    extension = os.path.splitext(filename or "")[1].lower()
+    for kind, type_fragments, extensions in KIND_RULES:
+        if extension in extensions:
+            return kind
+    for kind, type_fragments, extensions in KIND_RULES:
+        if any(fragment in content_type for fragment in type_fragments):
+            return kind
+    return "binary"
+
+
+def filename_from_headers(headers) -> str:
+    """Extract the file name from a Content-Disposition header, if any."""
+    disposition = headers.get("content-disposition", "")
+    match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition, re.IGNORECASE)
+    return match.group(1).strip() if match else ""
+
+
+def download_attachment(url: str, dest_dir: str = None, timeout: float = 10, session=None, headers=None):
+    """
+    Stream an attachment to a temporary file without holding it in memory.
+
+    Text-like files stop downloading once there is enough to fill the prompt;
+    everything else is capped at MAX_DOWNLOAD_BYTES. Returns None if the task
+    has no file, NOT_MODIFIED if conditional `headers` were sent and the server
+    answered 304, otherwise a dict with the local path, type info and sha256.
+    """
+    http = session or requests
+    with http.get(url, timeout=timeout, stream=True, headers=headers) as response:
+        if response.status_code == 404:
+            return None
+        if response.status_code == 304:
+            return NOT_MODIFIED
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        filename = filename_from_headers(response.headers)
+        kind = detect_kind(content_type, filename)
+        limit = TEXT_READ_BYTES if kind in STREAMABLE_KINDS else MAX_DOWNLOAD_BYTES
+
+        digest = hashlib.sha256()
+        size = 0
+        truncated = False
+        suffix = os.path.splitext(filename)[1] or mimetypes.guess_extension(content_type) or ""
+        with tempfile.NamedTemporaryFile("wb", suffix=suffix, dir=dest_dir, delete=False) as out:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                if size + len(chunk) > limit:
+                    chunk = chunk[: limit - size]
+                    truncated = True
+                out.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                if truncated:
+                    break
+
+    return {
+        "path": out.name,
+        "filename": filename or os.path.basename(out.name),
+        "content_type": content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "kind": kind,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "truncated": truncated,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+
+
+def too_large(info) -> bool:
+    """True if a file that can't be cut short hit MAX_DOWNLOAD_BYTES (its bytes are incomplete)."""
+    return info["truncated"] and info["kind"] not in STREAMABLE_KINDS
+
+
+def _clip(text: str, truncated: bool = False) -> str:
+    """Limit extracted text to MAX_TEXT_CHARS, marking the cut."""
+    if len(text) > MAX_TEXT_CHARS:
+        return text[:MAX_TEXT_CHARS] + "\n[... truncated]"
+    return text + ("\n[... truncated]" if truncated else "")
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read(MAX_TEXT_CHARS + 1)
+
+
+def extract_json(info) -> str:
+    text = _read_text(info["path"])
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Cut short or not valid JSON - treat as raw content
+        return _clip(text, info["truncated"])
+    return _clip(json.dumps(data, indent=1), info["truncated"])
+
+
+def extract_csv(info) -> str:
+    with open(info["path"], "r", encoding="utf-8", errors="replace", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample)
+        except csv.Error:
+            dialect = csv.excel
+        lines = []
+        length = 0
+        for row_num, row in enumerate(csv.reader(f, dialect)):
+            if row_num >= MAX_TABLE_ROWS or length > MAX_TEXT_CHARS:
+                break
+            line = ",".join(row)
+            lines.append(line)
+            length += len(line) + 1
+    return _clip("\n".join(lines), info["truncated"])
+
+
+def extract_spreadsheet(info) -> str:
+    import pandas as pd
+
+    sheets = pd.read_excel(info["path"], sheet_name=None, nrows=MAX_TABLE_ROWS)
+    blocks = [f"Sheet: {name}\n{frame.to_csv(index=False)}" for name, frame in sheets.items()]
+    return _clip("\n".join(blocks))
+
+
+def extract_pdf(info) -> str:
+    # pypdf is optional - without it the PDF is sent to Gemini as a file part
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+    pages = []
+    length = 0
+    for page in PdfReader(info["path"]).pages:
+        text = page.extract_text() or ""
+        pages.append(text)
+        length += len(text)
+        if length > MAX_TEXT_CHARS:
+            break
+    text = "\n".join(pages).strip()
+    # Scanned PDFs have no text layer; let Gemini read them instead
+    return _clip(text) if text else None
+
+
+# Text runs of Word (<w:t>) and PowerPoint (<a:t>) XML, paragraphs (<w:p>, <a:p>) ending a line
+OFFICE_TEXT = re.compile(r"<(?:w|a):t(?:\s[^>]*)?>([^<]*)</(?:w|a):t>|</(?:w|a):p>")
+OFFICE_PARTS = re.compile(r"^(?:word/document\.xml|ppt/slides/slide(\d+)\.xml)$")
+
+
+def extract_document(info) -> str:
+    """Text of a .docx / .pptx file; None for the older binary formats."""
+    try:
+        archive = zipfile.ZipFile(info["path"])
+    except zipfile.BadZipFile:
+        return None
+    with archive:
+        names = [name for name in archive.namelist() if OFFICE_PARTS.match(name)]
+        # Slides in order: slide2 before slide10
+        names.sort(key=lambda name: int(OFFICE_PARTS.match(name).group(1) or 0))
+        blocks = []
+        length = 0
+        for name in names:
+            xml = archive.read(name).decode("utf-8", errors="replace")
+            text = "".join(
+                unescape(match.group(1)) if match.group(1) is not None else "\n" for match in OFFICE_TEXT.finditer(xml)
+            )
+            blocks.append(text.strip())
+            length += len(text)
+            if length > MAX_TEXT_CHARS:
+                break
+    text = "\n\n".join(block for block in blocks if block)
+    return _clip(text) if text else None
+
+
+# Text extractors by file kind; audio, images and anything an extractor
+# returns None for are passed to Gemini as file parts instead.
+EXTRACTORS = {
+    "json": extract_json,
+    "csv": extract_csv,
+    "text": lambda info: _clip(_read_text(info["path"]), info["truncated"]),
+    "spreadsheet": extract_spreadsheet,
+    "pdf": extract_pdf,
+    "document": extract_document,
+}
+
+
+def extract_text(info):
+    """Run the type-specific extractor for an attachment; None if it has no text form."""
+    extractor = EXTRACTORS.get(info["kind"])
+    if extractor is None:
+        return None
+    return extractor(info)
+
+
+def build_part(client, info) -> Part:
+    """Turn a local attachment into a Gemini Part, uploading large files via the Files API."""
+    if info["size"] <= INLINE_PART_BYTES:
+        with open(info["path"], "rb") as f:
+            return Part.from_bytes(data=f.read(), mime_type=info["content_type"])
+    uploaded = client.files.upload(
+        file=info["path"],
+        config=UploadFileConfig(mime_type=info["content_type"], display_name=info["filename"]),
+    )
+    return Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type or info["content_type"])
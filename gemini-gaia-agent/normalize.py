@@ -0,0 +1,279 @@
+"""
+Table-driven normalization of model answers into GAIA's exact-match format.
+
+    from normalize import normalize_answer, normalize_payload
+
+    normalize_answer("The final answer is: **1,234 people**.", "How many people ...?")  # "1234"
+
+Every answer first goes through WRAPPER_RULES (prefixes such as "The answer
+is:", markdown, quotes, a trailing period), a table of precompiled regexes
+applied in order, keeping the answer's original casing. The question then
+picks a canonicalizer: numbers (no separators, units or currency), lists
+(", "-joined, sorted when asked), dates (in the requested format) or yes/no.
+Question classification is cached, so `normalize_payload` normalizes a whole
+submission in one pass. Normalization is idempotent.
+
+`python normalize.py [n]` checks normalize_corpus.jsonl (expected outputs and
+idempotence) and times a batch of `n` answers; add a corpus line for every new
+rule.
+"""
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "normalize_corpus.jsonl")
+
+# Words whose trailing period is part of the answer
+ABBREVIATIONS = ["inc", "ltd", "co", "corp", "bros", "jr", "sr", "st", "dr", "mr", "mrs", "ms", "prof", "etc", "vs", "no"]
+
+# (name, pattern, replacement), applied in order to every answer
+WRAPPER_RULES = [
+    ("code fence", re.compile(r"^```[\w-]*\s*(.*?)\s*```$", re.S), r"\1"),
+    # Last "answer is" wins, as in "I checked X; the answer is: Y"
+    ("answer is", re.compile(r"^.*\b(?:final answer|answer) (?:is|was)\s*[:\-]?\s*", re.I | re.S), ""),
+    ("answer label", re.compile(r"^(?:final\s+)?answer\s*(?::|\s-)\s*", re.I), ""),
+    ("bold", re.compile(r"^(\*\*|__)(.+)\1$", re.S), r"\2"),
+    ("backticks", re.compile(r"^`([^`]+)`$"), r"\1"),
+    ("double quotes", re.compile(r'^["“](.*)["”]$', re.S), r"\1"),
+    ("single quotes", re.compile(r"^['‘](.*)['’]$", re.S), r"\1"),
+    # ...unless the last word is an abbreviation ("Apple Inc.")
+    ("trailing period", re.compile(r"^((?:[^.]*\s)?(?!(?:%s)\.$)[^.\s]*\w)\.$" % "|".join(ABBREVIATIONS), re.I), r"\1"),
+    ("whitespace", re.compile(r"[^\S\n]+"), " "),
+    ("blank lines", re.compile(r" ?\n\s*"), "\n"),
+]
+
+# Cheap pre-check: an answer that matches none of these has nothing for WRAPPER_RULES to do
+WRAPPER_GATE = re.compile(r"""^[`*_"“'‘]|[`*_"”'’.]$|answer|\s\s|[^\S ]""", re.I)
+
+# Only explicit requests for a list ("Which band on the list..." is not one)
+LIST_QUESTION = re.compile(
+    r"comma[- ](?:separated|delimited)|separated by commas|\b(?:as|in) an? (?:\w+[ -]){0,2}list\b"
+    r"|(?:^|[.?!:;]\s+)(?:please\s+)?list\b|\b(?:give|provide|return|write)\b(?: \w+){0,4} list\b",
+    re.I,
+)
+# Only explicit alphabetical ordering: "in order from first to last" keeps the answer's order
+SORTED_QUESTION = re.compile(r"alphabetical|alphabeti[sz]e|\bsort(?:ed)?\b", re.I)
+NUMBER_QUESTION = re.compile(
+    r"\bhow (?:many|much|long|old|far)\b|\bwhat (?:is|was|were) the (?:number|total|sum|count|average|value|amount|price|cost)\b"
+    r"|\bround(?:ed)? to\b|\bdecimal places?\b|\bin (?:usd|dollars|euros|km|kilometers|meters|miles|seconds|minutes|hours|years|kg|percent)\b"
+    r"|\bas a (?:number|integer)\b",
+    re.I,
+)
+YES_NO_QUESTION = re.compile(r"^(?:is|are|was|were|does|do|did|can|could|has|have|had|will|would|should)\b(?!.*\bor\b)", re.I | re.S)
+DATE_FORMATS = [
+    (re.compile(r"yyyy-mm-dd", re.I), "{y:04d}-{m:02d}-{d:02d}"),
+    (re.compile(r"mm/dd/yyyy", re.I), "{m:02d}/{d:02d}/{y:04d}"),
+    (re.compile(r"dd/mm/yyyy", re.I), "{d:02d}/{m:02d}/{y:04d}"),
+    (re.compile(r"month day, year|mmmm d, yyyy", re.I), "{month} {d}, {y}"),
+]
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august",
+          "september", "october", "november", "december"]
+MONTH = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+DATE_PATTERNS = [
+    (re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$"), ("y", "m", "d")),
+    (re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})$"), ("m", "d", "y")),
+    (re.compile(rf"^{MONTH} (\d{{1,2}})(?:st|nd|rd|th)?,? (\d{{4}})$", re.I), ("month", "d", "y")),
+    (re.compile(rf"^(\d{{1,2}})(?:st|nd|rd|th)? {MONTH},? (\d{{4}})$", re.I), ("d", "month", "y")),
+]
+
+NUMBER = re.compile(r"[-−]?\$?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?%?")
+NUMBER_WORDS = {
+    word: str(i) for i, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+        "sixteen seventeen eighteen nineteen twenty".split()
+    )
+}
+# Words allowed around a number that still make the answer "just a number"
+NUMBER_FILLER = re.compile(r"^(?:about|approximately|approx\.?|around|roughly|exactly|only|~)$", re.I)
+SCALE_WORDS = re.compile(r"\b(?:thousand|million|billion|trillion)\b", re.I)
+MAX_NUMBER_WORDS = 4
+
+LIST_SPLIT = re.compile(r"\s*(?:[;\n]|,(?!\d{3}(?:\D|$)))\s*")
+# "and" only separates items when there is no other separator ("Bosnia and Herzegovina, Croatia")
+AND_SPLIT = re.compile(r"\s+and\s+", re.I)
+# ...apart from the Oxford "a, b, and c" and between numbers ("197 and 245")
+LEADING_AND = re.compile(r"^and\s+", re.I)
+NUMBERS_AND = re.compile(r"^(\S+)\s+and\s+(\S+)$", re.I)
+LIST_ITEM_RULES = [
+    re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+"),  # bullets and numbering
+    re.compile(r"[.;]+$"),
+]
+YES_NO_ANSWER = re.compile(r"^(yes|no)\b(?:[.!,;:]|\s|$)", re.I)
+ONE_LINE = re.compile(r"\s*\n\s*")
+
+
+def strip_wrappers(answer: str) -> str:
+    """Apply WRAPPER_RULES until nothing changes (nested wrappers like **"x"**)."""
+    answer = (answer or "").strip()
+    while WRAPPER_GATE.search(answer):
+        before = answer
+        for _, pattern, replacement in WRAPPER_RULES:
+            answer = pattern.sub(replacement, answer).strip()
+        if answer == before:
+            break
+    return answer
+
+
+@lru_cache(maxsize=4096)
+def question_kind(question: str):
+    """Which canonicalizer a question's answer needs: (kind, option)."""
+    if not question:
+        return "text", None
+    for pattern, template in DATE_FORMATS:
+        if pattern.search(question):
+            return "date", template
+    if LIST_QUESTION.search(question):
+        return "list", bool(SORTED_QUESTION.search(question))
+    if NUMBER_QUESTION.search(question):
+        return "number", "%" in question or "percent" in question.lower()
+    if YES_NO_QUESTION.search(question):
+        return "yesno", None
+    return "text", None
+
+
+def canonical_number(answer: str, keep_percent: bool = False) -> str:
+    """'$1,234.50 total' -> '1234.50'; answers that are more than a number are left alone."""
+    if SCALE_WORDS.search(answer):
+        return answer
+    words = answer.split()
+    if len(words) > MAX_NUMBER_WORDS:
+        return answer
+    numbers = NUMBER.findall(answer)
+    if not numbers:
+        spelled = [NUMBER_WORDS[w.lower()] for w in words if w.lower() in NUMBER_WORDS]
+        return spelled[0] if len(spelled) == 1 else answer
+    if len(numbers) != 1:
+        return answer
+    # Anything before the number other than filler ("about 42") means it isn't just a number
+    prefix = answer[: answer.index(numbers[0])].split()
+    if any(not NUMBER_FILLER.match(word) for word in prefix):
+        return answer
+    number = numbers[0].replace(",", "").replace("$", "").replace("−", "-")
+    if number.endswith("%") and not keep_percent:
+        number = number[:-1]
+    return number
+
+
+def split_list(answer: str) -> list:
+    parts = LIST_SPLIT.split(answer)
+    if len(parts) == 1:
+        return AND_SPLIT.split(answer)
+    items = []
+    for part in parts:
+        part = LEADING_AND.sub("", part)
+        match = NUMBERS_AND.match(part)
+        if match and all(NUMBER.fullmatch(number) for number in match.groups()):
+            items.extend(match.groups())
+        else:
+            items.append(part)
+    return items
+
+
+def canonical_list(answer: str, sort: bool = False) -> str:
+    items = []
+    for item in split_list(answer):
+        for pattern in LIST_ITEM_RULES:
+            item = pattern.sub("", item)
+        item = strip_wrappers(item)
+        if NUMBER.fullmatch(item):
+            item = canonical_number(item, keep_percent=True)
+        if item:
+            items.append(item)
+    if sort:
+        items.sort(key=str.casefold)
+    return ", ".join(items) if items else answer
+
+
+def canonical_date(answer: str, template: str) -> str:
+    for pattern, fields in DATE_PATTERNS:
+        match = pattern.match(answer)
+        if not match:
+            continue
+        values = dict(zip(fields, match.groups()))
+        if "month" in values:
+            prefix = values.pop("month").lower()[:3]
+            values["m"] = next(i for i, name in enumerate(MONTHS, 1) if name.startswith(prefix))
+        y, m, d = int(values["y"]), int(values["m"]), int(values["d"])
+        if not (1 <= m <= 12 and 1 <= d <= 31):
+            return answer
+        return template.format(y=y, m=m, d=d, month=MONTHS[m - 1].capitalize())
+    return answer
+
+
+def canonical_yes_no(answer: str) -> str:
+    match = YES_NO_ANSWER.match(answer)
+    return match.group(1).lower() if match else answer
+
+
+def normalize_answer(answer, question: str = None) -> str:
+    """Normalize one model answer for GAIA's exact-match scoring."""
+    answer = strip_wrappers(answer)
+    kind, option = question_kind(question or "")
+    if kind == "list":
+        # Lists are split on newlines too, so they are flattened by canonical_list itself
+        return canonical_list(answer, sort=option)
+    answer = ONE_LINE.sub(" ", answer)
+    if kind == "number":
+        return canonical_number(answer, keep_percent=option)
+    if kind == "date":
+        return canonical_date(answer, option)
+    if kind == "yesno":
+        return canonical_yes_no(answer)
+    return answer
+
+
+def normalize_batch(answers, questions=None) -> list:
+    """Normalize parallel lists of answers and questions in one pass."""
+    questions = questions if questions is not None else [None] * len(answers)
+    return [normalize_answer(answer, question) for answer, question in zip(answers, questions)]
+
+
+def normalize_payload(answers_payload, questions_by_task: dict):
+    """
+    Normalize a submission's [{"task_id", "submitted_answer"}] in one pass.
+    Returns (new payload, number of answers that changed).
+    """
+    normalized = normalize_batch(
+        [item["submitted_answer"] for item in answers_payload],
+        [questions_by_task.get(item["task_id"]) for item in answers_payload],
+    )
+    changed = sum(1 for item, answer in zip(answers_payload, normalized) if answer != item["submitted_answer"])
+    return [{**item, "submitted_answer": answer} for item, answer in zip(answers_payload, normalized)], changed
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_corpus(cases) -> list:
+    """Corpus cases whose output is wrong or not idempotent."""
+    failures = []
+    for case in cases:
+        result = normalize_answer(case["answer"], case.get("question"))
+        again = normalize_answer(result, case.get("question"))
+        if result != case["expected"] or again != result:
+            failures.append({**case, "got": result, "again": again})
+    return failures
+
+
+if __name__ == "__main__":
+    cases = load_corpus()
+    failures = check_corpus(cases)
+    for failure in failures:
+        print(f"FAIL {failure['answer']!r} -> {failure['got']!r} (expected {failure['expected']!r}, "
+              f"again {failure['again']!r}) for {failure.get('question')!r}")
+    print(f"{len(cases) - len(failures)}/{len(cases)} corpus cases pass")
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    answers = [cases[i % len(cases)]["answer"] for i in range(n)]
+    questions = [cases[i % len(cases)].get("question") for i in range(n)]
+    start = time.perf_counter()
+    normalize_batch(answers, questions)
+    elapsed = time.perf_counter() - start
+    print(f"normalized {n} answers in {elapsed:.3f}s ({n / elapsed:,.0f} answers/s)")
+    sys.exit(1 if failures else 0)
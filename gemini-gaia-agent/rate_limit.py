@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+
+# Defaults (override via environment); 0 turns a limit off
+DEFAULT_RPM = float(os.getenv("GAIA_RPM", "150"))
+DEFAULT_TPM = float(os.getenv("GAIA_TPM", "2000000"))
+DEFAULT_MAX_RETRIES = int(os.getenv("GAIA_MAX_RETRIES", "5"))
+DEFAULT_BASE_DELAY = float(os.getenv("GAIA_RETRY_BASE_DELAY", "2"))
+DEFAULT_MAX_DELAY = float(os.getenv("GAIA_RETRY_MAX_DELAY", "60"))
+# Tokens reserved per call for output and thinking until the real usage is known
+OUTPUT_TOKEN_ESTIMATE = int(os.getenv("GAIA_OUTPUT_TOKEN_ESTIMATE", "2048"))
+CHARS_PER_TOKEN = 4
+
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+MIN_RATE_FRACTION = 0.1  # adaptive slow-down never goes below this share of the limit
+RECOVERY_STEP = 0.05  # share of the limit regained per successful call
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` tokens per
+    minute, holding at most one minute's worth. `consume` may take the level
+    below zero (e.g. when a call used more tokens than reserved); later
+    acquisitions then wait until the debt is paid off.
+    """
+
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.rate = per_minute / 60.0  # current refill rate, tokens per second
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens now; returns the seconds to wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def consume(self, amount: float):
+        """Adjust the level by `amount` tokens without waiting (negative gives tokens back)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level - amount)
+
+    def scale(self, factor: float):
+        """Multiply the refill rate by `factor`, staying between MIN_RATE_FRACTION and the limit."""
+        with self._lock:
+            self._refill(time.monotonic())
+            per_second = self.limit / 60.0
+            self.rate = min(per_second, max(per_second * MIN_RATE_FRACTION, self.rate * factor))
+
+    def recover(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            per_second = self.limit / 60.0
+            self.rate = min(per_second, self.rate + per_second * RECOVERY_STEP)
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limiter for Gemini.
+
+    One limiter is shared by every worker thread (see `get_rate_limiter`), so a
+    concurrent evaluation run paces itself just under quota instead of firing
+    bursts that come back as 429s. Each call reserves one request and an
+    estimate of its tokens; the estimate is corrected with the response's usage.
+    On a 429 every worker pauses for the server's Retry-After and the refill
+    rate is cut, then grows back with each successful call.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_retries=None, base_delay=None, max_delay=None):
+        rpm = DEFAULT_RPM if rpm is None else rpm
+        tpm = DEFAULT_TPM if tpm is None else tpm
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = DEFAULT_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = DEFAULT_MAX_DELAY if max_delay is None else max_delay
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "wait_seconds": 0.0}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_tokens(contents) -> int:
+        """Rough token count of the text in `contents` plus the output reserve."""
+        if not isinstance(contents, (list, tuple)):
+            contents = [contents]
+        chars = sum(len(part) for part in contents if isinstance(part, str))
+        return chars // CHARS_PER_TOKEN + OUTPUT_TOKEN_ESTIMATE
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request with `tokens` tokens fits the limits; returns the seconds waited."""
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self.stats["wait_seconds"] += wait
+        return wait
+
+    def record(self, reserved: int, used):
+        """Correct the token bucket once the real usage of a call is known."""
+        if self.tokens is not None and used is not None:
+            self.tokens.consume(used - reserved)
+
+    def pause(self, seconds: float):
+        """Hold back every worker for `seconds` and slow the refill down."""
+        with self._lock:
+            now = time.monotonic()
+            # Workers that hit the same 429 burst slow the rate down only once
+            already_paused = self._paused_until > now
+            self._paused_until = max(self._paused_until, now + seconds)
+            self.stats["rate_limited"] += 1
+        if not already_paused:
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.scale(0.5)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, tokens: int = 0, span=None):
+        """
+        Run `func()` within the limits, retrying transient errors (429, 5xx,
+        timeouts) up to `max_retries` times. Waits honour the server's
+        Retry-After / RetryInfo when given, otherwise use jittered backoff.
+        Other errors, and the last transient one, are raised.
+        """
+        attempt = 0
+        while True:
+            waited = self.acquire(tokens)
+            if span is not None and waited:
+                span.add("rate_limit.wait_seconds", waited)
+            with self._lock:
+                self.stats["calls"] += 1
+            try:
+                response = func()
+            except Exception as e:
+                # The request was spent; its tokens were not
+                self.record(tokens, 0)
+                status = error_status(e)
+                if not is_transient(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                retry_after = retry_after_seconds(e)
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                if status == 429:
+                    self.pause(delay)
+                with self._lock:
+                    self.stats["retries"] += 1
+                if span is not None:
+                    span.add("retries")
+                print(f"Gemini call failed ({status or type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                if status != 429:
+                    time.sleep(delay)
+                continue
+            usage = getattr(response, "usage_metadata", None)
+            self.record(tokens, getattr(usage, "total_token_count", None))
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.recover()
+            return response
+
+
+def error_status(error):
+    """HTTP status of a google-genai / requests error, or None."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_transient(error) -> bool:
+    if error_status(error) in TRANSIENT_STATUS:
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in (
+        "ConnectTimeout", "ReadTimeout", "ConnectError", "RemoteProtocolError",
+    )
+
+
+def retry_after_seconds(error):
+    """Server-requested wait: the Retry-After header or a RetryInfo `retryDelay` detail."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        details = details.get("error", details).get("details", [])
+    for detail in details if isinstance(details, list) else []:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return max(0.0, float(delay[:-1]))
+            except ValueError:
+                pass
+    return None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter shared by every GeminiAgent and worker thread."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter()
+        return _shared
@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+# Defaults (override via environment)
+ROUTING_MODE = os.getenv("GAIA_ROUTING", "auto")  # auto, fast (never escalate) or strong (always Pro)
+FAST_MODEL = os.getenv("GAIA_FAST_MODEL", "gemini-2.5-flash")
+FAST_THINKING_BUDGET = int(os.getenv("GAIA_FAST_THINKING_BUDGET", "1024"))
+STRONG_MODEL = os.getenv("GAIA_STRONG_MODEL", "gemini-2.5-pro")
+HARD_SCORE = int(os.getenv("GAIA_ROUTING_HARD_SCORE", "3"))  # score at which a question goes straight to Pro
+ROUTING_LOG = os.getenv("GAIA_ROUTING_LOG")  # optional JSON-lines file of routing decisions
+
+# USD per million tokens (input, output incl. thinking); used to compare tiers, not for billing
+PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# A tier is a model and its thinking budget (None lets the model decide)
+Tier = namedtuple("Tier", ["name", "model_id", "thinking_budget"])
+
+# (pattern, points, reason): a question scoring HARD_SCORE or more is hard
+HARD_SIGNALS = [
+    (re.compile(r"\b(video|youtube\.com|youtu\.be|audio|recording|mp3|image|picture|photo|chess|diagram)\b", re.I), 3, "media"),
+    (re.compile(r"^[^a-zA-Z]*\.\w+ \w+|\b(tfel|drow|ecnetnes|rewsna)\b", re.I), 3, "reversed text"),
+    (re.compile(r"\b(cipher|decode|puzzle|riddle|logic|grid|permutation)\b", re.I), 2, "puzzle"),
+    (re.compile(r"\b(then|after that|followed by|using the result|of the (?:person|author|paper|album) who)\b", re.I), 1, "multi-step"),
+    (re.compile(r"\b(wikipedia|arxiv|paper|article|published|edition|revision|archive)\b", re.I), 2, "research"),
+    (re.compile(r"\b(between \d{4} and \d{4}|as of|in (?:the )?\d{4})\b", re.I), 1, "dated lookup"),
+]
+# Cheap question shapes the fast tier handles well
+EASY_SIGNALS = [
+    (re.compile(r"^[\d\s.,+\-*/^()%=?x]+$|\b(calculate|compute|sum|total|average|how many|how much|convert)\b", re.I), -1, "arithmetic"),
+    (re.compile(r"^(what|who|when|where|which) (is|was|are|were) (the )?\w+", re.I), -1, "lookup"),
+]
+
+# Signs that a fast-tier answer should not be trusted
+UNSURE = re.compile(
+    r"\b(i (?:cannot|can't|could not|couldn't|am unable|don't know|do not know)|unable to|not (?:possible|available|enough information)"
+    r"|no information|insufficient|unknown|as an ai|i'm sorry|sorry,)\b",
+    re.I,
+)
+COUNT_QUESTION = re.compile(r"\bhow (many|much)\b|\bwhat (?:is|was) the (?:number|count|total)\b", re.I)
+YES_NO_QUESTION = re.compile(r"^(is|are|was|were|does|do|did|can|could|has|have|will|should)\b", re.I)
+NUMBER = re.compile(r"-?\$?\d[\d,]*(?:\.\d+)?")
+MAX_ANSWER_WORDS = 25
+
+
+def estimate_cost(model_id: str, input_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model_id, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class Router:
+    """
+    Sends each question to the cheapest tier likely to answer it.
+
+    Easy questions (arithmetic, data files, single-fact lookups) go to the fast
+    tier with a bounded thinking budget; hard ones (media attachments, puzzles,
+    multi-step research) go straight to the strong tier with dynamic thinking.
+    A fast answer that fails `self_check` is escalated to the strong tier.
+    Every decision is counted per tier with its latency, tokens and estimated
+    cost, and appended to `log_path` as JSON lines when one is set.
+    """
+
+    def __init__(self, mode=None, fast=None, strong=None, hard_score=None, log_path=None):
+        self.mode = mode or ROUTING_MODE
+        self.fast = fast or Tier("fast", FAST_MODEL, FAST_THINKING_BUDGET)
+        self.strong = strong or Tier("strong", STRONG_MODEL, None)
+        self.hard_score = HARD_SCORE if hard_score is None else hard_score
+        self.log_path = log_path if log_path is not None else ROUTING_LOG
+        self.stats = {}  # tier name -> counters
+        self._lock = threading.Lock()
+
+    @property
+    def cache_id(self) -> str:
+        """Identifies the routing setup in answer-cache keys (plain model id when always using Pro)."""
+        if self.mode == "strong":
+            return self.strong.model_id
+        if self.mode == "fast":
+            return self.fast.model_id
+        return f"{self.fast.model_id}>{self.strong.model_id}"
+
+    def score(self, question: str, native_file: bool = False, file_text: bool = False):
+        """Difficulty score of a question and the reasons behind it."""
+        score, reasons = 0, []
+        if native_file:
+            score, reasons = 3, ["media attachment"]
+        elif file_text:
+            score, reasons = -1, ["data file"]
+        for pattern, points, reason in HARD_SIGNALS + EASY_SIGNALS:
+            if pattern.search(question):
+                score += points
+                reasons.append(reason)
+        if len(question) > 400:
+            score += 1
+            reasons.append("long")
+        return score, reasons
+
+    def route(self, question: str, native_file: bool = False, file_text: bool = False):
+        """Returns (tier, reasons) for a question."""
+        if self.mode == "strong":
+            return self.strong, ["forced"]
+        if self.mode == "fast":
+            return self.fast, ["forced"]
+        score, reasons = self.score(question, native_file, file_text)
+        return (self.strong if score >= self.hard_score else self.fast), reasons
+
+    def should_escalate(self, tier) -> bool:
+        return self.mode == "auto" and tier is self.fast
+
+    @staticmethod
+    def self_check(question: str, answer: str):
+        """Why a fast-tier answer looks wrong, or None if it passes."""
+        if not answer or not answer.strip():
+            return "empty"
+        if answer.startswith("Error"):
+            return "error"
+        if UNSURE.search(answer):
+            return "unsure"
+        if len(answer.split()) > MAX_ANSWER_WORDS:
+            return "too long"
+        if COUNT_QUESTION.search(question) and not NUMBER.search(answer):
+            return "no number"
+        if YES_NO_QUESTION.search(question) and " or " not in question.lower() and len(answer.split()) > 3:
+            return "not yes/no"
+        return None
+
+    def record(self, tier, seconds: float, usage=None, escalated: bool = False, **details):
+        """Count one tier attempt and log it for tuning."""
+        input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (
+            getattr(usage, "thoughts_token_count", None) or 0
+        )
+        cost = estimate_cost(tier.model_id, input_tokens, output_tokens)
+        with self._lock:
+            stats = self.stats.setdefault(
+                tier.name, {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0, "escalated": 0}
+            )
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost"] += cost
+            stats["escalated"] += 1 if escalated else 0
+            if self.log_path:
+                entry = {
+                    "tier": tier.name, "model": tier.model_id, "seconds": round(seconds, 3),
+                    "input_tokens": input_tokens, "output_tokens": output_tokens, "cost": round(cost, 6),
+                    "escalated": escalated, **details,
+                }
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Could not write routing log {self.log_path}: {e}")
+        return cost
+
+    def summary(self, since: dict = None) -> str:
+        """One line per tier: calls, mean latency, tokens, cost and escalations (minus a `since` snapshot)."""
+        lines = []
+        with self._lock:
+            stats = {name: dict(values) for name, values in self.stats.items()}
+        for name, values in stats.items():
+            before = (since or {}).get(name, {})
+            values = {key: value - before.get(key, 0) for key, value in values.items()}
+            if not values["calls"]:
+                continue
+            line = (
+                f"{name}: {values['calls']} calls, {values['seconds'] / values['calls']:.1f}s avg, "
+                f"{values['input_tokens']}/{values['output_tokens']} tokens, ~${values['cost']:.4f}"
+            )
+            if values["escalated"]:
+                line += f", {values['escalated']} escalated"
+            lines.append(line)
+        return "Routing: " + ("; ".join(lines) if lines else "no Gemini calls")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(values) for name, values in self.stats.items()}
@@ -0,0 +1,465 @@
+"""
+Batch inbox mode for Alfred's email-sorting graph.
+
+    python email_batch.py inbox.mbox [--output sorted.jsonl] [--concurrency 16] [--group-size 10] [--no-draft]
+    python email_batch.py inbox.jsonl --stub           # offline, with a stand-in model
+
+Emails are streamed from an mbox file or a JSONL file ({"sender", "subject",
+"body"} per line) and sorted by the same read → classify → spam / draft
+graph as the notebook, with many graph instances running at once through
+`abatch`. Two things keep Gemini calls down:
+
+- `HashedSpamFilter`, a hashed-feature logistic regression, marks obvious
+  spam locally (probability >= EMAIL_SPAM_THRESHOLD) before any LLM call.
+  It starts from spam_seed.jsonl and keeps learning from the LLM's verdicts.
+- `GroupedClassifier` collects the emails that concurrent graph runs want
+  classified and asks about up to EMAIL_GROUP_SIZE of them in one prompt.
+
+The run reports emails per minute and LLM calls per email.
+"""
+import argparse
+import asyncio
+import json
+import mailbox
+import math
+import os
+import re
+import sys
+import time
+import zlib
+from array import array
+from email.header import decode_header, make_header
+from itertools import islice
+from typing import Any, Dict, List, Optional, TypedDict
+
+# Defaults (override via environment)
+CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "16"))  # graph runs in flight
+GROUP_SIZE = int(os.getenv("EMAIL_GROUP_SIZE", "10"))  # emails per classification prompt
+GROUP_WAIT = float(os.getenv("EMAIL_GROUP_WAIT", "0.05"))  # seconds a partial group waits for more emails
+SPAM_THRESHOLD = float(os.getenv("EMAIL_SPAM_THRESHOLD", "0.9"))
+CHUNK_SIZE = 256  # emails per abatch call
+BODY_CHARS = 2000  # body characters shown to the model
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spam_seed.jsonl")
+
+HASH_BITS = 18
+WORD = re.compile(r"[a-z0-9$%!]+")
+URL = re.compile(r"https?://|www\.|click (?:here|now|this link)", re.I)
+VERDICT = re.compile(r"^\W*(\d+)\W+(spam|ham)\b", re.I | re.M)
+
+
+class EmailState(TypedDict):
+    email: Dict[str, Any]
+    is_spam: Optional[bool]
+    spam_reason: Optional[str]
+    email_category: Optional[str]
+    email_draft: Optional[str]
+    messages: List[Dict[str, Any]]
+
+
+def _text(content) -> str:
+    """Text of a model response (Gemini may return a list of content parts)."""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+class HashedSpamFilter:
+    """
+    Logistic regression over hashed features (the "hashing trick"): words and
+    word pairs of the subject and body, the sender, links and shouting. No
+    vocabulary is kept, so the model is a fixed array of 2**HASH_BITS weights
+    and scoring an email costs one pass over its words.
+    """
+
+    def __init__(self, bits: int = HASH_BITS, learning_rate: float = 0.5, l2: float = 1e-4):
+        self.size = 1 << bits
+        self.weights = array("d", bytes(8 * self.size))
+        self.bias = 0.0
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.examples = 0
+
+    def features(self, email: dict) -> dict:
+        """Hashed feature index -> value (+/-1 signed hashing, counts summed)."""
+        counts = {}
+
+        def add(name, value=1.0):
+            h = zlib.crc32(name.encode("utf-8"))
+            index = h % self.size
+            counts[index] = counts.get(index, 0.0) + (value if h & 0x80000000 else -value)
+
+        subject, body = email.get("subject") or "", email.get("body") or ""
+        sender = (email.get("sender") or "").lower()
+        for prefix, text in (("s:", subject), ("b:", body[:BODY_CHARS * 2])):
+            words = WORD.findall(text.lower())
+            for i, word in enumerate(words):
+                add(prefix + word)
+                if i:
+                    add(prefix + words[i - 1] + " " + word)
+        for part in WORD.findall(sender):
+            add("from:" + part)
+        letters = [c for c in subject + body if c.isalpha()]
+        if letters and sum(c.isupper() for c in letters) / len(letters) > 0.3:
+            add("shouting")
+        add("links", float(len(URL.findall(body))))
+        add("exclamations", min(5.0, (subject + body).count("!")) / 5)
+        # Normalize so long emails don't get extreme scores
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return {index: value / norm for index, value in counts.items()}
+
+    def predict_proba(self, email: dict, features: dict = None) -> float:
+        features = features if features is not None else self.features(email)
+        z = self.bias + sum(self.weights[i] * v for i, v in features.items())
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def learn(self, email: dict, is_spam: bool):
+        """One SGD step on a labelled email."""
+        features = self.features(email)
+        error = (1.0 if is_spam else 0.0) - self.predict_proba(email, features)
+        for i, v in features.items():
+            self.weights[i] += self.learning_rate * (error * v - self.l2 * self.weights[i])
+        self.bias += self.learning_rate * error
+        self.examples += 1
+
+    def fit(self, emails, labels, epochs: int = 20):
+        data = list(zip(emails, labels))
+        for epoch in range(epochs):
+            # Deterministic shuffle so training is reproducible
+            data.sort(key=lambda pair: zlib.crc32(f"{epoch}:{pair[0].get('subject')}".encode("utf-8")))
+            for email, label in data:
+                self.learn(email, label)
+        return self
+
+    @classmethod
+    def from_seed(cls, path: str = SEED_PATH):
+        """A filter trained on the labelled emails in `path` (JSONL with a "label" of spam/ham)."""
+        emails = list(read_jsonl(path))
+        return cls().fit(emails, [email["label"] == "spam" for email in emails])
+
+
+class GroupedClassifier:
+    """
+    Classifies emails for concurrent graph runs, several per LLM call.
+
+    `classify` queues the email and waits; a group is sent as soon as it has
+    `group_size` emails or `max_wait` seconds after its first one. Emails the
+    reply doesn't cover are asked about one at a time, and if that fails too
+    they count as legitimate so Mr Wayne still sees them.
+    """
+
+    def __init__(self, model, group_size: int = None, max_wait: float = None):
+        self.model = model
+        self.group_size = group_size or GROUP_SIZE
+        self.max_wait = GROUP_WAIT if max_wait is None else max_wait
+        self.stats = {"llm_calls": 0, "emails": 0, "unparsed": 0}
+        self._pending = []  # (email, future)
+        self._timer = None
+        self._tasks = set()
+
+    async def classify(self, email: dict) -> bool:
+        """True if the email is spam."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((email, future))
+        if len(self._pending) >= self.group_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        group, self._pending = self._pending, []
+        if group:
+            task = asyncio.ensure_future(self._classify_group(group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def prompt(emails) -> str:
+        blocks = "\n\n".join(
+            f"[{i}]\nFrom: {email.get('sender')}\nSubject: {email.get('subject')}\nBody: {(email.get('body') or '')[:BODY_CHARS]}"
+            for i, email in enumerate(emails, 1)
+        )
+        return f"""
+As Alfred the butler of Mr wayne and it's SECRET identity Batman, analyze each email below and determine if it is spam or legitimate and should be brought to Mr wayne's attention.
+
+{blocks}
+
+For each email, answer with one line "<number>: SPAM" or "<number>: HAM" if it's legitimate, in order. Only return those lines.
+"""
+
+    async def _ask(self, emails) -> dict:
+        """index (0-based) -> is_spam for the emails the model answered about."""
+        from langchain_core.messages import HumanMessage
+
+        self.stats["llm_calls"] += 1
+        response = await self.model.ainvoke([HumanMessage(content=self.prompt(emails))])
+        verdicts = {}
+        for number, label in VERDICT.findall(_text(response.content)):
+            index = int(number) - 1
+            if 0 <= index < len(emails):
+                verdicts.setdefault(index, label.lower() == "spam")
+        return verdicts
+
+    async def _classify_group(self, group):
+        emails = [email for email, _ in group]
+        self.stats["emails"] += len(emails)
+        try:
+            verdicts = await self._ask(emails)
+        except Exception as e:
+            print(f"Group classification of {len(emails)} emails failed ({e}), asking one at a time")
+            verdicts = {}
+        for index, (email, future) in enumerate(group):
+            if index not in verdicts:
+                try:
+                    verdicts[index] = (await self._ask([email])).get(0)
+                except Exception as e:
+                    print(f"Could not classify the email from {email.get('sender')}: {e}")
+                    verdicts[index] = None
+                if verdicts[index] is None:
+                    self.stats["unparsed"] += 1
+                    verdicts[index] = False
+            if not future.done():
+                future.set_result(verdicts[index])
+
+
+def build_inbox_graph(model, spam_filter=None, classifier=None, draft: bool = True, spam_threshold: float = None):
+    """
+    The notebook's email graph for batch runs: an optional local spam filter
+    before the (grouped) LLM classification, async nodes and no printing.
+    Drafting a reply for legitimate emails can be turned off with draft=False.
+    Returns (compiled graph, stats dict counting LLM calls and outcomes).
+    """
+    from langchain_core.messages import HumanMessage
+    from langgraph.graph import END, START, StateGraph
+
+    classifier = classifier or GroupedClassifier(model)
+    spam_threshold = SPAM_THRESHOLD if spam_threshold is None else spam_threshold
+    stats = {"draft_calls": 0, "spam_local": 0, "spam_llm": 0, "ham": 0}
+
+    def prefilter(state: EmailState):
+        if spam_filter is None:
+            return {}
+        probability = spam_filter.predict_proba(state["email"])
+        if probability >= spam_threshold:
+            stats["spam_local"] += 1
+            return {"is_spam": True, "spam_reason": f"local filter (p={probability:.2f})"}
+        return {}
+
+    async def classify_email(state: EmailState):
+        email = state["email"]
+        is_spam = await classifier.classify(email)
+        if spam_filter is not None:
+            # The LLM's verdicts keep the local filter up to date
+            spam_filter.learn(email, is_spam)
+        stats["spam_llm" if is_spam else "ham"] += 1
+        return {
+            "is_spam": is_spam,
+            "spam_reason": "LLM" if is_spam else None,
+            "messages": state.get("messages", []) + [{"role": "assistant", "content": "SPAM" if is_spam else "HAM"}],
+        }
+
+    def handle_spam(state: EmailState):
+        return {"email_category": "spam"}
+
+    async def drafting_response(state: EmailState):
+        email = state["email"]
+        prompt = f"""
+As Alfred the butler, draft a polite preliminary response to this email.
+
+Email:
+From: {email['sender']}
+Subject: {email['subject']}
+Body: {(email.get('body') or '')[:BODY_CHARS]}
+
+Draft a brief, professional response that Mr. Wayne can review and personalize before sending.
+    """
+        stats["draft_calls"] += 1
+        response = await model.ainvoke([HumanMessage(content=prompt)])
+        return {
+            "email_category": "legitimate",
+            "email_draft": _text(response.content),
+            "messages": state.get("messages", []) + [
+                {"role": "user", "content": prompt},
+                {"role": "assistant", "content": _text(response.content)},
+            ],
+        }
+
+    def file_legitimate(state: EmailState):
+        return {"email_category": "legitimate"}
+
+    graph = StateGraph(EmailState)
+    graph.add_node("prefilter", prefilter)
+    graph.add_node("classify_email", classify_email)
+    graph.add_node("handle_spam", handle_spam)
+    graph.add_node("drafting_response", drafting_response if draft else file_legitimate)
+    graph.add_edge(START, "prefilter")
+    graph.add_conditional_edges(
+        "prefilter", lambda state: "spam" if state.get("is_spam") else "unknown",
+        {"spam": "handle_spam", "unknown": "classify_email"},
+    )
+    graph.add_conditional_edges(
+        "classify_email", lambda state: "spam" if state["is_spam"] else "legitimate",
+        {"spam": "handle_spam", "legitimate": "drafting_response"},
+    )
+    graph.add_edge("handle_spam", END)
+    graph.add_edge("drafting_response", END)
+    stats["classifier"] = classifier.stats
+    return graph.compile(), stats
+
+
+def read_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _header(value) -> str:
+    try:
+        return str(make_header(decode_header(value or "")))
+    except Exception:
+        return value or ""
+
+
+def _body(message) -> str:
+    """The first text/plain part of an email message."""
+    parts = message.walk() if message.is_multipart() else [message]
+    for part in parts:
+        if part.get_content_type() == "text/plain" and not part.get_filename():
+            payload = part.get_payload(decode=True) or b""
+            return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    return ""
+
+
+def read_emails(path: str):
+    """Yield {"sender", "subject", "body"} dicts from an mbox or JSONL file, one at a time."""
+    if path.endswith((".jsonl", ".json")):
+        for email in read_jsonl(path):
+            yield {"sender": email.get("sender", ""), "subject": email.get("subject", ""), "body": email.get("body", "")}
+        return
+    for message in mailbox.mbox(path, create=False):
+        yield {"sender": _header(message["from"]), "subject": _header(message["subject"]), "body": _body(message)}
+
+
+def initial_state(email: dict) -> dict:
+    return {"email": email, "is_spam": None, "spam_reason": None, "email_category": None, "email_draft": None, "messages": []}
+
+
+async def sort_inbox(emails, graph, stats, concurrency: int = None, chunk_size: int = CHUNK_SIZE, on_result=None) -> dict:
+    """
+    Run the graph over a stream of emails, `concurrency` at a time, calling
+    `on_result(state)` for each finished email. Returns the run's metrics.
+    """
+    concurrency = concurrency or CONCURRENCY
+    start = time.perf_counter()
+    count = 0
+    iterator = iter(emails)
+    while chunk := list(islice(iterator, chunk_size)):
+        results = await graph.abatch([initial_state(email) for email in chunk], config={"max_concurrency": concurrency})
+        count += len(results)
+        if on_result:
+            for state in results:
+                on_result(state)
+    seconds = time.perf_counter() - start
+    llm_calls = stats["classifier"]["llm_calls"] + stats["draft_calls"]
+    return {
+        "emails": count,
+        "seconds": seconds,
+        "emails_per_minute": count / seconds * 60 if seconds else None,
+        "llm_calls": llm_calls,
+        "llm_calls_per_email": llm_calls / count if count else 0.0,
+        "classification_calls_per_email": stats["classifier"]["llm_calls"] / count if count else 0.0,
+        "spam_local": stats["spam_local"],
+        "spam_llm": stats["spam_llm"],
+        "ham": stats["ham"],
+        "unclassified": stats["classifier"]["unparsed"],
+    }
+
+
+class StubEmailModel:
+    """
+    Offline stand-in for Gemini (--stub): answers classification prompts with
+    keyword rules and drafts with a fixed reply, after `latency` seconds.
+    """
+
+    SPAM_WORDS = re.compile(r"\b(crypto|coin|won|winner|prize|lottery|pills|free|click|guaranteed|offer|bitcoin|nft)\b", re.I)
+
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage
+
+        await asyncio.sleep(self.latency)
+        prompt = messages[-1].content
+        blocks = re.split(r"^\[(\d+)\]$", prompt, flags=re.M)
+        if len(blocks) > 1:
+            lines = [
+                f"{number}: {'SPAM' if len(self.SPAM_WORDS.findall(text)) >= 2 else 'HAM'}"
+                for number, text in zip(blocks[1::2], blocks[2::2])
+            ]
+            return AIMessage(content="\n".join(lines))
+        return AIMessage(content="Dear sender, thank you for your email. Mr. Wayne will get back to you shortly. Alfred")
+
+
+def create_model():
+    """The notebook's Gemini 2.5 Pro model."""
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_dotenv()
+    return ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"), temperature=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sort an inbox (mbox or JSONL) with Alfred's email graph.")
+    parser.add_argument("inbox", help="mbox file, or JSONL with sender/subject/body per line")
+    parser.add_argument("--output", help="write one JSON line per sorted email here")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--group-size", type=int, default=GROUP_SIZE)
+    parser.add_argument("--spam-threshold", type=float, default=SPAM_THRESHOLD)
+    parser.add_argument("--no-prefilter", action="store_true", help="send every email to the LLM")
+    parser.add_argument("--no-draft", action="store_true", help="only sort, don't draft replies")
+    parser.add_argument("--stub", type=float, nargs="?", const=0.5, default=None,
+                        help="use an offline stand-in model with this latency (seconds)")
+    args = parser.parse_args()
+
+    model = StubEmailModel(args.stub) if args.stub is not None else create_model()
+    spam_filter = None if args.no_prefilter else HashedSpamFilter.from_seed()
+    graph, stats = build_inbox_graph(
+        model, spam_filter, GroupedClassifier(model, args.group_size), draft=not args.no_draft,
+        spam_threshold=args.spam_threshold,
+    )
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+
+    def write(state):
+        if out:
+            out.write(json.dumps({
+                **state["email"], "is_spam": state["is_spam"], "spam_reason": state["spam_reason"],
+                "category": state["email_category"], "draft": state["email_draft"],
+            }) + "\n")
+
+    try:
+        metrics = asyncio.run(sort_inbox(read_emails(args.inbox), graph, stats, args.concurrency, on_result=write))
+    finally:
+        if out:
+            out.close()
+    print(
+        f"Sorted {metrics['emails']} emails in {metrics['seconds']:.1f}s ({metrics['emails_per_minute']:.0f} emails/min): "
+        f"{metrics['spam_local']} spam filtered locally, {metrics['spam_llm']} spam and {metrics['ham']} legitimate by the LLM",
+        file=sys.stderr,
+    )
+    print(
+        f"LLM calls: {metrics['llm_calls']} ({metrics['llm_calls_per_email']:.2f} per email, "
+        f"{metrics['classification_calls_per_email']:.2f} for classification)",
+        file=sys.stderr,
+    )
+    print(json.dumps(metrics))
+
+
+if __name__ == "__main__":
+    main()
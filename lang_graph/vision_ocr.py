@@ -0,0 +1,364 @@
+"""
+Text extraction from images with a vision model, for agent.ipynb's extract_text tool.
+
+    from vision_ocr import VisionOCR
+
+    ocr = VisionOCR(vision_llm)
+    text = ocr.extract("Batman_training_and_meals.png")
+    texts = ocr.extract_many(["page1.png", "page2.jpg"])   # one request for both
+    print(ocr.metrics())
+
+    python vision_ocr.py page1.png page2.jpg [--stub] [--max-pixels 1500000]
+
+Before upload each image is downscaled to at most VISION_MAX_PIXELS pixels
+and re-encoded (PNG, or JPEG with VISION_IMAGE_FORMAT=JPEG); the original
+bytes are sent instead when they are already smaller. Extracted text is
+cached on disk in SQLite, keyed by the model, the prompt and a hash of the
+preprocessed pixels, so the same picture is only read once even when it is
+renamed or saved again losslessly. Images that aren't cached are sent
+up to VISION_BATCH_SIZE per request.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+# Defaults (override via environment)
+MAX_PIXELS = int(os.getenv("VISION_MAX_PIXELS", "1500000"))  # about 1500x1000
+IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "PNG").upper()
+JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "90"))
+BATCH_SIZE = int(os.getenv("VISION_BATCH_SIZE", "6"))  # images per request
+DEFAULT_CACHE_PATH = os.getenv("VISION_OCR_CACHE", "ocr_cache.sqlite3")
+MAX_AGE = float(os.getenv("VISION_OCR_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # 30 days
+
+PROMPT = "Extract all the text from this image. Return only the extracted text, no explanations."
+BATCH_PROMPT = (
+    "Extract all the text from each of the {count} images below. For each image, write a line "
+    '"=== IMAGE <number> ===" followed by its text. Return only the extracted text, no explanations.'
+)
+MARKER = re.compile(r"^\W*IMAGE\s+(\d+)\W*$", re.I | re.M)
+UPLOAD_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def hash_bytes(data) -> str:
+    """Return the hex sha256 of bytes or text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+def _text(content) -> str:
+    """Text of a model response (Gemini may return a list of content parts)."""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+class PreparedImage:
+    """An image ready for upload: the bytes to send, their MIME type and a hash of the pixels."""
+
+    def __init__(self, path, original_size, data, mime_type, pixel_hash, size):
+        self.path = path
+        self.original_size = original_size
+        self.data = data
+        self.mime_type = mime_type
+        self.pixel_hash = pixel_hash
+        self.size = size  # (width, height) sent
+
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+def prepare_image(path: str, raw: bytes = None, max_pixels: int = None, image_format: str = None) -> PreparedImage:
+    """
+    Downscale an image to at most `max_pixels` pixels (keeping its aspect ratio)
+    and re-encode it; keep the original bytes if they are smaller and in a
+    format the model accepts.
+    """
+    max_pixels = max_pixels or MAX_PIXELS
+    image_format = (image_format or IMAGE_FORMAT).upper()
+    if raw is None:
+        with open(path, "rb") as f:
+            raw = f.read()
+    with Image.open(io.BytesIO(raw)) as source:
+        original_format = source.format
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ("RGBA", "LA", "P"):
+            # Text on a transparent background: flatten onto white
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        resized = image.width * image.height > max_pixels
+        if resized:
+            scale = (max_pixels / (image.width * image.height)) ** 0.5
+            image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+        pixel_hash = hash_bytes(f"{image.mode}:{image.width}x{image.height}:".encode() + image.tobytes())
+
+        buffer = io.BytesIO()
+        if image_format == "JPEG":
+            image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        else:
+            image_format = "PNG"
+            image.save(buffer, "PNG", optimize=True)
+        data, mime_type = buffer.getvalue(), UPLOAD_FORMATS[image_format]
+        if not resized and original_format in UPLOAD_FORMATS and len(raw) <= len(data):
+            data, mime_type = raw, UPLOAD_FORMATS[original_format]
+        return PreparedImage(path, len(raw), data, mime_type, pixel_hash, image.size)
+
+
+class OCRCache:
+    """
+    Extracted text stored in a local SQLite file.
+
+    Texts are keyed by model id, prompt, pixel budget and the hash of the
+    preprocessed pixels. A second table remembers the pixel hash of each file
+    (by the sha256 of its bytes), so a file seen before is looked up without
+    decoding it. Entries older than `max_age` seconds are ignored.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_age = max_age or MAX_AGE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS texts (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, pixel_hash TEXT NOT NULL)")
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str, max_pixels: int, pixel_hash: str) -> str:
+        return hash_bytes(json.dumps([model_id, prompt, max_pixels, pixel_hash]))
+
+    def pixel_hash(self, file_hash: str):
+        with self._lock:
+            row = self._conn.execute("SELECT pixel_hash FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+
+    def remember_file(self, file_hash: str, pixel_hash: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (file_hash, pixel_hash))
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT text, created_at FROM texts WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.max_age:
+            return None
+        return row[0]
+
+    def set(self, key: str, model_id: str, text: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?)", (key, model_id, text, time.time()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class VisionOCR:
+    """
+    Extracts text from image files with `vision_llm`, preprocessing the images
+    and caching the results (see the module docstring). `metrics()` reports
+    cache hits, request counts, latency and the upload size against the size
+    of the files that were sent.
+    """
+
+    def __init__(self, vision_llm, cache=None, max_pixels: int = None, batch_size: int = None, image_format: str = None):
+        self.vision_llm = vision_llm
+        self.cache = cache if cache is not None else OCRCache()
+        self.max_pixels = max_pixels or MAX_PIXELS
+        self.batch_size = batch_size or BATCH_SIZE
+        self.image_format = image_format or IMAGE_FORMAT
+        self.model_id = getattr(vision_llm, "model", None) or getattr(vision_llm, "model_name", None) or type(vision_llm).__name__
+        self.stats = {
+            "images": 0, "cache_hits": 0, "requests": 0, "images_sent": 0, "retries": 0,
+            "original_bytes": 0, "payload_bytes": 0, "request_seconds": 0.0, "preprocess_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    def extract(self, img_path: str) -> str:
+        """The text in one image file."""
+        return self.extract_many([img_path])[0]
+
+    def extract_many(self, img_paths) -> list:
+        """The text in each image file, in order. Uncached images are sent `batch_size` per request."""
+        results = [None] * len(img_paths)
+        to_send = {}  # cache key -> (prepared image, [result indexes])
+        for index, path in enumerate(img_paths):
+            with open(path, "rb") as f:
+                raw = f.read()
+            self._count(images=1)
+            file_hash = hash_bytes(raw)
+            pixel_hash = self.cache.pixel_hash(file_hash)
+            if pixel_hash is not None:
+                text = self.cache.get(self._key(pixel_hash))
+                if text is not None:
+                    self._count(cache_hits=1)
+                    results[index] = text
+                    continue
+            start = time.perf_counter()
+            prepared = prepare_image(path, raw, self.max_pixels, self.image_format)
+            self._count(preprocess_seconds=time.perf_counter() - start)
+            self.cache.remember_file(file_hash, prepared.pixel_hash)
+            key = self._key(prepared.pixel_hash)
+            if key in to_send:
+                # The same picture twice in one call: send it once
+                to_send[key][1].append(index)
+                continue
+            text = self.cache.get(key)
+            if text is not None:
+                self._count(cache_hits=1)
+                results[index] = text
+                continue
+            self._count(original_bytes=len(raw))
+            to_send[key] = (prepared, [index])
+
+        pending = list(to_send.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            texts = self._request([prepared for _, (prepared, _) in batch])
+            for (key, (prepared, indexes)), text in zip(batch, texts):
+                if text is None:
+                    # Not found in a batched reply: ask about this image alone
+                    self._count(retries=1)
+                    text = self._request([prepared])[0] or ""
+                if text:
+                    # An empty reply is more likely a failure than a blank image; ask again next time
+                    self.cache.set(key, self.model_id, text)
+                for index in indexes:
+                    results[index] = text
+        return results
+
+    def _key(self, pixel_hash: str) -> str:
+        return OCRCache.make_key(self.model_id, PROMPT, self.max_pixels, pixel_hash)
+
+    def _request(self, images) -> list:
+        """One model call for `images`; returns their texts (None where the reply had none)."""
+        from langchain_core.messages import HumanMessage
+
+        if len(images) == 1:
+            content = [{"type": "text", "text": PROMPT}]
+        else:
+            content = [{"type": "text", "text": BATCH_PROMPT.format(count=len(images))}]
+        for number, image in enumerate(images, 1):
+            if len(images) > 1:
+                content.append({"type": "text", "text": f"Image {number}:"})
+            content.append({"type": "image_url", "image_url": {"url": image.data_url()}})
+        # Image bytes, comparable with original_bytes (the base64 data URLs are about 4/3 larger)
+        payload = sum(len(image.data) for image in images)
+
+        start = time.perf_counter()
+        response = self.vision_llm.invoke([HumanMessage(content=content)])
+        self._count(
+            requests=1, images_sent=len(images), payload_bytes=payload, request_seconds=time.perf_counter() - start,
+        )
+        text = _text(response.content).strip()
+        if len(images) == 1:
+            return [text]
+        return split_batch_reply(text, len(images))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "hit_rate": stats["cache_hits"] / stats["images"] if stats["images"] else 0.0,
+            "mean_request_seconds": stats["request_seconds"] / stats["requests"] if stats["requests"] else 0.0,
+            "payload_per_image": stats["payload_bytes"] / stats["images_sent"] if stats["images_sent"] else 0.0,
+        }
+
+
+def split_batch_reply(text: str, count: int) -> list:
+    """Texts of the "=== IMAGE n ===" sections of a batched reply (None for missing sections)."""
+    texts = [None] * count
+    markers = list(MARKER.finditer(text))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        number = int(marker.group(1))
+        if 1 <= number <= count and texts[number - 1] is None:
+            texts[number - 1] = text[marker.end():following.start() if following else len(text)].strip()
+    return texts
+
+
+class StubVisionModel:
+    """
+    Offline stand-in for the vision model (--stub): after `latency` seconds
+    plus `per_mb` seconds per MB of upload, "reads" each image as its size.
+    """
+
+    def __init__(self, latency: float = 1.0, per_mb: float = 0.5):
+        self.latency = latency
+        self.per_mb = per_mb
+        self.model = "stub-vision"
+
+    def invoke(self, messages):
+        from langchain_core.messages import AIMessage
+
+        urls = [part["image_url"]["url"] for part in messages[-1].content if part["type"] == "image_url"]
+        time.sleep(self.latency + self.per_mb * sum(len(url) for url in urls) / 1e6)
+        texts = []
+        for url in urls:
+            with Image.open(io.BytesIO(base64.b64decode(url.split(",", 1)[1]))) as image:
+                texts.append(f"Text of a {image.width}x{image.height} image")
+        if len(texts) == 1:
+            return AIMessage(content=texts[0])
+        return AIMessage(content="\n".join(f"=== IMAGE {i} ===\n{text}" for i, text in enumerate(texts, 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the text of images with a vision model.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--max-pixels", type=int, default=MAX_PIXELS)
+    parser.add_argument("--format", default=IMAGE_FORMAT, choices=["PNG", "JPEG"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite cache file")
+    parser.add_argument("--stub", type=float, nargs="?", const=1.0, default=None,
+                        help="use an offline stand-in model with this latency (seconds)")
+    args = parser.parse_args()
+
+    if args.stub is not None:
+        vision_llm = StubVisionModel(args.stub)
+    else:
+        from dotenv import load_dotenv
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        load_dotenv()
+        vision_llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"), temperature=0)
+    ocr = VisionOCR(vision_llm, OCRCache(args.cache), args.max_pixels, args.batch_size, args.format)
+    start = time.perf_counter()
+    for path, text in zip(args.images, ocr.extract_many(args.images)):
+        print(f"--- {path}\n{text}\n")
+    metrics = ocr.metrics()
+    print(
+        f"{metrics['images']} images in {time.perf_counter() - start:.1f}s: {metrics['cache_hits']} from the cache, "
+        f"{metrics['images_sent']} sent in {metrics['requests']} requests "
+        f"({metrics['payload_bytes'] / 1e6:.2f} MB uploaded for {metrics['original_bytes'] / 1e6:.2f} MB of image files)",
+        file=sys.stderr,
+    )
+    print(json.dumps(metrics), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Embedding throughput benchmark for the persona ingestion.
+
+    python bench.py [--documents 2000] [--request-latency 0.05] [--item-latency 0.002]
+                    [--server-parallel 4] [--batch-sizes 16 64 128] [--concurrency 1 4 8]
+                    [--output results.json]
+
+A local HTTP server stands in for Ollama's /api/embed: every request takes
+`--request-latency` seconds plus `--item-latency` per input, and at most
+`--server-parallel` requests are served at once (like OLLAMA_NUM_PARALLEL).
+`--documents` synthetic personas are ingested into a fresh Chroma store with
+the real OllamaEmbedding client, first through the notebooks' original
+IngestionPipeline and then through persona_ingest.ingest for every batch size
+and concurrency. The JSON report gives nodes/s and the speed-up over the
+pipeline for each run.
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llama_index.core import Document
+
+import persona_ingest
+
+WORDS = ("retired teacher history enthusiast traveller novelist chef gardener engineer nurse photographer "
+         "volunteer museum local community jazz hiking astronomy poetry languages research cycling").split()
+
+
+class StubEmbeddingServer:
+    """
+    Threaded local server answering Ollama's POST /api/embed with fixed
+    vectors, run in the background:
+
+        with StubEmbeddingServer(request_latency=0.05) as server:
+            OllamaEmbedding(model_name="nomic-embed-text", base_url=server.url)
+    """
+
+    def __init__(self, request_latency: float = 0.05, item_latency: float = 0.002, parallel: int = 4, dim: int = 768):
+        self.request_latency = request_latency
+        self.item_latency = item_latency
+        self.dim = dim
+        self.requests = 0
+        self.inputs = 0
+        self._slots = threading.Semaphore(parallel)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/embed":
+                    self.send_error(404)
+                    return
+                texts = payload.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                with stub._slots:
+                    stub.requests += 1
+                    stub.inputs += len(texts)
+                    time.sleep(stub.request_latency + stub.item_latency * len(texts))
+                body = json.dumps({
+                    "model": payload.get("model"),
+                    "embeddings": [stub.vector(text) for text in texts],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def vector(self, text: str) -> list:
+        seed = len(text) % 97
+        return [((seed + i) % 97) / 97 for i in range(self.dim)]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def synthetic_personas(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        Document(
+            id_=f"persona_{i}.txt",
+            text=" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) + ".",
+            metadata={"file_name": f"persona_{i}.txt"},
+        )
+        for i in range(n)
+    ]
+
+
+def embed_model(server):
+    from llama_index.embeddings.ollama import OllamaEmbedding
+
+    return OllamaEmbedding(model_name=persona_ingest.EMBED_MODEL, base_url=server.url)
+
+
+def run_pipeline(documents, server, chroma_dir):
+    """The notebooks' original ingestion: IngestionPipeline with the default embedding batch size."""
+    from llama_index.core.ingestion import IngestionPipeline
+    from llama_index.core.node_parser import SentenceSplitter
+
+    vector_store = persona_ingest.open_vector_store(chroma_dir, "bench_pipeline")
+    pipeline = IngestionPipeline(
+        transformations=[
+            SentenceSplitter(chunk_size=persona_ingest.CHUNK_SIZE, chunk_overlap=persona_ingest.CHUNK_OVERLAP),
+            embed_model(server),
+        ],
+        vector_store=vector_store,
+    )
+    start = time.perf_counter()
+    nodes = pipeline.run(documents=documents)
+    return len(nodes), time.perf_counter() - start
+
+
+def run_stage(documents, server, chroma_dir, batch_size, concurrency):
+    vector_store = persona_ingest.open_vector_store(chroma_dir, f"bench_{batch_size}_{concurrency}")
+    stats = persona_ingest.ingest(
+        documents, vector_store, embed_model(server), batch_size=batch_size, concurrency=concurrency,
+        chroma_path=chroma_dir,
+    )
+    if stats["vectors"] != stats["nodes"]:
+        raise RuntimeError(f"stored {stats['vectors']} vectors for {stats['nodes']} nodes")
+    return stats["nodes"], stats["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--request-latency", type=float, default=0.05, help="seconds per stub embedding request")
+    parser.add_argument("--item-latency", type=float, default=0.002, help="extra seconds per embedded input")
+    parser.add_argument("--server-parallel", type=int, default=4, help="requests the stub serves at once")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--skip-pipeline", action="store_true", help="don't run the IngestionPipeline baseline")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    documents = synthetic_personas(args.documents)
+    chroma_dir = tempfile.mkdtemp(prefix="persona_bench_")
+    results = []
+    try:
+        with StubEmbeddingServer(args.request_latency, args.item_latency, args.server_parallel, args.dim) as server:
+            runs = [] if args.skip_pipeline else [("pipeline", None, None)]
+            runs += [("stage", b, c) for b in args.batch_sizes for c in args.concurrency]
+            for name, batch_size, concurrency in runs:
+                print(f"Running {name} batch_size={batch_size} concurrency={concurrency}...", file=sys.stderr)
+                requests_before = server.requests
+                if name == "pipeline":
+                    nodes, seconds = run_pipeline(documents, server, chroma_dir)
+                else:
+                    nodes, seconds = run_stage(documents, server, chroma_dir, batch_size, concurrency)
+                results.append({
+                    "run": name, "batch_size": batch_size, "concurrency": concurrency,
+                    "nodes": nodes, "requests": server.requests - requests_before,
+                    "seconds": seconds, "nodes_per_second": nodes / seconds,
+                })
+    finally:
+        shutil.rmtree(chroma_dir, ignore_errors=True)
+
+    baseline = next((r["nodes_per_second"] for r in results if r["run"] == "pipeline"), None)
+    for result in results:
+        result["speedup"] = result["nodes_per_second"] / baseline if baseline else None
+    report = {
+        "documents": args.documents,
+        "server": {"request_latency": args.request_latency, "item_latency": args.item_latency,
+                   "parallel": args.server_parallel, "dim": args.dim},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
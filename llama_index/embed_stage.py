@@ -0,0 +1,63 @@
+"""
+Batched, concurrent embedding of a stream of nodes.
+
+    from embed_stage import embed_batches
+
+    for batch in embed_batches(nodes, embed_model, batch_size=64, concurrency=4):
+        vector_store.add(batch)
+
+`nodes` can be any iterable (e.g. a generator splitting documents one at a
+time). Nodes are grouped into batches of `batch_size`, each batch is one
+embedding request, and at most `concurrency` requests are in flight at once;
+finished batches are yielded as soon as they complete (not in input order),
+so only about `concurrency` batches are ever held in memory. For Ollama, set
+OLLAMA_NUM_PARALLEL on the server to at least `concurrency`, otherwise the
+extra requests just queue there.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from llama_index.core.schema import MetadataMode
+
+EMBED_BATCH_SIZE = int(os.getenv("PERSONA_EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("PERSONA_EMBED_CONCURRENCY", "4"))
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def embed_nodes(nodes: list, embed_model) -> list:
+    """Embed a list of nodes in one request, setting `node.embedding` in place."""
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    for node, embedding in zip(nodes, embed_model.get_text_embedding_batch(texts)):
+        node.embedding = embedding
+    return nodes
+
+
+def embed_batches(nodes, embed_model, batch_size: int = None, concurrency: int = None):
+    """Yield lists of embedded nodes as their requests finish."""
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    concurrency = concurrency or EMBED_CONCURRENCY
+    if getattr(embed_model, "embed_batch_size", batch_size) < batch_size:
+        # The model would otherwise split each batch into several sequential requests
+        embed_model = embed_model.model_copy(update={"embed_batch_size": batch_size})
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    pending = set()
+    try:
+        for batch in batched(nodes, batch_size):
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.submit(embed_nodes, batch, embed_model))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # On an error or an abandoned generator, let the requests already sent finish
+        pool.shutdown(wait=True)
@@ -0,0 +1,227 @@
+"""
+Incremental ingestion of the persona files into the persistent Chroma store.
+
+    from persona_ingest import write_personas, load_documents, open_vector_store, ingest
+
+    write_personas()                                  # only rewrites personas that changed
+    vector_store = open_vector_store("./alfred_chroma_db", "alfred")
+    stats = ingest(load_documents(), vector_store, chroma_path="./alfred_chroma_db")  # only new / changed files are embedded
+
+Documents are identified by file name and their content hashes are kept in a
+JSON file next to the Chroma database: unchanged files are skipped, changed
+files have their old vectors replaced, and files that disappeared have their
+vectors deleted. A re-run over unchanged data only reads and hashes the files.
+New and changed documents are split one at a time and embedded in concurrent
+batches that are written to Chroma as they finish (see embed_stage.py).
+
+    python persona_ingest.py [--limit N] [--chroma-path PATH] [--collection NAME]
+                             [--batch-size 64] [--concurrency 4]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+DATASET = "dvilasuero/finepersonas-v0.1-tiny"
+DATA_DIR = os.getenv("PERSONA_DATA_DIR", "data")
+CHROMA_PATH = os.getenv("PERSONA_CHROMA_PATH", "./alfred_chroma_db")
+COLLECTION = os.getenv("PERSONA_COLLECTION", "alfred")
+EMBED_MODEL = os.getenv("PERSONA_EMBED_MODEL", "nomic-embed-text")
+OLLAMA_URL = os.getenv("PERSONA_OLLAMA_URL", "http://localhost:11434")
+# SentenceSplitter's defaults, which the notebooks used before incremental ingestion
+CHUNK_SIZE = 1024
+CHUNK_OVERLAP = 200
+HASHES_FILENAME = "ingestion_hashes"  # inside the Chroma directory, so both move together
+DELETE_BATCH_SIZE = 500
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def write_personas(dataset=None, data_dir: str = DATA_DIR, limit: int = None) -> dict:
+    """
+    Write each persona to data_dir/persona_<i>.txt, skipping files whose content
+    is already up to date and removing persona files the dataset no longer has.
+    """
+    if dataset is None:
+        from datasets import load_dataset
+
+        dataset = load_dataset(path=DATASET, split="train")
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    counts = {"written": 0, "unchanged": 0, "removed": 0}
+    expected = set()
+    for i, persona in enumerate(dataset):
+        if limit is not None and i >= limit:
+            break
+        path = data_dir / f"persona_{i}.txt"
+        expected.add(path.name)
+        text = persona["persona"]
+        if path.exists() and _digest(path.read_text(encoding="utf-8")) == _digest(text):
+            counts["unchanged"] += 1
+            continue
+        path.write_text(text, encoding="utf-8")
+        counts["written"] += 1
+    for path in data_dir.glob("persona_*.txt"):
+        if path.name not in expected:
+            path.unlink()
+            counts["removed"] += 1
+    return counts
+
+
+def load_documents(data_dir: str = DATA_DIR) -> list:
+    """
+    Read the data directory with stable document ids (the path inside data_dir)
+    and only content-defining metadata, so a file's hash changes only when its
+    text does (not when it is re-written or the notebook runs from elsewhere).
+    """
+    from llama_index.core import SimpleDirectoryReader
+
+    reader = SimpleDirectoryReader(
+        input_dir=data_dir,
+        file_metadata=lambda path: {"file_name": os.path.basename(path)},
+    )
+    documents = reader.load_data()
+    for document in documents:
+        document.id_ = document.metadata["file_name"]
+    return documents
+
+
+def open_vector_store(chroma_path: str = CHROMA_PATH, collection: str = COLLECTION):
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    db = chromadb.PersistentClient(path=chroma_path)
+    chroma_collection = db.get_or_create_collection(collection)
+    return ChromaVectorStore(chroma_collection=chroma_collection)
+
+
+def default_hashes_path(chroma_path: str, collection: str) -> str:
+    """Where the content hashes of a collection are kept: inside its Chroma directory."""
+    return os.path.join(chroma_path, f"{HASHES_FILENAME}_{collection}.json")
+
+
+def load_hashes(path: str, vector_store) -> dict:
+    """document id -> content hash of every document in the vector store."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        hashes = json.load(f)
+    if hashes and vector_store.client.count() == 0:
+        # The Chroma collection was wiped; start over instead of skipping everything
+        print("Vector store is empty, discarding the stale ingestion hashes")
+        return {}
+    return hashes
+
+
+def save_hashes(path: str, hashes: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(hashes, f)
+    os.replace(tmp_path, path)
+
+
+def split_documents(documents, splitter=None):
+    """Yield the nodes of each document in turn (one document split at a time)."""
+    from llama_index.core.node_parser import SentenceSplitter
+
+    splitter = splitter or SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for document in documents:
+        yield document, splitter.get_nodes_from_documents([document])
+
+
+def ingest(documents, vector_store, embed_model=None, hashes_path: str = None,
+           batch_size: int = None, concurrency: int = None, chroma_path: str = None) -> dict:
+    """
+    Split and embed only the new or changed documents into `vector_store` and
+    delete vectors of documents that are gone. Nodes are embedded in batches
+    of `batch_size` with up to `concurrency` requests in flight and written to
+    the store batch by batch (see embed_stage). A document's hash is recorded
+    in `hashes_path` (by default inside `chroma_path`, the directory the
+    store was opened from) once all its nodes are stored, so an interrupted
+    run resumes where it stopped.
+    """
+    from embed_stage import batched, embed_batches
+
+    if embed_model is None:
+        from llama_index.embeddings.ollama import OllamaEmbedding
+
+        embed_model = OllamaEmbedding(model_name=EMBED_MODEL, base_url=OLLAMA_URL)
+    if hashes_path is None:
+        if chroma_path is None:
+            raise ValueError("ingest needs the Chroma directory (chroma_path) or an explicit hashes_path")
+        hashes_path = default_hashes_path(chroma_path, vector_store.client.name)
+    hashes = load_hashes(hashes_path, vector_store)
+    current = {document.id_: document.hash for document in documents}
+    removed = [doc_id for doc_id in hashes if doc_id not in current]
+    changed = [document for document in documents if hashes.get(document.id_) != document.hash]
+    start = time.perf_counter()
+
+    # Old vectors of changed documents, plus any left by an interrupted run for new ones
+    stale = removed + [document.id_ for document in changed]
+    if stale and vector_store.client.count():
+        for ids in batched(stale, DELETE_BATCH_SIZE):
+            vector_store.client.delete(where={"document_id": {"$in": ids}})
+    for doc_id in removed:
+        del hashes[doc_id]
+
+    remaining = {}  # document id -> nodes not yet stored
+
+    def nodes():
+        for document, document_nodes in split_documents(changed):
+            if not document_nodes:
+                hashes[document.id_] = document.hash
+                continue
+            remaining[document.id_] = len(document_nodes)
+            yield from document_nodes
+
+    written = 0
+    try:
+        for batch in embed_batches(nodes(), embed_model, batch_size, concurrency):
+            vector_store.add(batch)
+            written += len(batch)
+            for node in batch:
+                remaining[node.ref_doc_id] -= 1
+                if not remaining[node.ref_doc_id]:
+                    del remaining[node.ref_doc_id]
+                    hashes[node.ref_doc_id] = current[node.ref_doc_id]
+    finally:
+        save_hashes(hashes_path, hashes)
+    seconds = time.perf_counter() - start
+    return {
+        "documents": len(documents),
+        "ingested": len(changed),
+        "unchanged": len(documents) - len(changed),
+        "deleted": len(removed),
+        "nodes": written,
+        "vectors": vector_store.client.count(),
+        "seconds": seconds,
+        "nodes_per_second": written / seconds if seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest the persona dataset into Chroma.")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N personas")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    parser.add_argument("--collection", default=COLLECTION)
+    parser.add_argument("--batch-size", type=int, default=None, help="nodes per embedding request")
+    parser.add_argument("--concurrency", type=int, default=None, help="embedding requests in flight")
+    args = parser.parse_args()
+
+    print(f"Personas: {write_personas(data_dir=args.data_dir, limit=args.limit)}")
+    documents = load_documents(args.data_dir)
+    vector_store = open_vector_store(args.chroma_path, args.collection)
+    stats = ingest(
+        documents, vector_store, batch_size=args.batch_size, concurrency=args.concurrency,
+        chroma_path=args.chroma_path,
+    )
+    print(f"Ingestion: {stats}")
+
+
+if __name__ == "__main__":
+    main()